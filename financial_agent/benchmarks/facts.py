@@ -0,0 +1,135 @@
+"""
+XBRL metrics benchmark: vectorized FactsStore.compute_metrics vs a per-ticker
+Python loop, on synthetic companyfacts fixtures.
+
+Each fixture mimics SEC companyfacts JSON: annual and quarterly duration
+facts for revenue, operating income, net income and operating cash flow,
+comparatives repeated across filings, one restated year, and a concept
+switch (SalesRevenueNet -> ASC 606 revenue) halfway through. The script
+checks that both implementations agree before timing them.
+
+Usage (from financial_agent/):
+    python benchmarks/facts.py --tickers 500 --years 10
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.retrieval.facts_store import FactsStore
+from src.tools.xbrl import METRIC_CONCEPTS, parse_company_facts
+
+def fact(start: str, end: str, val: float, filed: str, form: str = "10-K") -> dict:
+    return {"start": start, "end": end, "val": val, "filed": filed, "form": form}
+
+def synthetic_company(years: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    first_year = 2024 - years + 1
+    revenue = rng.uniform(1e8, 1e11)
+    concepts = {name: [] for name in ("SalesRevenueNet", "RevenueFromContractWithCustomerExcludingAssessedTax",
+                                      "OperatingIncomeLoss", "NetIncomeLoss", "NetCashProvidedByUsedInOperatingActivities")}
+    for year in range(first_year, 2025):
+        revenue *= 1 + rng.uniform(-0.1, 0.4)
+        operating = revenue * rng.uniform(-0.05, 0.45)
+        net = operating * rng.uniform(0.6, 0.9)
+        ocf = net * rng.uniform(0.7, 1.6)
+        start, end = f"{year - 1}-02-01", f"{year}-01-31"
+        revenue_concept = "SalesRevenueNet" if year < first_year + years // 2 else "RevenueFromContractWithCustomerExcludingAssessedTax"
+        # Reported in this year's 10-K and again as a comparative the next year
+        for filed in (f"{year}-03-01", f"{year + 1}-03-01"):
+            concepts[revenue_concept].append(fact(start, end, revenue, filed))
+            concepts["OperatingIncomeLoss"].append(fact(start, end, operating, filed))
+            concepts["NetIncomeLoss"].append(fact(start, end, net, filed))
+            concepts["NetCashProvidedByUsedInOperatingActivities"].append(fact(start, end, ocf, filed))
+        # Quarterly facts must not be mistaken for fiscal years
+        concepts[revenue_concept].append(fact(f"{year - 1}-11-01", end, revenue / 4, f"{year}-03-01", "10-Q"))
+    # Restatement: the latest filing wins
+    concepts["NetIncomeLoss"].append(fact(start, end, net * 0.5, "2026-01-15", "10-K/A"))
+    return {"entityName": f"Company {seed}", "facts": {"us-gaap": {
+        name: {"units": {"USD": facts}} for name, facts in concepts.items()
+    }}}
+
+def reference_metrics(data: dict, cagr_years: int) -> dict:
+    """
+    Straightforward per-ticker computation used to check the vectorized one.
+    """
+    facts = parse_company_facts(data)
+    series = {}
+    for metric, concepts in METRIC_CONCEPTS.items():
+        by_year = {}
+        for priority in reversed(range(len(concepts))):
+            rows = [i for i, c in enumerate(facts["concept"]) if c == concepts[priority] and facts["unit"][i] == "USD"
+                    and facts["start"][i] != "NaT"]
+            rows = [i for i in rows if 350 <= (_days(facts["end"][i]) - _days(facts["start"][i])) <= 380]
+            values = {}
+            for i in sorted(rows, key=lambda i: facts["filed"][i]):
+                values[int(facts["end"][i][:4])] = facts["value"][i]
+            by_year.update(values)
+        series[metric] = by_year
+
+    revenue = series["revenue"]
+    latest = max(revenue)
+    window = [y for y in revenue if latest - cagr_years <= y <= latest]
+    first = min(window)
+    span = latest - first
+    cagr = (revenue[latest] / revenue[first]) ** (1 / span) - 1 if span and revenue[first] > 0 and revenue[latest] > 0 else None
+    both = [y for y in series["operating_cash_flow"] if y in series["net_income"]]
+    cash_year = max(both)
+    return {
+        "revenue_cagr": cagr,
+        "operating_margin": series["operating_income"][latest] / revenue[latest],
+        "ocf_to_net_income": series["operating_cash_flow"][cash_year] / series["net_income"][cash_year],
+    }
+
+def _days(date: str) -> int:
+    import datetime
+    return datetime.date.fromisoformat(date).toordinal()
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized XBRL metrics benchmark")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--cagr-years", type=int, default=5)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    fixtures = {ticker: synthetic_company(args.years, seed) for seed, ticker in enumerate(tickers)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FactsStore(os.path.join(tmp, "companyfacts.npz"))
+        start = time.perf_counter()
+        for ticker, data in fixtures.items():
+            store.add_company(ticker, data)
+        store.save()
+        load_s = time.perf_counter() - start
+
+        store = FactsStore(os.path.join(tmp, "companyfacts.npz"))
+        start = time.perf_counter()
+        vectorized = store.compute_metrics(tickers, cagr_years=args.cagr_years)
+        vector_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = {ticker: reference_metrics(data, args.cagr_years) for ticker, data in fixtures.items()}
+    loop_s = time.perf_counter() - start
+
+    mismatches = 0
+    for ticker in tickers:
+        for key, expected in reference[ticker].items():
+            got = vectorized[ticker][key]
+            if (expected is None) != (got is None) or (expected is not None and not math.isclose(got, expected, rel_tol=1e-9)):
+                mismatches += 1
+                print(f"  MISMATCH {ticker} {key}: {got} != {expected}")
+
+    print(f"{len(store)} facts for {len(tickers)} tickers loaded in {load_s:.2f}s")
+    print(f"Vectorized metrics: {vector_s * 1000:.1f} ms ({vector_s / len(tickers) * 1e6:.0f} us/ticker)")
+    print(f"Per-ticker loop:    {loop_s * 1000:.1f} ms")
+    print(f"Mismatches: {mismatches}")
+    print(FactsStore.format_metrics(vectorized[tickers[0]]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Retrieval profile benchmark: memory footprint vs recall/latency.
+
+For each profile (dense / dense_bm25 / colbert, with optional scalar or
+binary quantization and on-disk storage) this reports:
+  - estimated vector RAM and disk footprint of its collection
+  - median and p95 search latency
+  - recall@k against the reference profile (full ColBERT rerank, float32, in RAM)
+
+Every profile lives in its own collection. Use --load to fill them from the
+local corpus files (data/corpus/*.json) first; already-indexed chunks are skipped.
+
+Usage (from financial_agent/):
+    python benchmarks/profiles.py --load --tickers META
+    python benchmarks/profiles.py --all --k 10 --runs 3
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import config
+from src.retrieval.profiles import RetrievalProfile, all_profiles
+
+QUERY_TEMPLATES = [
+    "{ticker} Item 7 Management's Discussion and Analysis of Financial Condition and Results of Operations",
+    "{ticker} Item 1A Risk Factors regulatory challenges competition",
+    "{ticker} consolidated statements of cash flows operating activities",
+    "{ticker} revenue growth and operating margin",
+    "{ticker} share repurchase program and dividends",
+    "{ticker} competition and market share",
+    "{ticker} capital expenditures outlook",
+    "{ticker} executive officers and beneficial ownership",
+]
+
+DEFAULT_PROFILES = [
+    RetrievalProfile("colbert"),
+    RetrievalProfile("colbert", "scalar"),
+    RetrievalProfile("colbert", "binary"),
+    RetrievalProfile("colbert", "scalar", on_disk=True),
+    RetrievalProfile("dense_bm25"),
+    RetrievalProfile("dense_bm25", "scalar"),
+    RetrievalProfile("dense"),
+    RetrievalProfile("dense", "binary"),
+]
+
+def corpus_tickers() -> list:
+    corpus_dir = os.path.join(config.DATA_DIR, "corpus")
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(corpus_dir, "*.json")))
+
+def load_corpus(ticker: str) -> list:
+    with open(os.path.join(config.DATA_DIR, "corpus", f"{ticker}.json")) as f:
+        return json.load(f)
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_profile(vector_db, queries: list, k: int, runs: int):
+    latencies = []
+    results = {}
+    for ticker, query in queries:
+        for _ in range(runs):
+            start = time.perf_counter()
+            hits = vector_db.search(query, limit=k, ticker=ticker)
+            latencies.append(time.perf_counter() - start)
+        results[(ticker, query)] = [str(h["id"]) for h in hits]
+    return latencies, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval profile footprint and recall/latency benchmark")
+    parser.add_argument("--all", action="store_true", help="Benchmark every profile/quantization/storage combination")
+    parser.add_argument("--tickers", type=str, help="Comma-separated tickers (default: every corpus file)")
+    parser.add_argument("--load", action="store_true", help="Index the local corpus into each profile's collection first")
+    parser.add_argument("--k", type=int, default=10, help="Results per query (recall@k)")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per query")
+    args = parser.parse_args()
+
+    from src.retrieval.vector_db import QdrantVectorDB
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",")] if args.tickers else corpus_tickers()
+    queries = [(ticker, template.format(ticker=ticker)) for ticker in tickers for template in QUERY_TEMPLATES]
+    profiles = list(all_profiles()) if args.all else DEFAULT_PROFILES
+    reference = RetrievalProfile("colbert")
+    if not any(p.is_default for p in profiles):
+        profiles.insert(0, reference)
+    else:
+        # Run the reference first so recall can be computed as we go
+        profiles.sort(key=lambda p: not p.is_default)
+
+    rows = []
+    reference_results = None
+    shared_embedder = None
+    for profile in profiles:
+        vector_db = QdrantVectorDB(profile=profile)
+        # Reuse loaded models across profiles
+        if shared_embedder is None:
+            shared_embedder = vector_db.embedder
+        vector_db.embedder = shared_embedder
+
+        if args.load:
+            for ticker in tickers:
+                vector_db.add_documents(load_corpus(ticker), incremental=True)
+
+        # Warm-up (model load, connection setup)
+        vector_db.search(queries[0][1], limit=args.k, ticker=queries[0][0])
+        latencies, results = run_profile(vector_db, queries, args.k, args.runs)
+        if profile.is_default:
+            reference_results = results
+
+        recall = None
+        if reference_results:
+            overlaps = [
+                len(set(results[key]) & set(ref_ids)) / len(ref_ids)
+                for key, ref_ids in reference_results.items() if ref_ids
+            ]
+            recall = statistics.mean(overlaps) if overlaps else None
+
+        footprint = vector_db.footprint()
+        rows.append((profile, footprint, latencies, recall))
+
+    print(f"\n{len(queries)} queries x {args.runs} runs, k={args.k}, reference = {reference}")
+    print(f"{'collection':<48} {'points':>8} {'RAM MB':>9} {'disk MB':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for profile, footprint, latencies, recall in rows:
+        print(
+            f"{footprint['collection']:<48} {footprint['points']:>8} {footprint['ram_mb']:>9.1f} {footprint['disk_mb']:>9.1f} "
+            f"{statistics.median(latencies) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+            f"{(f'{recall:.3f}' if recall is not None else 'n/a'):>9}"
+        )
+    print("\nRAM/disk are estimates from the profile layout, point count and sampled ColBERT token counts.")
+
+if __name__ == "__main__":
+    main()
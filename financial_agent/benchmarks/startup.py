@@ -0,0 +1,73 @@
+"""
+Startup-time benchmark for the CLI.
+
+Measures, in fresh interpreters, how long it takes to:
+  - import src.main
+  - run `main.py --help`
+and lists the slowest imports reported by `python -X importtime`.
+
+Usage (from financial_agent/):
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "src", "main.py")
+
+def time_command(cmd, runs: int):
+    timings = []
+    returncode = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - start)
+        returncode = returncode or proc.returncode
+    return timings, returncode
+
+def slowest_imports(top: int) -> list:
+    """
+    Parses `-X importtime` output (microseconds, cumulative) for `import src.main`.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        rows.append((int(parts[1].strip()), parts[2].strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup-time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    cases = {
+        "import src.main": [sys.executable, "-c", "import src.main"],
+        "main.py --help": [sys.executable, MAIN, "--help"],
+    }
+    
+    print(f"Startup benchmark ({args.runs} runs each)")
+    for name, cmd in cases.items():
+        timings, returncode = time_command(cmd, args.runs)
+        status = "" if returncode == 0 else f"   (FAILED: exit {returncode}, check dependencies)"
+        print(f"  {name:<20} median {statistics.median(timings) * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms{status}")
+    
+    print("\nSlowest imports (cumulative) for `import src.main`:")
+    for micros, module in slowest_imports(args.top):
+        print(f"  {micros / 1000:8.1f} ms  {module}")
+
+if __name__ == "__main__":
+    main()
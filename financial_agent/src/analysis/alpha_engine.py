@@ -1,60 +1,272 @@
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config import config
+from src.utils.llm import llm_client, object_schema
+from src.analysis.context import ContextAssembler, ContextValue
 from src.analysis.dimensions.alignment import AlignmentAnalyzer
 from src.analysis.dimensions.liquidity import LiquidityAnalyzer
 from src.analysis.dimensions.performance import PerformanceAnalyzer
 from src.analysis.dimensions.horizon import HorizonAnalyzer
 from src.analysis.dimensions.action import ActionAnalyzer
 
+# Progress callbacks: a finished dimension's result, and streamed analysis
+# text as it is generated (dimension, prompt name, text)
+OnDimension = Callable[[str, Dict[str, Any]], None]
+OnDelta = Callable[[str, str, str], None]
+
 class AlphaEngine:
-    def __init__(self):
-        self.alignment = AlignmentAnalyzer()
+    def __init__(self, concurrent: bool = None, max_workers: int = None, combined: bool = None):
+        # Concurrent mode runs the five dimensions on a bounded thread pool.
+        # Every dimension is independent, so wall-clock time drops from the sum
+        # of all LLM round trips to roughly the longest single chain.
+        self.concurrent = config.ALPHA_CONCURRENT if concurrent is None else concurrent
+        self.max_workers = max_workers or config.ALPHA_MAX_WORKERS
+        # Combined mode scores all dimensions in a single structured LLM call
+        self.combined = config.ALPHA_COMBINED_CALL if combined is None else combined
+        
+        self.alignment = AlignmentAnalyzer(concurrent=self.concurrent)
         self.liquidity = LiquidityAnalyzer()
         self.performance = PerformanceAnalyzer()
         self.horizon = HorizonAnalyzer()
         self.action = ActionAnalyzer()
+        self.assembler = ContextAssembler()
+
+        # Dimension -> (analyzer, context keys it reads, in argument order)
+        self.dimensions = {
+            "Alignment": (self.alignment, ("mda", "insider", "insider_activity")),
+            "Liquidity": (self.liquidity, ("risk", "mda")),
+            "Performance": (self.performance, ("financials", "financial_metrics")),
+            "Horizon": (self.horizon, ("business", "risk")),
+            "Action": (self.action, ("market", "news")),
+        }
+
+    @staticmethod
+    def _insufficient_data(texts) -> Dict[str, Any]:
+        # Check if any text argument is meaningful (len > 50)
+        if not any(len(str(text)) > 50 for text in texts):
+            return {
+                "score": 50, 
+                "rationale": "Insufficient data retrieved for this dimension.", 
+                "analysis": "Data missing."
+            }
+        return None
 
-    def analyze(self, ticker: str, retrieved_context: Dict[str, str]) -> Dict[str, Any]:
+    @staticmethod
+    def _error_result(e: Exception) -> Dict[str, Any]:
+        # Score 50 keeps old consumers working; combine() leaves failed
+        # dimensions out of the composite, weighted score and verdict
+        print(f"Analysis Error: {e}")
+        return {
+            "score": 50, 
+            "rationale": f"Error during analysis: {e}", 
+            "analysis": "Error.",
+            "failed": True
+        }
+
+    @staticmethod
+    def _dimension_delta(name: str, on_delta: OnDelta = None):
+        if on_delta is None:
+            return None
+        return lambda prompt, text: on_delta(name, prompt, text)
+
+    def pack_context(self, retrieved_context: Dict[str, ContextValue]) -> Dict[str, List[str]]:
         """
-        Runs the full ALPHA analysis based on retrieved context.
+        Every dimension's texts, packed to its token budget. Context values
+        are text or lists of retrieved chunks; a chunk several dimensions
+        retrieved is packed into one of them only.
         """
-        
-        def safe_analyze(analyzer_func, *args):
-            # Check if any text argument is meaningful (len > 50)
-            if not any(len(str(arg)) > 50 for arg in args):
-                return {
-                    "score": 50, 
-                    "rationale": "Insufficient data retrieved for this dimension.", 
-                    "analysis": "Data missing."
-                }
+        return self.assembler.pack_report({
+            name: (keys, [retrieved_context.get(key, "") for key in keys])
+            for name, (_, keys) in self.dimensions.items()
+        })
+
+    async def _agather_context(self, get_context: Callable[[str], Awaitable[ContextValue]]) -> Dict[str, ContextValue]:
+        keys = list(dict.fromkeys(key for _, dim_keys in self.dimensions.values() for key in dim_keys))
+        return dict(zip(keys, await asyncio.gather(*(get_context(key) for key in keys))))
+
+    def analyze_dimension(self, name: str, texts: List[str], on_delta: OnDelta = None) -> Dict[str, Any]:
+        """
+        Runs one dimension on its packed texts; never raises.
+        """
+        analyzer, _ = self.dimensions[name]
+        fallback = self._insufficient_data(texts)
+        if fallback:
+            return fallback
+        try:
+            return analyzer.analyze(*texts, on_delta=self._dimension_delta(name, on_delta))
+        except Exception as e:
+            return self._error_result(e)
+
+    async def aanalyze_dimension(self, name: str, texts: List[str], on_delta: OnDelta = None) -> Dict[str, Any]:
+        analyzer, _ = self.dimensions[name]
+        fallback = self._insufficient_data(texts)
+        if fallback:
+            return fallback
+        try:
+            return await analyzer.aanalyze(*texts, on_delta=self._dimension_delta(name, on_delta))
+        except Exception as e:
+            return self._error_result(e)
+
+    # Combined mode
+
+    def _combined_request(self, inputs: Dict[str, List[str]]) -> Tuple[str, Dict[str, Any]]:
+        sections = [
+            f"## {name}\n{self.dimensions[name][0].structured_prompt(*texts)}"
+            for name, texts in inputs.items()
+        ]
+        prompt = (
+            "Assess each ALPHA dimension below independently, using only that dimension's text. "
+            "Return one object per dimension.\n\n" + "\n\n".join(sections)
+        )
+        schema = object_schema({
+            name: self.dimensions[name][0].structured_schema(*texts) for name, texts in inputs.items()
+        })
+        return prompt, schema
+
+    def _combined_results(self, inputs: Dict[str, List[str]], output: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: self.dimensions[name][0].structured_result(output[name], *texts)
+            for name, texts in inputs.items()
+        }
+
+    def _split_insufficient(self, packed: Dict[str, List[str]]):
+        # Dimensions without data keep the fallback result and stay out of the call
+        results, inputs = {}, {}
+        for name, texts in packed.items():
+            fallback = self._insufficient_data(texts)
+            if fallback:
+                results[name] = fallback
+            else:
+                inputs[name] = texts
+        return results, inputs
+
+    def analyze_combined(self, retrieved_context: Dict[str, ContextValue]) -> Dict[str, Dict[str, Any]]:
+        """
+        All dimensions in one structured call; never raises.
+        """
+        results, inputs = self._split_insufficient(self.pack_context(retrieved_context))
+        if inputs:
+            try:
+                prompt, schema = self._combined_request(inputs)
+                results.update(self._combined_results(inputs, llm_client.structured_completion(prompt, "alpha", schema)))
+            except Exception as e:
+                results.update({name: self._error_result(e) for name in inputs})
+        return {name: results[name] for name in self.dimensions}
+
+    async def aanalyze_combined(self, get_context: Callable[[str], Awaitable[ContextValue]]) -> Dict[str, Dict[str, Any]]:
+        try:
+            packed = self.pack_context(await self._agather_context(get_context))
+        except Exception as e:
+            return {name: self._error_result(e) for name in self.dimensions}
+        results, inputs = self._split_insufficient(packed)
+        if inputs:
             try:
-                return analyzer_func(*args)
+                prompt, schema = self._combined_request(inputs)
+                output = await llm_client.astructured_completion(prompt, "alpha", schema)
+                results.update(self._combined_results(inputs, output))
             except Exception as e:
-                print(f"Analysis Error: {e}")
-                return {
-                    "score": 50, 
-                    "rationale": f"Error during analysis: {e}", 
-                    "analysis": "Error."
+                results.update({name: self._error_result(e) for name in inputs})
+        return {name: results[name] for name in self.dimensions}
+
+    @staticmethod
+    def _notify(on_dimension: OnDimension, name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        if on_dimension is not None:
+            try:
+                on_dimension(name, result)
+            except Exception as e:
+                # A failing progress writer must not lose the analysis
+                print(f"Progress callback error ({name}): {e}")
+        return result
+
+    def analyze(self, ticker: str, retrieved_context: Dict[str, ContextValue],
+                on_dimension: OnDimension = None, on_delta: OnDelta = None) -> Dict[str, Any]:
+        """
+        Runs the full ALPHA analysis based on retrieved context.
+        on_dimension(name, result) is called as each dimension finishes.
+        """
+        if self.combined:
+            dim_results = self.analyze_combined(retrieved_context)
+            for name, result in dim_results.items():
+                self._notify(on_dimension, name, result)
+            return self.combine(ticker, dim_results)
+
+        packed = self.pack_context(retrieved_context)
+        if self.concurrent:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self.analyze_dimension, name, packed[name], on_delta): name
+                    for name in self.dimensions
                 }
+                # analyze_dimension never raises, so result() only waits
+                dim_results = {}
+                for future in as_completed(futures):
+                    dim_results[futures[future]] = self._notify(on_dimension, futures[future], future.result())
+        else:
+            dim_results = {
+                name: self._notify(on_dimension, name, self.analyze_dimension(name, packed[name], on_delta))
+                for name in self.dimensions
+            }
+        
+        return self.combine(ticker, {name: dim_results[name] for name in self.dimensions})
+
+    async def aanalyze(self, ticker: str, get_context: Callable[[str], Awaitable[ContextValue]],
+                       on_dimension: OnDimension = None, on_delta: OnDelta = None) -> Dict[str, Any]:
+        """
+        Runs all dimensions on the event loop. Context keys are fetched
+        concurrently, and every dimension starts once all of them are in,
+        so chunks can be deduplicated across the whole report.
+        """
+        if self.combined:
+            dim_results = await self.aanalyze_combined(get_context)
+            for name, result in dim_results.items():
+                self._notify(on_dimension, name, result)
+            return self.combine(ticker, dim_results)
+
+        try:
+            packed = self.pack_context(await self._agather_context(get_context))
+        except Exception as e:
+            dim_results = {name: self._notify(on_dimension, name, self._error_result(e)) for name in self.dimensions}
+            return self.combine(ticker, dim_results)
+
+        async def run(name: str) -> Dict[str, Any]:
+            return self._notify(on_dimension, name, await self.aanalyze_dimension(name, packed[name], on_delta))
 
-        # Run dimensions
-        a_res = safe_analyze(self.alignment.analyze, retrieved_context.get("mda", ""), retrieved_context.get("insider", ""))
-        l_res = safe_analyze(self.liquidity.analyze, retrieved_context.get("risk", ""), retrieved_context.get("mda", ""))
-        p_res = safe_analyze(self.performance.analyze, retrieved_context.get("financials", ""))
-        h_res = safe_analyze(self.horizon.analyze, retrieved_context.get("business", ""), retrieved_context.get("risk", ""))
-        act_res = safe_analyze(self.action.analyze, retrieved_context.get("market", ""), retrieved_context.get("news", ""))
+        names = list(self.dimensions)
+        results = await asyncio.gather(*(run(name) for name in names))
+        return self.combine(ticker, dict(zip(names, results)))
+
+    def combine(self, ticker: str, dim_results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Composite score, weighted score and verdict from the five dimension results.
+        """
+        a_res = dim_results["Alignment"]
+        l_res = dim_results["Liquidity"]
+        p_res = dim_results["Performance"]
+        h_res = dim_results["Horizon"]
+        act_res = dim_results["Action"]
         
-        # Scoring
-        scores = [a_res["score"], l_res["score"], p_res["score"], h_res["score"], act_res["score"]]
+        # Dimensions whose LLM call failed (after retries) don't count as a neutral 50
+        failed = [name for name, res in dim_results.items() if res.get("failed")]
         
-        # Avoid division by zero if all failed (though safe_analyze returns 50)
-        composite_score = sum(scores) / len(scores) if scores else 50
+        def mean(*results) -> float:
+            scores = [res["score"] for res in results if not res.get("failed")]
+            return sum(scores) / len(scores) if scores else None
         
-        # Weighted Decision Matrix
-        quality_score = (a_res["score"] + h_res["score"]) / 2
-        health_score = p_res["score"]
-        entry_score = (l_res["score"] + act_res["score"]) / 2
+        # Scoring (50 if every dimension failed)
+        composite_score = mean(a_res, l_res, p_res, h_res, act_res)
+        if composite_score is None:
+            composite_score = 50
         
-        weighted_score = (quality_score * 0.4) + (health_score * 0.3) + (entry_score * 0.3)
+        # Weighted Decision Matrix; a group with no usable dimension gives its weight to the others
+        groups = [
+            (mean(a_res, h_res), 0.4),   # quality
+            (mean(p_res), 0.3),          # health
+            (mean(l_res, act_res), 0.3)  # entry
+        ]
+        groups = [(score, weight) for score, weight in groups if score is not None]
+        total_weight = sum(weight for _, weight in groups)
+        weighted_score = sum(score * weight for score, weight in groups) / total_weight if groups else 50
         
         verdict = "HOLD"
         if weighted_score > 75:
@@ -63,12 +275,15 @@ class AlphaEngine:
             verdict = "ACCUMULATE"
         elif weighted_score < 50:
             verdict = "AVOID"
+        if len(failed) == len(dim_results):
+            verdict = "INCOMPLETE"
             
         return {
             "ticker": ticker,
             "composite_score": int(composite_score),
             "weighted_score": int(weighted_score),
             "verdict": verdict,
+            "failed_dimensions": failed,
             "dimensions": {
                 "Alignment": a_res,
                 "Liquidity": l_res,
@@ -0,0 +1,136 @@
+import hashlib
+from typing import Any, Dict, List, Sequence, Tuple, Union
+from src.config import config
+from src.utils.tokens import count_tokens, truncate_tokens
+
+# Share of a dimension's token budget per context argument (same proportions
+# as the old per-argument character cuts). Budget left unused by one
+# argument carries over to the next. Arguments not listed here (computed
+# summaries such as insider_activity) are passed through untouched.
+BUDGET_SHARES = {
+    "Alignment": {"mda": 0.67, "insider": 0.33},
+    "Liquidity": {"risk": 0.75, "mda": 0.25},
+    "Performance": {"financials": 1.0},
+    "Horizon": {"business": 0.75, "risk": 0.25},
+    "Action": {"market": 0.75, "news": 0.25},
+}
+
+# Within one argument: chunks retrieved for its own filing sections first,
+# then gap-bridging web results, then the general query's chunks
+SOURCE_ORDER = {"section": 0, "web": 1, "general": 2}
+
+# A context value is either finished text or a list of chunks:
+# {"id", "score", "text", "source"}
+ContextValue = Union[str, List[Dict[str, Any]]]
+
+def chunk_key(chunk: Dict[str, Any]) -> str:
+    # Vector hits carry their point ID; web results are keyed by content
+    if chunk.get("id") is not None:
+        return str(chunk["id"])
+    return "text:" + hashlib.sha256(chunk.get("text", "").encode("utf-8")).hexdigest()
+
+def web_chunks(web_results: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    return [
+        {"id": None, "score": 0.0, "text": f"{w['title']}: {w['snippet']}", "source": "web"}
+        for w in web_results
+    ]
+
+class ContextAssembler:
+    """
+    Packs each dimension's context arguments into an explicit token budget.
+    Chunks are ranked by source and retrieval score and added whole until
+    the budget is spent. pack_report() deduplicates them by ID across every
+    dimension of one report: a chunk several dimensions retrieved (e.g. a
+    general-query hit) is sent in one prompt, not in each of them.
+    """
+
+    def __init__(self, budget: int = None, shares: Dict[str, Dict[str, float]] = None):
+        self.budget = budget or config.CONTEXT_TOKEN_BUDGET
+        self.shares = shares or BUDGET_SHARES
+
+    @staticmethod
+    def _ranked(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(chunks, key=lambda c: (SOURCE_ORDER.get(c.get("source"), 1), -c.get("score", 0.0)))
+
+    @staticmethod
+    def _render(chunks: List[Dict[str, Any]]) -> str:
+        # Same layout as before: filing text, then general context, then web data
+        groups = {}
+        for chunk in chunks:
+            groups.setdefault(chunk.get("source", "section"), []).append(chunk["text"])
+        text = "\n".join(groups.get("section", []))
+        if "general" in groups:
+            text += "\n---\n" + "\n".join(groups["general"])
+        if "web" in groups:
+            text += "\n\n[External Web Data]:\n" + "\n".join(groups["web"])
+        return text.strip()
+
+    def pack_value(self, value: ContextValue, budget: int, seen: set, best_source: Dict[str, int] = None) -> str:
+        """
+        Returns the text for one argument within `budget` tokens. Chunks
+        already in `seen` are skipped; packed chunks are added to it.
+        With `best_source` (chunk key -> best SOURCE_ORDER rank in the
+        report), a chunk is left to the dimension that retrieved it from a
+        better source (its own filing sections rather than the general query).
+        """
+        if isinstance(value, str):
+            return truncate_tokens(value, budget)
+
+        packed, used = [], 0
+        for chunk in self._ranked(value):
+            key = chunk_key(chunk)
+            if key in seen or not chunk.get("text"):
+                continue
+            if best_source and SOURCE_ORDER.get(chunk.get("source"), 1) > best_source.get(key, 0):
+                continue
+            tokens = count_tokens(chunk["text"]) + 1
+            if used + tokens > budget:
+                if packed:
+                    # Skip it; a smaller, lower-ranked chunk may still fit
+                    continue
+                # Never return nothing: cut the top chunk to the budget
+                chunk = dict(chunk, text=truncate_tokens(chunk["text"], budget - 1))
+                tokens = budget
+            seen.add(key)
+            packed.append(chunk)
+            used += tokens
+        return self._render(packed)
+
+    def pack(self, dimension: str, keys: Sequence[str], values: Sequence[ContextValue],
+             seen: set = None, best_source: Dict[str, int] = None) -> List[str]:
+        """
+        Texts for a dimension's arguments, in argument order. Pass a shared
+        `seen` set to dedup across dimensions (see pack_report()).
+        """
+        shares = self.shares.get(dimension, {})
+        seen = set() if seen is None else seen
+        carry = 0
+        texts = []
+        for key, value in zip(keys, values):
+            if key not in shares:
+                texts.append(value if isinstance(value, str) else self._render(value))
+                continue
+            budget = int(self.budget * shares[key]) + carry
+            text = self.pack_value(value, budget, seen, best_source)
+            carry = max(0, budget - count_tokens(text))
+            texts.append(text)
+        return texts
+
+    def pack_report(self, inputs: Dict[str, Tuple[Sequence[str], Sequence[ContextValue]]]) -> Dict[str, List[str]]:
+        """
+        Packs every dimension of one report ({dimension: (keys, values)})
+        with one `seen` set. A chunk goes to a dimension that retrieved it
+        from its best source, and among those to the first one (in `inputs`
+        order) with budget left for it.
+        """
+        best_source = {}
+        for name, (keys, values) in inputs.items():
+            shares = self.shares.get(name, {})
+            for arg, value in zip(keys, values):
+                if arg not in shares or isinstance(value, str):
+                    continue
+                for chunk in value:
+                    key, rank = chunk_key(chunk), SOURCE_ORDER.get(chunk.get("source"), 1)
+                    best_source[key] = min(best_source.get(key, rank), rank)
+        seen = set()
+        return {name: self.pack(name, keys, values, seen, best_source) for name, (keys, values) in inputs.items()}
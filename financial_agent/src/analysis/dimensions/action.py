@@ -1,30 +1,27 @@
-from src.utils.llm import llm_client
+from typing import Dict
+from src.analysis.dimensions.base import DimensionAnalyzer
 
-class ActionAnalyzer:
-    def analyze(self, market_data_text: str, recent_news: str) -> dict:
-        """
-        Analyzes Action: Valuation (P/E, EV/EBITDA), Technicals, Catalysts.
-        """
+class ActionAnalyzer(DimensionAnalyzer):
+    """
+    Analyzes Action: Valuation (P/E, EV/EBITDA), Technicals, Catalysts.
+    """
+
+    def prompts(self, market_data_text: str, recent_news: str) -> Dict[str, str]:
         prompt = f"""
         Provide a Timing/Action assessment:
         - Valuation context (Expensive/Cheap relative to history/peers).
         - Recent price action (if mentioned).
         - Upcoming catalysts (Earnings, Product launches).
         
-        Text: {market_data_text[:3000]} {recent_news[:1000]}
+        Text: {market_data_text} {recent_news}
         """
-        analysis = llm_client.analyze_text(prompt)
-        
-        score_prompt = f"""
+        return {"analysis": prompt}
+
+    def score_prompt(self, analyses: Dict[str, str]) -> str:
+        analysis = analyses["analysis"]
+        return f"""
         Based on: "{analysis}", assign an Action/Timing Score from 0 to 100.
         - Undervalued + Catalysts -> >80
         - Overvalued + No Catalysts -> <40
         Return JSON {{ "score": int, "rationale": str }}
         """
-        score_output = llm_client.specific_extraction(score_prompt, {"score": "int", "rationale": "string"})
-        
-        return {
-            "analysis": analysis,
-            "score": score_output.get("score", 50),
-            "rationale": score_output.get("rationale", "N/A")
-        }
@@ -1,39 +1,54 @@
-from src.utils.llm import llm_client
+from typing import Dict, Any
+from src.analysis.dimensions.base import DimensionAnalyzer
 
-class AlignmentAnalyzer:
-    def analyze(self, mda_text: str, insider_text: str) -> dict:
-        """
-        Analyzes Alignment: Management Sentiment + Insider Trading.
-        """
+class AlignmentAnalyzer(DimensionAnalyzer):
+    """
+    Analyzes Alignment: Management Sentiment + Insider Trading.
+    Sentiment and insider calls are independent; only scoring needs both.
+    When parsed Form 4 data is available (insider_activity), the computed
+    summary replaces the insider LLM call.
+    """
+
+    def precomputed(self, mda_text: str, insider_text: str, insider_activity: str = "") -> Dict[str, str]:
+        if insider_activity:
+            return {"insider": insider_activity}
+        return {}
+
+    def prompts(self, mda_text: str, insider_text: str, insider_activity: str = "") -> Dict[str, str]:
         # 1. Sentiment Analysis
         sentiment_prompt = f"""
         Analyze the tone of the following Management Discussion and Analysis (MD&A) excerpt. 
         Determine if it is Defensive, Neutral, or Confident. 
         Cite 1-2 quotes nicely.
-        Text: {mda_text[:4000]}
+        Text: {mda_text}
         """
-        sentiment_analysis = llm_client.analyze_text(sentiment_prompt)
-        
+
+        if insider_activity:
+            return {"sentiment": sentiment_prompt}
+
         # 2. Insider Trading Analysis
         insider_prompt = f"""
         Summarize the insider trading activity described here. 
         Focus on net buying/selling and CEO/CFO moves.
-        Text: {insider_text[:2000]}
+        Text: {insider_text}
         """
-        insider_analysis = llm_client.analyze_text(insider_prompt)
-        
+        return {"sentiment": sentiment_prompt, "insider": insider_prompt}
+
+    def score_prompt(self, analyses: Dict[str, str]) -> str:
         # 3. Scoring (simplified logic for now)
         # In production, we'd ask the LLM to output a score explicitly.
-        score_prompt = f"""
-        Based on the sentiment: "{sentiment_analysis}" and insider activity: "{insider_analysis}",
+        return f"""
+        Based on the sentiment: "{analyses["sentiment"]}" and insider activity: "{analyses["insider"]}",
         assign an Alignment Score from 0 to 100. return JSON {{ "score": int, "rationale": str }}
         """
-        score_output = llm_client.specific_extraction(score_prompt, {"score": "int", "rationale": "string"})
-        
+
+    def build_result(self, analyses: Dict[str, str], score_output: Dict[str, Any]) -> Dict[str, Any]:
+        sentiment_analysis = analyses["sentiment"]
+        insider_analysis = analyses["insider"]
         return {
             "sentiment": sentiment_analysis,
             "insider": insider_analysis,
-            "score": score_output.get("score", 50),
+            "score": score_output["score"],
             "rationale": score_output.get("rationale", "N/A"),
             "analysis": f"Sentiment: {sentiment_analysis}\n\nInsider Activity: {insider_analysis}"
         }
@@ -0,0 +1,137 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
+from src.config import config
+from src.utils.llm import llm_client, object_schema
+
+SCORE_SCHEMA = {"score": "int", "rationale": "string"}
+
+class DimensionAnalyzer:
+    """
+    One ALPHA dimension: one or more independent analysis prompts, then a
+    scoring prompt over their answers. Subclasses only build the prompts;
+    analyze() runs them on threads, aanalyze() on the event loop.
+    In structured mode the analysis prompts and the scoring rules go out as
+    one Structured Outputs call that returns every answer plus score and
+    rationale, instead of analyze-then-score round trips.
+    Texts arrive already packed to the dimension's token budget
+    (src.analysis.context), so prompts embed them whole.
+    With `on_delta(prompt_name, text)` the analysis answers are streamed
+    as they are generated (text mode only; structured answers are JSON).
+    """
+
+    def __init__(self, concurrent: bool = False, structured: bool = None):
+        # Run independent analysis prompts in parallel (sync path)
+        self.concurrent = concurrent
+        self.structured = config.LLM_STRUCTURED_OUTPUT if structured is None else structured
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__.replace("Analyzer", "").lower()
+
+    def prompts(self, *texts: str) -> Dict[str, str]:
+        """
+        Analysis prompts keyed by the name their answer is stored under.
+        """
+        raise NotImplementedError
+
+    def precomputed(self, *texts: str) -> Dict[str, str]:
+        """
+        Answers that are already known from structured data and need no
+        LLM call, keyed like prompts(). Merged into the analyses before scoring.
+        """
+        return {}
+
+    def score_prompt(self, analyses: Dict[str, str]) -> str:
+        raise NotImplementedError
+
+    @staticmethod
+    def checked_score(score_output: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The scoring answer with its score clamped to 0-100. Raises ValueError
+        when the score is missing or not an integer (e.g. unparseable JSON),
+        so the dimension is reported as failed rather than scored 50.
+        """
+        score = score_output.get("score")
+        if isinstance(score, bool) or not isinstance(score, int):
+            raise ValueError(f"Scoring answer has no integer score: {score_output!r}")
+        return {"score": max(0, min(100, score)), "rationale": score_output.get("rationale", "N/A")}
+
+    def build_result(self, analyses: Dict[str, str], score_output: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "analysis": analyses["analysis"],
+            "score": score_output["score"],
+            "rationale": score_output.get("rationale", "N/A")
+        }
+
+    # Structured mode
+
+    def structured_prompt(self, *texts: str) -> str:
+        """
+        The analysis prompts and the scoring prompt as one request. The
+        scoring prompt is rendered with references to the answer fields.
+        """
+        prompts = self.prompts(*texts)
+        placeholders = {name: f"<your '{name}' answer>" for name in prompts}
+        placeholders.update(self.precomputed(*texts))
+        parts = [f"Task '{name}':{prompt}" for name, prompt in prompts.items()]
+        parts.append(f"Scoring:{self.score_prompt(placeholders)}")
+        parts.append("Answer each task in full in its own field, then give the score and rationale.")
+        return "\n".join(parts)
+
+    def structured_schema(self, *texts: str) -> Dict[str, Any]:
+        properties = {name: {"type": "string"} for name in self.prompts(*texts)}
+        properties["score"] = {"type": "integer"}
+        properties["rationale"] = {"type": "string"}
+        return object_schema(properties)
+
+    def structured_result(self, output: Dict[str, Any], *texts: str) -> Dict[str, Any]:
+        """
+        Maps a structured answer to the same result shape as analyze().
+        """
+        analyses = {name: output[name] for name in self.prompts(*texts)}
+        analyses.update(self.precomputed(*texts))
+        return self.build_result(analyses, self.checked_score(output))
+
+    @staticmethod
+    def _text_call(name: str, on_delta: Callable[[str, str], None] = None) -> Callable[[str], str]:
+        if on_delta is None:
+            return llm_client.analyze_text
+        return lambda prompt: llm_client.stream_text(prompt, on_delta=lambda text: on_delta(name, text))
+
+    def analyze(self, *texts: str, on_delta: Callable[[str, str], None] = None) -> Dict[str, Any]:
+        if self.structured:
+            output = llm_client.structured_completion(self.structured_prompt(*texts), self.name, self.structured_schema(*texts))
+            return self.structured_result(output, *texts)
+
+        prompts = self.prompts(*texts)
+        if self.concurrent and len(prompts) > 1:
+            with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+                futures = {name: executor.submit(self._text_call(name, on_delta), prompt) for name, prompt in prompts.items()}
+                analyses = {name: future.result() for name, future in futures.items()}
+        else:
+            analyses = {name: self._text_call(name, on_delta)(prompt) for name, prompt in prompts.items()}
+        analyses.update(self.precomputed(*texts))
+
+        score_output = llm_client.specific_extraction(self.score_prompt(analyses), SCORE_SCHEMA)
+        return self.build_result(analyses, self.checked_score(score_output))
+
+    async def aanalyze(self, *texts: str, on_delta: Callable[[str, str], None] = None) -> Dict[str, Any]:
+        if self.structured:
+            output = await llm_client.astructured_completion(self.structured_prompt(*texts), self.name, self.structured_schema(*texts))
+            return self.structured_result(output, *texts)
+
+        prompts = self.prompts(*texts)
+        if on_delta is None:
+            calls = [llm_client.aanalyze_text(prompt) for prompt in prompts.values()]
+        else:
+            calls = [
+                llm_client.astream_text(prompt, on_delta=lambda text, name=name: on_delta(name, text))
+                for name, prompt in prompts.items()
+            ]
+        answers = await asyncio.gather(*calls)
+        analyses = dict(zip(prompts.keys(), answers))
+        analyses.update(self.precomputed(*texts))
+
+        score_output = await llm_client.aspecific_extraction(self.score_prompt(analyses), SCORE_SCHEMA)
+        return self.build_result(analyses, self.checked_score(score_output))
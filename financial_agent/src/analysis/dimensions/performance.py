@@ -1,10 +1,31 @@
-from src.utils.llm import llm_client
+from typing import Any, Dict
+from src.utils.tokens import truncate_tokens
+from src.analysis.dimensions.base import DimensionAnalyzer
+
+class PerformanceAnalyzer(DimensionAnalyzer):
+    """
+    Analyzes Performance: Revenue, Margins, Cash Flow.
+    When XBRL metrics are available (financial_metrics), the numbers are
+    not extracted by the LLM; it only reviews the filing text for
+    non-recurring items.
+    """
+
+    def precomputed(self, financial_text: str, financial_metrics: str = "") -> Dict[str, str]:
+        if financial_metrics:
+            return {"metrics": financial_metrics}
+        return {}
+
+    def prompts(self, financial_text: str, financial_metrics: str = "") -> Dict[str, str]:
+        if financial_metrics:
+            prompt = f"""
+            Identify any non-recurring items (impairments, restructuring charges,
+            one-time gains or losses, litigation settlements) in the text below
+            and their approximate impact. Answer "None identified" if there are none.
+
+            Text: {truncate_tokens(financial_text, 500)}
+            """
+            return {"analysis": prompt}
 
-class PerformanceAnalyzer:
-    def analyze(self, financial_text: str) -> dict:
-        """
-        Analyzes Performance: Revenue, Margins, Cash Flow.
-        """
         prompt = f"""
         Extract the following financial metrics from the text if available:
         - Revenue CAGR (approx 5 year or recent)
@@ -12,21 +33,29 @@ class PerformanceAnalyzer:
         - Operating Cash Flow vs Net Income (Ratio)
         - Any non-recurring items
         
-        Text: {financial_text[:4000]}
+        Text: {financial_text}
         """
-        analysis = llm_client.analyze_text(prompt)
-        
-        score_prompt = f"""
+        return {"analysis": prompt}
+
+    def score_prompt(self, analyses: Dict[str, str]) -> str:
+        analysis = self._analysis(analyses)
+        return f"""
         Based on: "{analysis}", assign a Performance Score from 0 to 100.
         Rules: 
         - High margins and CAGR > 20% -> High Score (>80)
         - OCF < Net Income -> Red Flag (Lower Score)
         Return JSON {{ "score": int, "rationale": str }}
         """
-        score_output = llm_client.specific_extraction(score_prompt, {"score": "int", "rationale": "string"})
-        
+
+    @staticmethod
+    def _analysis(analyses: Dict[str, str]) -> str:
+        if "metrics" in analyses:
+            return f"{analyses['metrics']}\nNon-recurring items: {analyses['analysis']}"
+        return analyses["analysis"]
+
+    def build_result(self, analyses: Dict[str, str], score_output: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            "analysis": analysis,
-            "score": score_output.get("score", 50),
+            "analysis": self._analysis(analyses),
+            "score": score_output["score"],
             "rationale": score_output.get("rationale", "N/A")
         }
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Any, Dict, List
+from src.config import config
+from src.analysis.report import save_report
+from src.utils.scheduler import scheduler
+
+def ticker_query(query: str, ticker: str) -> str:
+    """
+    Per-ticker query: "{ticker}" in the query is replaced, otherwise the
+    ticker is prefixed. Without a query a generic outlook question is used.
+    """
+    if not query:
+        return f"{ticker} investment outlook: growth, profitability, risks and valuation"
+    if "{ticker}" in query:
+        return query.replace("{ticker}", ticker)
+    return f"{ticker} {query}"
+
+def rank(results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Highest weighted score first; composite breaks ties
+    return sorted(results.values(), key=lambda r: (r["weighted_score"], r["composite_score"]), reverse=True)
+
+class PortfolioRunner:
+    """
+    Runs the ALPHA research pipeline for a whole watchlist in one process.
+    Every ticker reuses the same QdrantVectorDB (and its loaded models),
+    LLM and web clients, and all their async calls go through the global
+    ResourceScheduler, so N tickers share each service's quota instead of
+    N cold CLI processes each assuming they own it.
+    """
+
+    def __init__(self, pipeline, max_concurrency: int = None):
+        self.pipeline = pipeline
+        self.max_concurrency = max_concurrency or config.PORTFOLIO_MAX_CONCURRENCY
+
+    async def _prefetch_facts(self, tickers: List[str]) -> None:
+        """
+        Downloads SEC companyfacts (EDGAR slot) for tickers that have no
+        XBRL facts yet, so Performance gets computed metrics.
+        """
+        from src.retrieval.facts_store import FactsStore
+        from src.tools.sec_edgar import sec_handler
+
+        store = self.pipeline.facts_store or FactsStore()
+        known = set(store.tickers())
+        missing = [t for t in tickers if t not in known]
+        if not missing:
+            return
+        ciks = await scheduler.run_sync("edgar", sec_handler.get_ciks, missing)
+
+        async def fetch(ticker: str):
+            try:
+                return ticker, await scheduler.run_sync("edgar", sec_handler.get_company_facts, ciks[ticker])
+            except Exception as e:
+                print(f"  [{ticker}] Could not fetch company facts: {e}")
+                return ticker, None
+
+        fetched = await asyncio.gather(*(fetch(t) for t in missing if ciks.get(t)))
+        for ticker, data in fetched:
+            if data:
+                store.add_company(ticker, data)
+        store.save()
+        self.pipeline.facts_store = store
+        print(f"Fetched company facts for {sum(1 for _, d in fetched if d)}/{len(missing)} tickers.")
+
+    async def arun(self, tickers: List[str], query: str = None, fetch_facts: bool = False,
+                   save: bool = True) -> Dict[str, Any]:
+        """
+        Returns {"results": {ticker: result}, "ranked": [...], "failed": {ticker: error},
+        "reports": {ticker: path}, "elapsed_s": float}.
+        """
+        start = time.perf_counter()
+        if fetch_facts:
+            await self._prefetch_facts(tickers)
+
+        gate = asyncio.Semaphore(self.max_concurrency)
+        results, failed, reports = {}, {}, {}
+        done = 0
+
+        async def analyze(ticker: str) -> None:
+            nonlocal done
+            async with gate:
+                try:
+                    result = await self.pipeline.arun(ticker_query(query, ticker), ticker, close=False)
+                    results[ticker] = result
+                    if save:
+                        reports[ticker] = save_report(ticker, result)
+                except Exception as e:
+                    failed[ticker] = str(e)
+                done += 1
+                status = results[ticker]["verdict"] if ticker in results else "FAILED"
+                if results.get(ticker, {}).get("failed_dimensions"):
+                    status += f" ({len(results[ticker]['failed_dimensions'])} dimensions failed)"
+                print(f"[{done}/{len(tickers)}] {ticker}: {status}")
+
+        try:
+            await asyncio.gather(*(analyze(t) for t in tickers))
+        finally:
+            await self.pipeline.aclose()
+
+        return {
+            "results": results,
+            "ranked": rank(results),
+            "failed": failed,
+            "reports": reports,
+            "elapsed_s": time.perf_counter() - start,
+        }
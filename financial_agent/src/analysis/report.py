@@ -0,0 +1,211 @@
+import datetime
+import os
+import threading
+from typing import Dict, Any, List
+from src.config import config
+
+def _analysis_text(data: Dict[str, Any]) -> str:
+    # Ensure 'analysis' key exists or use fallback
+    return data.get('analysis', data.get('details', 'No analysis provided.'))
+
+def _score_text(data: Dict[str, Any]) -> str:
+    # Failed dimensions carry a placeholder score that must not read as a result
+    return "FAILED" if data.get('failed') else f"{data['score']}/100"
+
+def _failed_note(result: Dict[str, Any]) -> str:
+    failed = result.get('failed_dimensions')
+    if not failed:
+        return ""
+    return f"Not scored (analysis failed): {', '.join(failed)}. Scores use the remaining dimensions."
+
+def _print_header(result: Dict[str, Any]) -> None:
+    print("\n" + "="*50)
+    print(f"**ALPHA Composite Score: {result['composite_score']}/100**")
+    print("="*50)
+
+    print("\n**Timing Assessment:** " + result['verdict'])
+    print(f"Weighted Score: {result['weighted_score']}")
+    if _failed_note(result):
+        print(f"WARNING: {_failed_note(result)}")
+
+def _print_section(dim: str, data: Dict[str, Any]) -> None:
+    print(f"\n{dim[0]} - {dim} ({_score_text(data)})")
+    print(f"{_analysis_text(data)[:200]}...")
+    print(f"Rationale: {data.get('rationale', 'No rationale provided.')}")
+
+def print_report(result: Dict[str, Any]) -> None:
+    _print_header(result)
+    for dim, data in result['dimensions'].items():
+        _print_section(dim, data)
+
+def _markdown_title(ticker: str) -> str:
+    md_content = f"# ALPHA Investment Report: {ticker}\n"
+    md_content += f"**Date:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+    return md_content
+
+def _markdown_section(dim: str, data: Dict[str, Any]) -> str:
+    md_content = f"### {dim} ({_score_text(data)})\n"
+    md_content += f"{_analysis_text(data)}\n\n"
+    md_content += f"**Rationale:** {data.get('rationale', 'N/A')}\n\n"
+    md_content += "---\n"
+    return md_content
+
+def render_markdown(ticker: str, result: Dict[str, Any]) -> str:
+    md_content = _markdown_title(ticker)
+    md_content += f"## Verdict: {result['verdict']}\n"
+    md_content += f"**Composite Score:** {result['composite_score']}/100\n"
+    md_content += f"**Weighted Score:** {result['weighted_score']}\n\n"
+    if _failed_note(result):
+        md_content += f"> **Warning:** {_failed_note(result)}\n\n"
+    md_content += "---\n\n"
+
+    for dim, data in result['dimensions'].items():
+        md_content += _markdown_section(dim, data)
+    return md_content
+
+def _report_filename(ticker: str, reports_dir: str = None) -> str:
+    reports_dir = reports_dir or config.REPORTS_DIR
+    os.makedirs(reports_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{reports_dir}/{ticker}_{timestamp}.md"
+
+def save_report(ticker: str, result: Dict[str, Any], reports_dir: str = None) -> str:
+    """
+    Writes the markdown report to reports/<TICKER>_<timestamp>.md and returns its path.
+    """
+    filename = _report_filename(ticker, reports_dir)
+
+    with open(filename, "w") as f:
+        f.write(render_markdown(ticker, result))
+    return filename
+
+class ReportWriter:
+    """
+    Writes one ticker's report while the analysis runs. Each dimension's
+    section is appended to the reports/ file and printed as soon as that
+    dimension is scored; the composite score and verdict come last, when
+    finish() rewrites the file in the usual layout.
+
+    Streamed analysis text (on_delta) is printed live for one dimension
+    prompt at a time, so parallel streams never interleave on the terminal;
+    the others show up as whole sections when their dimension finishes
+    (held back until the live dimension is done, so they don't cut into it).
+
+        writer = ReportWriter(ticker)
+        result = pipeline.run(query, ticker, writer.on_dimension, writer.on_delta)
+        path = writer.finish(result)
+    """
+
+    def __init__(self, ticker: str, reports_dir: str = None, echo: bool = True):
+        self.ticker = ticker
+        self.echo = echo
+        self.filename = _report_filename(ticker, reports_dir)
+        self.done = {}
+        self._streams = {}  # (dimension, prompt) -> text received so far
+        self._live = None   # The stream currently printed to the terminal
+        self._held = []     # Finished sections waiting for the live dimension
+        self._lock = threading.Lock()
+        with open(self.filename, "w") as f:
+            f.write(_markdown_title(ticker))
+            f.write("## Verdict: pending\n")
+            f.write("_Dimensions are added below as they finish; the scores and verdict come last._\n\n")
+            f.write("---\n\n")
+        if self.echo:
+            print(f"Writing report to {self.filename} as dimensions finish...")
+
+    def on_delta(self, dimension: str, prompt: str, text: str) -> None:
+        key = (dimension, prompt)
+        with self._lock:
+            self._streams[key] = self._streams.get(key, "") + text
+            if not self.echo or dimension in self.done:
+                return
+            if self._live is None:
+                # Take over the terminal, catching up on what was already received
+                self._live = key
+                print(f"\n{dimension[0]} - {dimension} [{prompt}, streaming]")
+                print(self._streams[key], end="", flush=True)
+            elif self._live == key:
+                print(text, end="", flush=True)
+
+    def on_dimension(self, dimension: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.done[dimension] = result
+            with open(self.filename, "a") as f:
+                f.write(_markdown_section(dimension, result))
+
+            streamed = None
+            if self._live is not None and self._live[0] == dimension:
+                streamed = self._streams[self._live]
+                self._live = None
+                print()
+            self._streams = {key: text for key, text in self._streams.items() if key[0] != dimension}
+            if not self.echo:
+                return
+            if self._live is not None:
+                self._held.append((dimension, result))
+                return
+            if streamed is not None and streamed.strip() == _analysis_text(result).strip():
+                # The analysis is already on screen; only the score is new
+                print(f"{dimension} ({_score_text(result)})")
+                print(f"Rationale: {result.get('rationale', 'No rationale provided.')}")
+            else:
+                _print_section(dimension, result)
+            self._print_held()
+
+    def _print_held(self) -> None:
+        for dimension, result in self._held:
+            _print_section(dimension, result)
+        self._held = []
+
+    def finish(self, result: Dict[str, Any]) -> str:
+        """
+        Rewrites the file with the verdict block on top and the sections in
+        dimension order, prints the verdict block and returns the path.
+        """
+        tmp_path = self.filename + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(render_markdown(self.ticker, result))
+        os.replace(tmp_path, self.filename)
+        if self.echo:
+            with self._lock:
+                if self._live is not None:
+                    self._live = None
+                    print()
+                self._print_held()
+            _print_header(result)
+        return self.filename
+
+DIMENSION_ORDER = ["Alignment", "Liquidity", "Performance", "Horizon", "Action"]
+
+def render_summary(ranked: List[Dict[str, Any]], failed: Dict[str, str] = None) -> str:
+    """
+    Markdown table of a portfolio run, best weighted score first.
+    """
+    md_content = "# ALPHA Portfolio Summary\n"
+    md_content += f"**Date:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+    md_content += f"**Tickers:** {len(ranked) + len(failed or {})} ({len(failed or {})} failed)\n\n"
+    md_content += "| Rank | Ticker | Verdict | Weighted | Composite | " + " | ".join(DIMENSION_ORDER) + " |\n"
+    md_content += "|---:|---|---|---:|---:|" + "---:|" * len(DIMENSION_ORDER) + "\n"
+    for i, result in enumerate(ranked, 1):
+        scores = " | ".join("ERR" if result["dimensions"][d].get("failed") else str(result["dimensions"][d]["score"])
+                            for d in DIMENSION_ORDER)
+        md_content += (f"| {i} | {result['ticker']} | {result['verdict']} | {result['weighted_score']} | "
+                       f"{result['composite_score']} | {scores} |\n")
+    if failed:
+        md_content += "\n## Failed\n"
+        for ticker, error in failed.items():
+            md_content += f"- **{ticker}**: {error}\n"
+    return md_content
+
+def save_summary(ranked: List[Dict[str, Any]], failed: Dict[str, str] = None, reports_dir: str = None) -> str:
+    """
+    Writes reports/portfolio_<timestamp>.md and returns its path.
+    """
+    reports_dir = reports_dir or config.REPORTS_DIR
+    os.makedirs(reports_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{reports_dir}/portfolio_{timestamp}.md"
+
+    with open(filename, "w") as f:
+        f.write(render_summary(ranked, failed))
+    return filename
@@ -0,0 +1,254 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+from src.retrieval.facts_store import FactsStore
+from src.retrieval.insider_store import InsiderStore
+from src.analysis.alpha_engine import OnDelta, OnDimension
+from src.analysis.context import web_chunks
+from src.tools.web_search import web_search_tool
+from src.utils.llm import llm_client
+
+# Dimension context comes from the matching 10-K/10-Q sections (payload
+# filter on the Item tags written at ingestion) with a short topical query.
+DIMENSION_SECTIONS = {
+    "mda": ["mda"],
+    "risk": ["risk_factors", "market_risk"],
+    "financials": ["financial_statements"],
+    "business": ["business"],
+    "insider": ["security_ownership", "executive_compensation"],
+    "market": ["market_for_equity"]
+}
+DIMENSION_TOPICS = {
+    "mda": "results of operations revenue margins liquidity outlook",
+    "risk": "key risks regulatory competition macroeconomic",
+    "financials": "revenue operating income net income cash flows",
+    "business": "strategy products segments competition",
+    "insider": "beneficial ownership officers directors",
+    "market": "share repurchases dividends holders stock price"
+}
+
+def fallback_queries(ticker: str) -> Dict[str, str]:
+    """
+    Semantic fallback for documents indexed before section tagging.
+    """
+    return {
+        "mda": f"{ticker} Item 7 Management's Discussion and Analysis of Financial Condition and Results of Operations MD&A",
+        "risk": f"{ticker} Item 1A Risk Factors market risks regulatory challenges competition",
+        "financials": f"{ticker} Item 8 Financial Statements consolidated balance sheets income statement cash flows notes",
+        "business": f"{ticker} Item 1 Business overview strategy products segments competition",
+        "insider": f"{ticker} Item 12 Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters",
+        "market": f"{ticker} Item 5 Market for Registrant’s Common Equity Related Stockholder Matters and Issuer Purchases of Equity Securities"
+    }
+
+def bridge_queries(ticker: str) -> Dict[str, str]:
+    """
+    Targeted web searches that fill gaps filings don't cover.
+    """
+    return {
+        "financials": f"{ticker} revenue growth last 5 years operating margin vs peers",
+        "risk": f"{ticker} current macroeconomic headwinds interest rate sensitivity",
+        "market": f"{ticker} analyst ratings price targets"
+    }
+
+def news_query(ticker: str) -> str:
+    return f"{ticker} stock price valuation news"
+
+def chunk(hit: Dict[str, Any], source: str) -> Dict[str, Any]:
+    return {"id": hit.get("id"), "score": hit.get("score", 0.0), "text": hit.get("text", ""), "source": source}
+
+class ResearchPipeline:
+    """
+    Query path for one ticker: retrieval -> gap-bridging web search -> ALPHA analysis.
+
+    run() executes the steps one after another.
+    arun() is the asyncio orchestrator: retrieval, every Tavily call and each
+    dimension's LLM calls start as soon as their own inputs are ready, so a
+    report takes max(retrieval, web search) plus the slowest dimension chain
+    instead of the sum of every step. Both build the same context and report.
+    """
+
+    def __init__(self, vector_db, alpha_engine, web_search=None, insider_store: InsiderStore = None,
+                 facts_store: FactsStore = None):
+        self.vector_db = vector_db
+        self.alpha_engine = alpha_engine
+        self.web_search = web_search or web_search_tool
+        self.insider_store = insider_store
+        self.facts_store = facts_store
+
+    def insider_activity(self, ticker: str) -> str:
+        """
+        Computed Form 4 summary for the Alignment dimension, or "" when no
+        transactions were ingested for the ticker (the LLM then reads the
+        filing's ownership sections instead).
+        """
+        if self.insider_store is None:
+            self.insider_store = InsiderStore()
+        summary = self.insider_store.summary(ticker)
+        if not summary["transactions"]:
+            return ""
+        return InsiderStore.format_summary(summary)
+
+    def financial_metrics(self, ticker: str) -> str:
+        """
+        Computed XBRL metrics for the Performance dimension, or "" when no
+        company facts were ingested for the ticker.
+        """
+        if self.facts_store is None:
+            self.facts_store = FactsStore()
+        metrics = self.facts_store.compute_metrics([ticker]).get(ticker.upper())
+        if not metrics:
+            return ""
+        return FactsStore.format_metrics(metrics)
+
+    # Retrieval
+
+    def _retrieval_batch(self, query: str, ticker: str) -> Tuple[List[str], List[int], List[Any]]:
+        # The general query and all dimension queries go out as one batch:
+        # one embedding pass per model and a single Qdrant round trip.
+        queries = [query] + [f"{ticker} {DIMENSION_TOPICS[key]}" for key in DIMENSION_SECTIONS]
+        limits = [10] + [3] * len(DIMENSION_SECTIONS)
+        filters = [None] + [self.vector_db.build_filter(sections=sections) for sections in DIMENSION_SECTIONS.values()]
+        return queries, limits, filters
+
+    def retrieve(self, query: str, ticker: str) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Returns (general results, results per dimension context key).
+        Everything is restricted to the ticker's chunks (and shard).
+        """
+        batch_results = self.vector_db.search_batch(*self._retrieval_batch(query, ticker), ticker=ticker)
+        dimension_results = dict(zip(DIMENSION_SECTIONS.keys(), batch_results[1:]))
+
+        missing = [key for key, res in dimension_results.items() if not res]
+        if missing:
+            print(f"  [DEBUG] No section-tagged chunks for {', '.join(missing)}; falling back to semantic search.")
+            queries = fallback_queries(ticker)
+            fallback_results = self.vector_db.search_batch([queries[key] for key in missing], 3, ticker=ticker)
+            dimension_results.update(zip(missing, fallback_results))
+        return batch_results[0], dimension_results
+
+    async def aretrieve(self, query: str, ticker: str) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        batch_results = await self.vector_db.asearch_batch(*self._retrieval_batch(query, ticker), ticker=ticker)
+        dimension_results = dict(zip(DIMENSION_SECTIONS.keys(), batch_results[1:]))
+
+        missing = [key for key, res in dimension_results.items() if not res]
+        if missing:
+            print(f"  [DEBUG] No section-tagged chunks for {', '.join(missing)}; falling back to semantic search.")
+            queries = fallback_queries(ticker)
+            fallback_results = await self.vector_db.asearch_batch([queries[key] for key in missing], 3, ticker=ticker)
+            dimension_results.update(zip(missing, fallback_results))
+        return batch_results[0], dimension_results
+
+    @staticmethod
+    def build_context(general_results: List[Dict[str, Any]], dimension_results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Logs the hits and returns the candidate chunks per dimension context
+        key: its own section hits plus the general query's hits. The
+        ContextAssembler later dedups, ranks and packs them per dimension.
+        """
+        print(f"  [DEBUG] General Search Results found: {len(general_results)}")
+        for i, r in enumerate(general_results):
+            print(f"    - {i+1} [Score: {r['score']:.4f}] {r['text'][:100].replace(chr(10), ' ')}...")
+
+        general_chunks = [chunk(r, "general") for r in general_results]
+
+        doc_context = {}
+        for key, res in dimension_results.items():
+            print(f"  [DEBUG] Dimension '{key}' Search Results found: {len(res)}")
+            for i, r in enumerate(res):
+                print(f"    - {i+1} [Score: {r['score']:.4f}] {r['text'][:100].replace(chr(10), ' ')}...")
+
+            # Enrich dimension context with relevant general context
+            doc_context[key] = [chunk(r, "section") for r in res] + general_chunks
+        return doc_context
+
+    # Pipelines
+
+    def run(self, query: str, ticker: str, on_dimension: OnDimension = None, on_delta: OnDelta = None) -> Dict[str, Any]:
+        """
+        on_dimension / on_delta are passed to the ALPHA engine (progressive report output).
+        """
+        start = time.perf_counter()
+
+        # 2. Retrieve Context
+        print("Retrieving context...")
+        doc_context = self.build_context(*self.retrieve(query, ticker))
+
+        # Gap Bridging: targeted web searches for missing data, plus live
+        # market data for 'market' and 'news', sent together as one batch
+        print("Bridging data gaps and fetching live market data (Web Search)...")
+        bridges = bridge_queries(ticker)
+        web_results = self.web_search.search_many(list(bridges.values()) + [news_query(ticker)])
+        for key, results in zip(bridges, web_results):
+            if key in doc_context:
+                doc_context[key] += web_chunks(results)
+
+        # News is Action's second input, so it is no longer repeated inside 'market'
+        doc_context["news"] = web_chunks(web_results[-1])
+        doc_context["insider_activity"] = self.insider_activity(ticker)
+        doc_context["financial_metrics"] = self.financial_metrics(ticker)
+
+        # 3. Analyze
+        print("Analyzing dimensions...")
+        result = self.alpha_engine.analyze(ticker, doc_context, on_dimension, on_delta)
+        print(f"Report pipeline finished in {time.perf_counter() - start:.1f}s.")
+        return result
+
+    async def aclose(self) -> None:
+        # Async clients are bound to this event loop
+        await asyncio.gather(
+            llm_client.aclose(), self.web_search.aclose(), self.vector_db.aclose(),
+            return_exceptions=True
+        )
+
+    async def arun(self, query: str, ticker: str, close: bool = True,
+                   on_dimension: OnDimension = None, on_delta: OnDelta = None) -> Dict[str, Any]:
+        """
+        close=False keeps the shared async clients open for other tickers
+        running on the same loop (portfolio mode); call aclose() at the end.
+        """
+        start = time.perf_counter()
+        print("Retrieving context, bridging data gaps and fetching live market data concurrently...")
+
+        # Every independent I/O starts right away
+        retrieval = asyncio.create_task(self.aretrieve(query, ticker))
+        bridges = {key: asyncio.create_task(self.web_search.asearch(q)) for key, q in bridge_queries(ticker).items()}
+        news = asyncio.create_task(self.web_search.asearch(news_query(ticker)))
+
+        async def retrieved_context():
+            return self.build_context(*(await retrieval))
+        base_context = asyncio.create_task(retrieved_context())
+
+        async def context_for(key: str):
+            # Same composition as run(): filing chunks plus bridge results
+            if key == "news":
+                return web_chunks(await news)
+            if key == "insider_activity":
+                return self.insider_activity(ticker)
+            if key == "financial_metrics":
+                return self.financial_metrics(ticker)
+            doc_context = await base_context
+            if key not in doc_context:
+                return ""
+            chunks = list(doc_context[key])
+            if key in bridges:
+                try:
+                    chunks += web_chunks(await bridges[key])
+                except Exception as e:
+                    print(f"Bridge search failed for {key}: {e}")
+            return chunks
+
+        # One shared task per context key; dimensions await only the keys they read
+        contexts = {}
+        def get_context(key: str):
+            if key not in contexts:
+                contexts[key] = asyncio.create_task(context_for(key))
+            return contexts[key]
+
+        try:
+            print("Analyzing dimensions...")
+            result = await self.alpha_engine.aanalyze(ticker, get_context, on_dimension, on_delta)
+        finally:
+            if close:
+                await self.aclose()
+        print(f"Report pipeline finished in {time.perf_counter() - start:.1f}s.")
+        return result
@@ -8,6 +8,9 @@ class Config:
     QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY") # None by default
+    # Custom sharding with one shard key per ticker (only applies when the collection is created)
+    QDRANT_SHARD_BY_TICKER = os.getenv("QDRANT_SHARD_BY_TICKER", "False").lower() in ("true", "1", "yes")
+    QDRANT_SHARDS_PER_KEY = int(os.getenv("QDRANT_SHARDS_PER_KEY", 1))
     
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -16,9 +19,20 @@ class Config:
     REDIS_SSL = os.getenv("REDIS_SSL", "False").lower() in ("true", "1", "yes")
     REDIS_URL = os.getenv("REDIS_URL") # Optional: Overrides individual settings
     TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+    TAVILY_TIMEOUT = float(os.getenv("TAVILY_TIMEOUT", 20)) # Seconds
+    TAVILY_MAX_RETRIES = int(os.getenv("TAVILY_MAX_RETRIES", 3))
+    TAVILY_BACKOFF = float(os.getenv("TAVILY_BACKOFF", 0.5)) # Base backoff in seconds
+    TAVILY_MAX_WORKERS = int(os.getenv("TAVILY_MAX_WORKERS", 4)) # Concurrent searches in search_many
+    TAVILY_MAX_RPS = float(os.getenv("TAVILY_MAX_RPS", 2)) # Async searches per second, shared by all tickers (0 = unlimited)
     
     # SEC
     SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", "FinancialResearchAgent contact@example.com")
+    SEC_TICKER_MAP_REFRESH = float(os.getenv("SEC_TICKER_MAP_REFRESH", 24 * 3600)) # Seconds before company_tickers.json is re-downloaded
+    SEC_MAX_RPS = float(os.getenv("SEC_MAX_RPS", 8)) # At most 9: a 1-request burst + 9/s stays within SEC's 10 requests/second (0 = unlimited)
+    SEC_MAX_WORKERS = int(os.getenv("SEC_MAX_WORKERS", 8))
+    SEC_MAX_RETRIES = int(os.getenv("SEC_MAX_RETRIES", 4))
+    SEC_BACKOFF = float(os.getenv("SEC_BACKOFF", 0.5)) # Base backoff in seconds
+    SEC_TIMEOUT = float(os.getenv("SEC_TIMEOUT", 30))
     
     # Model details
     EMBEDDING_MODEL = "text-embedding-3-small"
@@ -26,9 +40,102 @@ class Config:
     
     # Retrieval
     MIN_RETRIEVAL_SCORE = 0.7
+    RETRIEVAL_PROFILE = os.getenv("RETRIEVAL_PROFILE", "colbert") # dense | dense_bm25 | colbert
+    QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none") # none | scalar | binary
+    QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "False").lower() in ("true", "1", "yes")
+    
+    # Embedding / ingestion throughput
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64)) # Chunks per embed + upload batch
+    EMBED_MODEL_BATCH_SIZE = int(os.getenv("EMBED_MODEL_BATCH_SIZE", 32)) # ONNX inference batch inside fastembed
+    # fastembed data-parallel worker processes: unset = in-process, 0 = one per core
+    EMBED_PARALLEL = int(os.getenv("EMBED_PARALLEL")) if os.getenv("EMBED_PARALLEL") else None
+    EMBED_THREADS = int(os.getenv("EMBED_THREADS")) if os.getenv("EMBED_THREADS") else None # ONNX threads per model
+    # Processes extracting PDF pages in batch (--dir) ingestion
+    INGEST_PROCESS_WORKERS = int(os.getenv("INGEST_PROCESS_WORKERS", os.cpu_count() or 1))
+    
+    # Analysis
+    # Run independent ALPHA dimensions (and their independent sub-calls) in parallel
+    ALPHA_CONCURRENT = os.getenv("ALPHA_CONCURRENT", "True").lower() in ("true", "1", "yes")
+    ALPHA_MAX_WORKERS = int(os.getenv("ALPHA_MAX_WORKERS", 5))
+    # One Structured Outputs call per dimension (analysis + score + rationale); False = analyze, then score
+    LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "True").lower() in ("true", "1", "yes")
+    # Score all five dimensions in a single structured call (fewest round trips, one long prompt)
+    ALPHA_COMBINED_CALL = os.getenv("ALPHA_COMBINED_CALL", "False").lower() in ("true", "1", "yes")
+    # Stream analysis text to the terminal as it is generated (text mode, LLM_STRUCTURED_OUTPUT=False);
+    # finished dimension sections are always printed and written as soon as they are scored
+    LLM_STREAM_OUTPUT = os.getenv("LLM_STREAM_OUTPUT", "True").lower() in ("true", "1", "yes")
+    
+    # Portfolio mode (--tickers / watchlist): one process, shared clients and a
+    # global per-service scheduler for the async calls of every ticker
+    PORTFOLIO_MAX_CONCURRENCY = int(os.getenv("PORTFOLIO_MAX_CONCURRENCY", 8)) # Tickers analyzed at once
+    QDRANT_MAX_CONCURRENCY = int(os.getenv("QDRANT_MAX_CONCURRENCY", 8))
+    
+    # Shared OpenAI limiter (text, structured and Vision calls, sync and async):
+    # set RPM/TPM to your account's tier limits to run at the top of the quota
+    OPENAI_RPM = float(os.getenv("OPENAI_RPM", 500)) # Requests per minute, 0 = unlimited
+    OPENAI_TPM = float(os.getenv("OPENAI_TPM", 30000)) # Tokens per minute (prompt + completion), 0 = unlimited
+    OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16)) # Ceiling; halved on each 429, regrown +1 per window of successes
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 5)) # 429 / timeout / 5xx retries per call
+    OPENAI_BACKOFF = float(os.getenv("OPENAI_BACKOFF", 1.0)) # Seconds; jittered exponential, at least Retry-After
+    VISION_MAX_WORKERS = int(os.getenv("VISION_MAX_WORKERS", 16)) # Threads submitting image descriptions during ingest
+    
+    # asyncio query pipeline (overlaps retrieval, web search and LLM calls); False = sequential steps
+    ASYNC_QUERY_PIPELINE = os.getenv("ASYNC_QUERY_PIPELINE", "True").lower() in ("true", "1", "yes")
+    # Retrieved context per dimension prompt (deduplicated chunks, ranked by score), in tokens
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
     
     # Paths
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, "../data")
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(DATA_DIR, "cache"))
+    REPORTS_DIR = os.path.normpath(os.path.join(BASE_DIR, "../reports"))
+    
+    # LLM response cache (calls are deterministic at temperature=0)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "False").lower() in ("true", "1", "yes") # Skip lookups, still store
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)) # Seconds
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))
+    LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.sqlite")
+    SEC_TICKER_MAP_PATH = os.path.join(CACHE_DIR, "company_tickers.json")
+    
+    # Local PDF images sent to GPT-4o Vision
+    VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "True").lower() in ("true", "1", "yes") # Descriptions keyed by image hash
+    VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", 20000))
+    VISION_MAX_IMAGE_SIDE = int(os.getenv("VISION_MAX_IMAGE_SIDE", 1536)) # Pixels; larger images are downscaled, 0 = send as is
+    VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", 85))
+    
+    # Retrieval caches: query embeddings (memory LRU + optional disk) and search
+    # results (keyed by query, filters and the collection's ingest generation)
+    QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", 1024)) # In-memory entries per model, 0 = off
+    QUERY_EMBED_DISK_CACHE = os.getenv("QUERY_EMBED_DISK_CACHE", "True").lower() in ("true", "1", "yes")
+    QUERY_EMBED_DISK_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBED_DISK_CACHE_MAX_ENTRIES", 5000))
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 7 * 24 * 3600)) # Seconds; also covers ingests from other machines
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 5000))
+    RETRIEVAL_CACHE_PATH = os.path.join(CACHE_DIR, "retrieval_cache.sqlite")
+    
+    # Tavily result cache (keyed by normalized query, search depth and result count)
+    WEB_SEARCH_CACHE_ENABLED = os.getenv("WEB_SEARCH_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", 3600)) # Seconds; web results go stale quickly
+    WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", 5000))
+    WEB_SEARCH_CACHE_PATH = os.path.join(CACHE_DIR, "web_search_cache.sqlite")
+    
+    # Form 4 insider transactions (parsed XML, columnar store)
+    INSIDER_STORE_PATH = os.getenv("INSIDER_STORE_PATH", os.path.join(DATA_DIR, "insider", "transactions.npz"))
+    INSIDER_WINDOW_DAYS = int(os.getenv("INSIDER_WINDOW_DAYS", 180)) # Look-back for the Alignment summary
+    FORM4_MAX_FILINGS = int(os.getenv("FORM4_MAX_FILINGS", 100)) # Most recent Form 4 filings fetched per ticker
+    
+    # XBRL company facts (SEC companyfacts JSON, columnar store) for the Performance dimension
+    FACTS_STORE_PATH = os.getenv("FACTS_STORE_PATH", os.path.join(DATA_DIR, "xbrl", "companyfacts.npz"))
+    METRICS_CAGR_YEARS = int(os.getenv("METRICS_CAGR_YEARS", 5)) # Revenue CAGR window (fiscal years)
+    
+    # Local BM25 index over data/corpus (numpy inverted index, synced with the corpus files)
+    # qdrant = vector search; bm25 = lexical search on the local index only (no Qdrant, no query embeddings)
+    RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "qdrant").lower()
+    BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join(DATA_DIR, "bm25", "index.npz"))
+    BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+    BM25_B = float(os.getenv("BM25_B", 0.75))
+    # Narrow unfiltered vector searches to the top-N BM25 chunks of the ticker (0 = off)
+    BM25_PREFILTER_CANDIDATES = int(os.getenv("BM25_PREFILTER_CANDIDATES", 0))
 
 config = Config()
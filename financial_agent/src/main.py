@@ -10,175 +10,379 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config import config
-from src.tools.sec_edgar import sec_handler
-from src.analysis.alpha_engine import AlphaEngine
-from src.utils.memory import RedisMemory
-from src.retrieval.ingestion import IngestionEngine
-from src.retrieval.vector_db import QdrantVectorDB
+
+# Heavy modules (qdrant/fastembed, openai, redis, langchain, fitz, bs4) are
+# imported inside the code paths that need them, so `--help` and argument
+# errors return immediately and an ingest that fails at CIK lookup never
+# loads the embedding models.
+
+def read_tickers_file(path: str) -> list:
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            # Allow blank lines and '#' comments
+            ticker = line.split("#", 1)[0].strip().upper()
+            if ticker and ticker not in tickers:
+                tickers.append(ticker)
+    return tickers
+
+def cli_tickers(args) -> list:
+    # --tickers A,B,C wins over --tickers-file
+    if args.tickers:
+        return list(dict.fromkeys(t.strip().upper() for t in args.tickers.split(",") if t.strip()))
+    return read_tickers_file(args.tickers_file)
+
+def build_retriever():
+    """
+    Search backend for query runs: the local BM25 index alone
+    (RETRIEVAL_BACKEND=bm25: no Qdrant, no embedding models) or Qdrant,
+    optionally narrowed by BM25 candidates (BM25_PREFILTER_CANDIDATES).
+    """
+    if config.RETRIEVAL_BACKEND == "bm25":
+        from src.retrieval.bm25_index import BM25Index
+        return BM25Index.from_corpus()
+    from src.retrieval.vector_db import QdrantVectorDB
+    prefilter = None
+    if config.BM25_PREFILTER_CANDIDATES > 0:
+        from src.retrieval.bm25_index import BM25Index
+        prefilter = BM25Index.from_corpus()
+    return QdrantVectorDB(prefilter=prefilter)
+
+def sync_bm25_index():
+    # Re-index the corpus files this ingest rewrote (unchanged tickers are skipped)
+    from src.retrieval.bm25_index import BM25Index
+    try:
+        BM25Index.from_corpus()
+    except Exception as e:
+        print(f"Warning: could not update the BM25 index: {e}")
+
+def run_bulk_ingest(args):
+    """
+    Fetches the latest filings for every ticker/form type concurrently,
+    then chunks and indexes them with a single QdrantVectorDB.
+    """
+    from src.tools.sec_edgar import sec_handler
+    from src.retrieval.ingestion import IngestionEngine
+    
+    tickers = cli_tickers(args)
+    form_types = [t.strip() for t in args.type.split(",") if t.strip()]
+    print(f"Bulk ingesting {len(tickers)} tickers (Types: {', '.join(form_types)}, Year: {args.year})...")
+    
+    filings = sec_handler.fetch_filings(tickers, form_types, max_workers=args.workers)
+    
+    failed = {key: text for key, text in filings.items() if text.startswith("Error")}
+    for (ticker, form_type), error in failed.items():
+        print(f"  [{ticker} {form_type}] {error}")
+    fetched = [(key, text) for key, text in filings.items() if key not in failed]
+    if not fetched:
+        print("Nothing to ingest.")
+        return
+    
+    from src.retrieval.vector_db import QdrantVectorDB
+    from src.retrieval.pipeline import StreamingIngestionPipeline
+    vector_db = QdrantVectorDB()
+    pipeline = StreamingIngestionPipeline(vector_db, IngestionEngine())
+    
+    for (ticker, form_type), text in fetched:
+        stats = pipeline.run(ticker, form_type, text, year=args.year,
+                             incremental=args.incremental, prune=args.prune)
+        print(f"[{ticker} {form_type}] Created {stats['chunks']} chunks ({stats['uploaded']} uploaded, {stats['chunks_per_s']:.1f} chunks/s).")
+    
+    sync_bm25_index()
+    print(f"Bulk ingestion complete: {len(fetched)} filings indexed, {len(failed)} failed.")
+
+def resolve_input_files(spec: str, extension: str = ".pdf") -> list:
+    """
+    Files with the extension in a directory or matching a glob pattern, sorted.
+    """
+    import glob
+    pattern = os.path.join(spec, "*") if os.path.isdir(spec) else spec
+    return sorted(
+        path for path in glob.glob(pattern)
+        if os.path.isfile(path) and path.lower().endswith(extension)
+    )
+
+def run_dir_ingest(args):
+    """
+    Ingests every local PDF matched by --dir in one run: pages are extracted
+    on a process pool across files and all files feed one shared
+    chunk/embed/upsert pipeline, so the CLI and models start once.
+    """
+    from src.retrieval.file_loader import file_loader
+    from src.retrieval.ingestion import IngestionEngine
+    
+    files = resolve_input_files(args.dir)
+    if not files:
+        print(f"No files match: {args.dir}")
+        return
+    print(f"Batch ingesting {len(files)} files for {args.ticker} (Year: {args.year}, Type: {args.type})...")
+    
+    from src.retrieval.vector_db import QdrantVectorDB
+    from src.retrieval.pipeline import StreamingIngestionPipeline
+    vector_db = QdrantVectorDB()
+    pipeline = StreamingIngestionPipeline(vector_db, IngestionEngine())
+    
+    documents = (
+        {"ticker": args.ticker, "doc_type": args.type, "content": blocks, "year": args.year, "source_url": path}
+        for path, blocks in file_loader.iter_files(files, workers=args.workers)
+    )
+    stats = pipeline.run_many(documents, incremental=args.incremental, prune=args.prune)
+    for doc in stats["documents"]:
+        print(f"  [{os.path.basename(doc['source'])}] {doc['chunks']} chunks")
+    print(f"Created {stats['chunks']} chunks from {len(stats['documents'])} files ({stats['uploaded']} uploaded, "
+          f"{stats['skipped']} already indexed) in {stats['elapsed_s']:.1f}s ({stats['chunks_per_s']:.1f} chunks/s).")
+    sync_bm25_index()
+    print("Batch ingestion complete.")
+
+def is_form4_xml_ingest(args) -> bool:
+    # Form 4 filings are parsed structurally from their XML (EDGAR, or local
+    # .xml files); local Form 4 PDFs still go through the text pipeline.
+    if args.type.upper() not in ("4", "4/A"):
+        return False
+    if args.file:
+        return args.file.lower().endswith(".xml")
+    if args.dir:
+        return bool(resolve_input_files(args.dir, ".xml")) and not resolve_input_files(args.dir)
+    return True
+
+def run_form4_ingest(args):
+    """
+    Parses Form 4 ownershipDocument XML into the local insider transaction
+    store (nothing is embedded). Sources: --file/--dir .xml files, otherwise
+    the ticker's most recent Form 4 filings on EDGAR.
+    """
+    from src.tools.form4 import parse_form4
+    from src.retrieval.insider_store import InsiderStore
+    
+    store = InsiderStore()
+    if args.file or args.dir:
+        files = [args.file] if args.file else resolve_input_files(args.dir, ".xml")
+        filings = []
+        for path in files:
+            if not os.path.exists(path):
+                print(f"File not found: {path}")
+                continue
+            # Local files have no accession number; the file name is the dedup key
+            accession = f"file:{os.path.basename(path)}"
+            if not store.has_accession(accession):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    filings.append((accession, f.read()))
+    else:
+        from src.tools.sec_edgar import sec_handler
+        skip = store.accessions()
+        filings = sec_handler.fetch_form4_xml(args.ticker, skip=skip, max_workers=args.workers)
+    
+    added = 0
+    for accession, xml_text in filings:
+        try:
+            records = parse_form4(xml_text, accession=accession)
+        except Exception as e:
+            print(f"  [{accession}] Could not parse Form 4: {e}")
+            continue
+        # Fall back to the CLI ticker when the filing omits the trading symbol
+        records = [r if r.ticker else r._replace(ticker=args.ticker.upper()) for r in records]
+        added += store.add(records)
+        # Holdings-only filings have no transactions; don't download them again
+        store.mark_processed(accession)
+    store.save()
+    print(f"Parsed {len(filings)} Form 4 filings: {added} transactions added ({len(store)} in store).")
+    
+    summary = store.summary(args.ticker)
+    print(InsiderStore.format_summary(summary))
+    print("Form 4 ingestion complete.")
+
+def is_facts_ingest(args) -> bool:
+    return args.type.lower() in ("companyfacts", "xbrl")
+
+def run_facts_ingest(args):
+    """
+    Loads SEC companyfacts JSON into the local XBRL facts store (nothing is
+    embedded), then prints the computed metrics for every loaded ticker.
+    Sources: --file (with --ticker) or --dir of JSON files named TICKER.json
+    or CIK##########.json; otherwise EDGAR for --ticker / --tickers / --tickers-file.
+    """
+    import json
+    from src.retrieval.facts_store import FactsStore
+    
+    store = FactsStore()
+    documents = {}
+    if args.file or args.dir:
+        files = [args.file] if args.file else resolve_input_files(args.dir, ".json")
+        for path in files:
+            if not os.path.exists(path):
+                print(f"File not found: {path}")
+                continue
+            name = os.path.splitext(os.path.basename(path))[0].upper()
+            ticker = args.ticker if args.file and args.ticker else name
+            if name.startswith("CIK") and name[3:].isdigit():
+                from src.tools.sec_edgar import sec_handler
+                ticker = sec_handler.get_ticker(name[3:])
+                if not ticker:
+                    print(f"  [{path}] No ticker found for {name}; skipped.")
+                    continue
+            with open(path) as f:
+                documents[ticker.upper()] = json.load(f)
+    else:
+        from src.tools.sec_edgar import sec_handler
+        tickers = cli_tickers(args) if args.tickers or args.tickers_file else [args.ticker.upper()]
+        documents = sec_handler.fetch_company_facts(tickers, max_workers=args.workers)
+    
+    for ticker, data in documents.items():
+        count = store.add_company(ticker, data)
+        print(f"  [{ticker}] {count} facts ({data.get('entityName', 'unknown entity')})")
+    store.save()
+    print(f"Loaded company facts for {len(documents)} tickers ({len(store)} facts in store).")
+    
+    # All tickers are computed in one vectorized pass
+    metrics = store.compute_metrics(list(documents))
+    for ticker, m in metrics.items():
+        print(FactsStore.format_metrics(m) if m else f"[{ticker}] No annual revenue facts found.")
+    print("Company facts ingestion complete.")
+
+def run_portfolio(args):
+    """
+    Analyzes every ticker of --tickers / --tickers-file in one process and
+    writes per-ticker reports plus a ranked summary table.
+    """
+    import asyncio
+    from src.analysis.alpha_engine import AlphaEngine
+    from src.analysis.research import ResearchPipeline
+    from src.analysis.portfolio import PortfolioRunner
+    from src.analysis.report import render_summary, save_summary
+    from src.utils.openai_limiter import openai_limiter
+    from src.utils.scheduler import scheduler
+    
+    tickers = cli_tickers(args)
+    if not tickers:
+        print("No tickers to analyze.")
+        return
+    print(f"Analyzing {len(tickers)} tickers (up to {args.workers or config.PORTFOLIO_MAX_CONCURRENCY} at once)...")
+    
+    # One retriever (models/index load once) and one pipeline shared by every ticker
+    pipeline = ResearchPipeline(build_retriever(), AlphaEngine())
+    runner = PortfolioRunner(pipeline, max_concurrency=args.workers)
+    run = asyncio.run(runner.arun(tickers, query=args.query, fetch_facts=args.fetch_facts))
+    
+    print("\n" + render_summary(run["ranked"], run["failed"]))
+    filename = save_summary(run["ranked"], run["failed"])
+    print(f"Finished {len(run['results'])}/{len(tickers)} tickers in {run['elapsed_s']:.1f}s.")
+    print("Shared service usage:\n" + openai_limiter.report() + "\n" + scheduler.report())
+    print(f"\n[SUCCESS] Summary saved to: {filename} ({len(run['reports'])} ticker reports)")
 
 def main():
     parser = argparse.ArgumentParser(description="Financial Research Agent - ALPHA Framework (Production)")
     parser.add_argument("--query", type=str, help="Investment query/question")
     parser.add_argument("--ticker", type=str, help="Company Ticker (e.g., NVDA)")
     parser.add_argument("--ingest", action="store_true", help="Ingest data for the ticker")
-    parser.add_argument("--file", type=str, help="Local PDF file to ingest")
+    parser.add_argument("--file", type=str, help="Local PDF file to ingest (or Form 4 .xml with --type 4)")
     parser.add_argument("--year", type=str, default="Latest", help="Year of the filing (e.g. 2024)")
-    parser.add_argument("--type", type=str, default="10-K", help="Form type (10-K, 10-Q, 8-K, 4)")
+    parser.add_argument("--type", type=str, default="10-K", help="Form type (10-K, 10-Q, 8-K, 4, companyfacts). Form 4 XML and XBRL companyfacts JSON go to local structured stores")
+    parser.add_argument("--tickers-file", type=str, help="File with one ticker per line: bulk ingestion with --ingest (--type may be comma-separated), otherwise a portfolio watchlist")
+    parser.add_argument("--dir", type=str, help="Directory or glob pattern of local PDFs to ingest in one batch (use with --ingest --ticker), e.g. 'A_Form4_Files/meta-form4-*.pdf'")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent workers for bulk ingestion (EDGAR downloads, or PDF extraction processes with --dir), or tickers analyzed at once in portfolio mode")
+    parser.add_argument("--incremental", action="store_true", help="Only embed and upload chunks that are not already indexed")
+    parser.add_argument("--prune", action="store_true", help="Delete indexed chunks of the same ticker/year/type that are no longer present")
+    parser.add_argument("--sync", action="store_true", help="Run the query pipeline step by step instead of the asyncio orchestrator")
+    parser.add_argument("--tickers", type=str, help="Comma-separated tickers: bulk ingestion with --ingest, otherwise one portfolio run (a --tickers-file without --ingest works as a watchlist)")
+    parser.add_argument("--fetch-facts", action="store_true", help="Portfolio mode: download SEC companyfacts for tickers without XBRL metrics first")
     
     args = parser.parse_args()
     
-    memory = RedisMemory()
-    alpha_engine = AlphaEngine()
+    if args.ingest and (args.ticker or args.tickers or args.tickers_file or args.dir) and is_facts_ingest(args):
+        run_facts_ingest(args)
+        return
     
-    # Init retriever (Now just QdrantVectorDB)
-    # We instantiate it once. 
-    vector_db = QdrantVectorDB()
+    if args.ingest and (args.tickers or args.tickers_file):
+        run_bulk_ingest(args)
+        return
+    
+    if args.ingest and args.ticker and is_form4_xml_ingest(args):
+        run_form4_ingest(args)
+        return
+    
+    if args.ingest and args.ticker and args.dir:
+        run_dir_ingest(args)
+        return
     
     if args.ingest and args.ticker:
+        from src.retrieval.ingestion import IngestionEngine
+        
         print(f"Ingesting data for {args.ticker} (Year: {args.year}, Type: {args.type})...")
         ingestion = IngestionEngine()
-        # vector_db already inited above
         
         raw_content = None
         
         if args.file:
             # Local File Ingestion (Multimodal)
             from src.retrieval.file_loader import file_loader
+            if not os.path.exists(args.file):
+                print(f"File not found: {args.file}")
+                return
             print(f"Processing local file: {args.file}...")
-            # This returns a LIST of dicts
-            raw_content = file_loader.process_file(args.file)
+            # Lazy iterator of content blocks; pages are extracted as the pipeline pulls them
+            raw_content = file_loader.iter_file(args.file)
         else:
             # Cloud Fetch
             # 1. Fetch Real Data
+            from src.tools.sec_edgar import sec_handler
             print(f"Fetching {args.type} for {args.ticker}...")
             raw_content = sec_handler.fetch_latest_filing(args.ticker, form_type=args.type)
             if "Error" in raw_content:
                 print(raw_content)
                 return
 
-        # 2. Chunk
-        print("Chunking document...")
-        # process_document handles list or str
-        # We pass args.type as the doc_type logic
-        chunks = ingestion.process_document(args.ticker, args.type, raw_content, year=args.year)
-        print(f"Created {len(chunks)} chunks.")
+        # Only now do we connect to Qdrant (embedding models load on first batch)
+        from src.retrieval.vector_db import QdrantVectorDB
+        from src.retrieval.pipeline import StreamingIngestionPipeline
+        vector_db = QdrantVectorDB()
         
-        # 3. Embed & Index
-        vector_db.add_documents(chunks)
+        # 2-3. Chunk, Embed & Index as a stream
+        print("Chunking and indexing document...")
+        pipeline = StreamingIngestionPipeline(vector_db, ingestion)
+        stats = pipeline.run(args.ticker, args.type, raw_content, year=args.year,
+                             incremental=args.incremental, prune=args.prune)
+        print(f"Created {stats['chunks']} chunks ({stats['uploaded']} uploaded, {stats['skipped']} already indexed) "
+              f"in {stats['elapsed_s']:.1f}s ({stats['chunks_per_s']:.1f} chunks/s).")
+        sync_bm25_index()
         print("Ingestion complete.")
         return
 
+    if args.ingest:
+        parser.error("--ingest needs --ticker, --tickers or --tickers-file")
+
+    if not args.ingest and (args.tickers or args.tickers_file):
+        run_portfolio(args)
+        return
+    
     if args.query:
+        from src.analysis.alpha_engine import AlphaEngine
+        from src.analysis.research import ResearchPipeline
+        from src.analysis.report import ReportWriter
+        from src.utils.memory import RedisMemory
+        
+        memory = RedisMemory()
+        alpha_engine = AlphaEngine()
+        vector_db = build_retriever()
+        
         print(f"Processing Query: {args.query}")
         memory.add_message("user", args.query)
         
         ticker = args.ticker if args.ticker else "NVDA" 
         
-        # 2. Retrieve Context (Real)
-        # We search based on the query.
-        print("Retrieving context...")
-        # New QdrantVectorDB.search takes a string query directly
-        general_results = vector_db.search(args.query, limit=10)
-        
-        print(f"  [DEBUG] General Search Results found: {len(general_results)}")
-        for i, r in enumerate(general_results):
-            print(f"    - {i+1} [Score: {r['score']:.4f}] {r['text'][:100].replace(chr(10), ' ')}...")
-
-        general_context = "\n".join([r['text'] for r in general_results])
-        
-        doc_context = {}
-        
-        dimensions_queries = {
-            "mda": f"{ticker} Item 7 Management's Discussion and Analysis of Financial Condition and Results of Operations MD&A",
-            "risk": f"{ticker} Item 1A Risk Factors market risks regulatory challenges competition",
-            "financials": f"{ticker} Item 8 Financial Statements consolidated balance sheets income statement cash flows notes",
-            "business": f"{ticker} Item 1 Business overview strategy products segments competition",
-            "insider": f"{ticker} Item 12 Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters",
-            "market": f"{ticker} Item 5 Market for Registrant’s Common Equity Related Stockholder Matters and Issuer Purchases of Equity Securities"
-        }
-        
-        for key, q in dimensions_queries.items():
-            # Simply search with the query string
-             res = vector_db.search(q, limit=3)
-             print(f"  [DEBUG] Dimension '{key}' Search Results found: {len(res)}")
-             for i, r in enumerate(res):
-                 print(f"    - {i+1} [Score: {r['score']:.4f}] {r['text'][:100].replace(chr(10), ' ')}...")
-                 
-             text = "\n".join([r['text'] for r in res])
-             # Enrich dimension context with relevant general context
-             doc_context[key] = text + "\n---\n" + general_context
-             
-        # Gap Bridging: Perform targeted efficient web searches for missing data
-        print("Bridging data gaps with Web Search...")
-        from src.tools.web_search import web_search_tool
-        
-        bridge_queries = {
-            "financials": f"{ticker} revenue growth last 5 years operating margin vs peers",
-            "risk": f"{ticker} current macroeconomic headwinds interest rate sensitivity",
-            "market": f"{ticker} analyst ratings price targets"
-        }
-        
-        for key, q in bridge_queries.items():
-            try:
-                web_results = web_search_tool.search(q)
-                web_text = "\n".join([f"{w['title']}: {w['snippet']}" for w in web_results])
-                if key in doc_context:
-                    doc_context[key] += f"\n\n[External Web Data]:\n{web_text}"
-            except Exception as e:
-                print(f"Bridge search failed for {key}: {e}")
-             
-        # Fallback to Web Search for 'market' and 'news'
-        print("Fetching live market data (Web Search)...")
-        web_res = web_search_tool.search(f"{ticker} stock price valuation news")
-        web_text = "\n".join([f"{w['title']}: {w['snippet']}" for w in web_res])
-        doc_context["market"] += ("\n" + web_text)
-        doc_context["news"] = web_text 
-        
-        # 3. Analyze
-        print("Analyzing dimensions...")
-        result = alpha_engine.analyze(ticker, doc_context)
-        
-        # 4. Generate Output
-        print("\n" + "="*50)
-        print(f"**ALPHA Composite Score: {result['composite_score']}/100**")
-        print("="*50)
-        
-        print("\n**Timing Assessment:** " + result['verdict'])
-        print(f"Weighted Score: {result['weighted_score']}")
+        # 2-4. Retrieve, bridge gaps with web search and analyze; each dimension's
+        # section goes to stdout and the report file as soon as it is scored
+        pipeline = ResearchPipeline(vector_db, alpha_engine)
+        writer = ReportWriter(ticker)
+        on_delta = writer.on_delta if config.LLM_STREAM_OUTPUT else None
+        if config.ASYNC_QUERY_PIPELINE and not args.sync:
+            import asyncio
+            result = asyncio.run(pipeline.arun(args.query, ticker, on_dimension=writer.on_dimension, on_delta=on_delta))
+        else:
+            result = pipeline.run(args.query, ticker, on_dimension=writer.on_dimension, on_delta=on_delta)
         
-        for dim, data in result['dimensions'].items():
-            print(f"\n{dim[0]} - {dim} ({data['score']}/100)")
-            # Fix: Ensure 'analysis' key exists or use fallback
-            analysis_text = data.get('analysis', data.get('details', 'No analysis provided.'))
-            print(f"{analysis_text[:200]}...") 
-            print(f"Rationale: {data.get('rationale', 'No rationale provided.')}")
-            
+        # 5. Composite score and verdict last
+        filename = writer.finish(result)
         memory.add_message("assistant", str(result))
-        
-        # 5. Save Report to File
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        reports_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
-        os.makedirs(reports_dir, exist_ok=True)
-        filename = f"{reports_dir}/{ticker}_{timestamp}.md"
-        
-        md_content = f"# ALPHA Investment Report: {ticker}\n"
-        md_content += f"**Date:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
-        md_content += f"## Verdict: {result['verdict']}\n"
-        md_content += f"**Composite Score:** {result['composite_score']}/100\n"
-        md_content += f"**Weighted Score:** {result['weighted_score']}\n\n"
-        md_content += "---\n\n"
-        
-        for dim, data in result['dimensions'].items():
-            analysis_text = data.get('analysis', data.get('details', 'No analysis provided.'))
-            md_content += f"### {dim} ({data['score']}/100)\n"
-            md_content += f"{analysis_text}\n\n"
-            md_content += f"**Rationale:** {data.get('rationale', 'N/A')}\n\n"
-            md_content += "---\n"
-            
-        with open(filename, "w") as f:
-            f.write(md_content)
-            
         print(f"\n[SUCCESS] Report saved to: {filename}")
 
 if __name__ == "__main__":
@@ -0,0 +1,373 @@
+import asyncio
+import glob
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from src.config import config
+from src.retrieval.columnar import ColumnarStore
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Only the most frequent function words; numbers and Item labels ("7a") are kept
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which will with".split()
+)
+
+# Chunk payload fields, dictionary-encoded: int32 ids into a per-field vocabulary
+ENCODED_COLUMNS = ("ticker", "year", "doc_type", "section", "item", "section_title", "source")
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index(ColumnarStore):
+    """
+    In-process BM25 index over the local corpus files (data/corpus/*.json,
+    written at ingestion). The inverted index is array-backed: one int32
+    term id, int32 document id and uint16 term frequency per posting,
+    sorted by term, with an offsets array for slicing a term's postings.
+    Chunk payload fields are dictionary-encoded as in the other columnar
+    stores, and everything persists to a single .npz file.
+
+    Updates are incremental per ticker: each corpus file replaces its
+    ticker's chunks, and sync() only re-reads files that changed since the
+    last run. search_batch()/asearch_batch()/build_filter() match
+    QdrantVectorDB, so ResearchPipeline can run on it with no Qdrant and no
+    query embeddings (RETRIEVAL_BACKEND=bm25), and candidates() gives a cheap
+    lexical prefilter for the vector search (BM25_PREFILTER_CANDIDATES).
+    """
+
+    ENCODED_COLUMNS = ENCODED_COLUMNS
+
+    def __init__(self, path: str = None, corpus_dir: str = None, k1: float = None, b: float = None):
+        super().__init__(path or config.BM25_INDEX_PATH)
+        self.corpus_dir = corpus_dir or os.path.join(config.DATA_DIR, "corpus")
+        self.k1 = config.BM25_K1 if k1 is None else k1
+        self.b = config.BM25_B if b is None else b
+
+        # Documents (chunks)
+        self._doc_ids = np.empty(0, dtype=str)
+        self._chunk_ids = np.empty(0, dtype="i4")
+        self._lengths = np.empty(0, dtype="i4")
+        # Chunk texts as one UTF-8 blob; document i is blob[offsets[i]:offsets[i + 1]]
+        self._text_blob = np.empty(0, dtype="u1")
+        self._text_offsets = np.zeros(1, dtype="i8")
+
+        # Postings, sorted by term
+        self._terms = []
+        self._term_index = {}
+        self._post_term = np.empty(0, dtype="i4")
+        self._post_doc = np.empty(0, dtype="i4")
+        self._post_tf = np.empty(0, dtype="u2")
+        self._offsets = np.zeros(1, dtype="i8")
+
+        # Corpus file stamps (mtime_ns, size) per ticker, for sync()
+        self._stamps = {}
+
+        if os.path.exists(self.path):
+            self._load()
+
+    # Persistence
+
+    def _load_arrays(self, data: Any) -> None:
+        super()._load_arrays(data)
+        self._doc_ids = data["doc_ids"]
+        self._chunk_ids = data["chunk_ids"]
+        self._lengths = data["lengths"]
+        self._text_blob = data["text_blob"]
+        self._text_offsets = data["text_offsets"]
+        self._terms = data["terms"].tolist()
+        self._term_index = {term: i for i, term in enumerate(self._terms)}
+        self._post_term = data["post_term"]
+        self._post_doc = data["post_doc"]
+        self._post_tf = data["post_tf"]
+        self._stamps = {
+            ticker: (int(mtime), int(size))
+            for ticker, mtime, size in zip(data["stamp_ticker"].tolist(), data["stamp_mtime"], data["stamp_size"])
+        }
+        self._rebuild_offsets()
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._arrays()
+        stamp_tickers = sorted(self._stamps)
+        arrays.update(
+            doc_ids=self._doc_ids,
+            chunk_ids=self._chunk_ids,
+            lengths=self._lengths,
+            text_blob=self._text_blob,
+            text_offsets=self._text_offsets,
+            terms=np.array(self._terms, dtype=str),
+            post_term=self._post_term,
+            post_doc=self._post_doc,
+            post_tf=self._post_tf,
+            stamp_ticker=np.array(stamp_tickers, dtype=str),
+            stamp_mtime=np.array([self._stamps[t][0] for t in stamp_tickers], dtype="i8"),
+            stamp_size=np.array([self._stamps[t][1] for t in stamp_tickers], dtype="i8"),
+        )
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _term_id(self, term: str) -> int:
+        if term not in self._term_index:
+            self._term_index[term] = len(self._terms)
+            self._terms.append(term)
+        return self._term_index[term]
+
+    def _rebuild_offsets(self) -> None:
+        # offsets[t]:offsets[t + 1] are term t's postings
+        self._offsets = np.searchsorted(self._post_term, np.arange(len(self._terms) + 1), side="left").astype("i8")
+
+    # Updates
+
+    def _remove(self, ticker_id: int) -> None:
+        keep = self._ids["ticker"] != ticker_id
+        if keep.all():
+            return
+        # Old document id -> new (compacted) id
+        new_ids = np.cumsum(keep, dtype="i8").astype("i4") - 1
+        kept_postings = keep[self._post_doc]
+        self._post_term = self._post_term[kept_postings]
+        self._post_tf = self._post_tf[kept_postings]
+        self._post_doc = new_ids[self._post_doc[kept_postings]]
+
+        lengths = np.diff(self._text_offsets)
+        self._text_blob = self._text_blob[np.repeat(keep, lengths)]
+        self._text_offsets = np.concatenate([[0], np.cumsum(lengths[keep])]).astype("i8")
+        self._doc_ids = self._doc_ids[keep]
+        self._chunk_ids = self._chunk_ids[keep]
+        self._lengths = self._lengths[keep]
+        for name in ENCODED_COLUMNS:
+            self._ids[name] = self._ids[name][keep]
+
+    def add_ticker(self, ticker: str, chunks: List[Dict[str, Any]]) -> int:
+        """
+        Indexes a ticker's corpus chunks, replacing what was indexed for the
+        ticker before (a corpus file holds all of a ticker's chunks).
+        Returns the number of chunks indexed. Call save() to persist.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            ticker_id = self._encode("ticker", ticker)
+            self._remove(ticker_id)
+            if not chunks:
+                self._rebuild_offsets()
+                return 0
+            base = len(self._lengths)
+
+            token_ids, token_docs, lengths, texts = [], [], [], []
+            for i, chunk in enumerate(chunks):
+                tokens = tokenize(chunk.get("text", ""))
+                token_ids.extend(self._term_id(token) for token in tokens)
+                token_docs.append(np.full(len(tokens), base + i, dtype="i8"))
+                lengths.append(len(tokens))
+                texts.append(chunk.get("text", "").encode("utf-8"))
+
+            # One posting per (document, term), counted in a single pass
+            vocab_size = len(self._terms)
+            keys = np.concatenate(token_docs) * vocab_size + np.array(token_ids, dtype="i8")
+            keys, counts = np.unique(keys, return_counts=True)
+            post_doc = (keys // vocab_size).astype("i4")
+            post_term = (keys % vocab_size).astype("i4")
+            post_tf = np.minimum(counts, np.iinfo("u2").max).astype("u2")
+
+            # Merge by term; the stable sort keeps each term's documents in id order
+            terms = np.concatenate([self._post_term, post_term])
+            order = np.argsort(terms, kind="stable")
+            self._post_term = terms[order]
+            self._post_doc = np.concatenate([self._post_doc, post_doc])[order]
+            self._post_tf = np.concatenate([self._post_tf, post_tf])[order]
+            self._rebuild_offsets()
+
+            sizes = np.array([len(t) for t in texts], dtype="i8")
+            self._text_blob = np.concatenate([self._text_blob, np.frombuffer(b"".join(texts), dtype="u1")])
+            self._text_offsets = np.concatenate([self._text_offsets, self._text_offsets[-1] + np.cumsum(sizes)])
+            self._doc_ids = np.concatenate([self._doc_ids, np.array([str(c.get("id", "")) for c in chunks], dtype=str)])
+            self._chunk_ids = np.concatenate([self._chunk_ids, np.array([c.get("chunk_id") or 0 for c in chunks], dtype="i4")])
+            self._lengths = np.concatenate([self._lengths, np.array(lengths, dtype="i4")])
+            for name in ENCODED_COLUMNS:
+                codes = [ticker_id] * len(chunks) if name == "ticker" else [self._encode(name, c.get(name)) for c in chunks]
+                self._ids[name] = np.concatenate([self._ids[name], np.array(codes, dtype="i4")])
+            return len(chunks)
+
+    def remove_ticker(self, ticker: str) -> None:
+        ticker = ticker.upper()
+        with self._lock:
+            if ticker in self._index["ticker"]:
+                self._remove(self._index["ticker"][ticker])
+                self._rebuild_offsets()
+            self._stamps.pop(ticker, None)
+
+    def sync(self, corpus_dir: str = None) -> Dict[str, int]:
+        """
+        Brings the index up to date with the corpus directory: new or
+        changed corpus files are re-indexed, tickers whose file is gone are
+        dropped, unchanged files are not read. Returns {ticker: chunks} for
+        the re-indexed tickers. Call save() to persist.
+        """
+        corpus_dir = corpus_dir or self.corpus_dir
+        files = {
+            os.path.splitext(os.path.basename(path))[0].upper(): path
+            for path in glob.glob(os.path.join(corpus_dir, "*.json"))
+        }
+        updated = {}
+        for ticker, path in sorted(files.items()):
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(ticker) == stamp:
+                continue
+            try:
+                with open(path) as f:
+                    chunks = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping corpus file {path}: {e}")
+                continue
+            updated[ticker] = self.add_ticker(ticker, chunks)
+            self._stamps[ticker] = stamp
+        for ticker in set(self._stamps) - set(files):
+            self.remove_ticker(ticker)
+        return updated
+
+    @classmethod
+    def from_corpus(cls, path: str = None, corpus_dir: str = None) -> "BM25Index":
+        """
+        Loads the saved index and syncs it with the corpus files, saving
+        only when something changed.
+        """
+        index = cls(path, corpus_dir)
+        updated = index.sync()
+        if updated:
+            index.save()
+            print(f"BM25 index: re-indexed {', '.join(f'{t} ({n} chunks)' for t, n in updated.items())}; "
+                  f"{len(index)} chunks, {len(index._terms)} terms.")
+        return index
+
+    # Search
+
+    @staticmethod
+    def build_filter(ticker: str = None, sections: List[str] = None, year: str = None, doc_type: str = None) -> Optional[Dict[str, List[str]]]:
+        """
+        Same arguments as QdrantVectorDB.build_filter: {field: allowed values}.
+        """
+        conditions = {}
+        if ticker:
+            conditions["ticker"] = [ticker.upper()]
+        if year:
+            conditions["year"] = [str(year)]
+        if doc_type:
+            conditions["doc_type"] = [doc_type]
+        if sections:
+            conditions["section"] = list(sections)
+        return conditions or None
+
+    def _mask(self, conditions: Optional[Dict[str, List[str]]]) -> Optional[np.ndarray]:
+        if not conditions:
+            return None
+        mask = np.ones(len(self._lengths), dtype=bool)
+        for name, values in conditions.items():
+            codes = [self._index[name][v] for v in values if v in self._index[name]]
+            mask &= np.isin(self._ids[name], np.array(codes, dtype="i4"))
+        return mask
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every indexed chunk for the query (0 where no term matches).
+        """
+        n_docs = len(self._lengths)
+        terms = np.unique([self._term_index[t] for t in tokenize(query) if t in self._term_index]).astype("i8")
+        if not n_docs or not terms.size:
+            return np.zeros(n_docs)
+        starts, ends = self._offsets[terms], self._offsets[terms + 1]
+        df = ends - starts
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        # Gather the postings of every query term at once
+        postings = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        docs = self._post_doc[postings]
+        tf = self._post_tf[postings].astype("f8")
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[docs] / max(self._lengths.mean(), 1e-9))
+        weights = np.repeat(idf, df) * tf * (self.k1 + 1) / (tf + norm)
+        return np.bincount(docs, weights=weights, minlength=n_docs)
+
+    def _top(self, query: str, limit: int, conditions: Optional[Dict[str, List[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (document ids of the best `limit` matches, best first; all scores).
+        """
+        scores = self.scores(query)
+        mask = self._mask(conditions)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        hits = np.flatnonzero(scores > 0)
+        if limit <= 0:
+            return hits[:0], scores
+        if hits.size > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        return hits[np.argsort(-scores[hits], kind="stable")], scores
+
+    def _text(self, doc: int) -> str:
+        return self._text_blob[self._text_offsets[doc]:self._text_offsets[doc + 1]].tobytes().decode("utf-8")
+
+    def _hit(self, doc: int, score: float) -> Dict[str, Any]:
+        payload = {name: self._vocab[name][self._ids[name][doc]] or None for name in ENCODED_COLUMNS}
+        payload.update(id=str(self._doc_ids[doc]), chunk_id=int(self._chunk_ids[doc]), text=self._text(doc))
+        return {"id": payload["id"], "score": float(score), "text": payload["text"], "metadata": payload}
+
+    @staticmethod
+    def _combine(*filters: Optional[Dict[str, List[str]]]) -> Optional[Dict[str, List[str]]]:
+        combined = {}
+        for f in filters:
+            for name, values in (f or {}).items():
+                combined[name] = [v for v in combined[name] if v in values] if name in combined else list(values)
+        return combined or None
+
+    def search(self, query: str, limit: int = 10, ticker: str = None, year: str = None, doc_type: str = None) -> List[Dict[str, Any]]:
+        return self.search_batch([query], [limit], ticker=ticker, year=year, doc_type=doc_type)[0]
+
+    def search_batch(self, queries: List[str], limits: Union[int, List[int]] = 10,
+                     filters: List[Optional[Dict[str, List[str]]]] = None,
+                     ticker: str = None, year: str = None, doc_type: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Lexical counterpart of QdrantVectorDB.search_batch (same arguments
+        and hit shape; scores are BM25 scores).
+        """
+        if isinstance(limits, int):
+            limits = [limits] * len(queries)
+        if len(limits) != len(queries):
+            raise ValueError("search_batch needs exactly one limit per query.")
+        filters = filters or [None] * len(queries)
+        if len(filters) != len(queries):
+            raise ValueError("search_batch needs exactly one filter (or None) per query.")
+        base_filter = self.build_filter(ticker=ticker, year=year, doc_type=doc_type)
+
+        results = []
+        for query, limit, query_filter in zip(queries, limits, filters):
+            docs, scores = self._top(query, limit, self._combine(base_filter, query_filter))
+            results.append([self._hit(doc, scores[doc]) for doc in docs])
+        return results
+
+    async def asearch_batch(self, queries: List[str], limits: Union[int, List[int]] = 10,
+                            filters: List[Optional[Dict[str, List[str]]]] = None,
+                            ticker: str = None, year: str = None, doc_type: str = None) -> List[List[Dict[str, Any]]]:
+        # Pure CPU work, milliseconds per query; a worker thread keeps the loop free
+        return await asyncio.to_thread(self.search_batch, queries, limits, filters, ticker, year, doc_type)
+
+    async def aclose(self) -> None:
+        pass
+
+    def candidates(self, query: str, limit: int, ticker: str = None, year: str = None, doc_type: str = None) -> List[str]:
+        """
+        IDs of the top `limit` chunks by BM25, for narrowing a vector search.
+        """
+        docs, _ = self._top(query, limit, self.build_filter(ticker=ticker, year=year, doc_type=doc_type))
+        return [str(self._doc_ids[doc]) for doc in docs]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self._lengths),
+            "tickers": len(self.tickers()),
+            "terms": len(self._terms),
+            "postings": len(self._post_doc),
+            "text_mb": round(self._text_blob.nbytes / 1024 ** 2, 2),
+            "postings_mb": round((self._post_term.nbytes + self._post_doc.nbytes + self._post_tf.nbytes) / 1024 ** 2, 2),
+        }
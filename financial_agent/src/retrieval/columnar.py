@@ -0,0 +1,67 @@
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+def save_npz(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Writes the arrays to `path` as a compressed .npz, atomically so a
+    concurrent reader never sees a partial file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+class ColumnarStore:
+    """
+    Base for the local numpy stores: one array per numeric column (dtype
+    from NUMERIC_COLUMNS), string columns dictionary-encoded as int32 ids
+    into a per-column vocabulary (ENCODED_COLUMNS), persisted as a single
+    .npz file. Subclasses with extra arrays extend _arrays()/_load_arrays().
+    """
+
+    NUMERIC_COLUMNS: Dict[str, str] = {}
+    ENCODED_COLUMNS: Tuple[str, ...] = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.NUMERIC_COLUMNS.items()}
+        self._ids = {name: np.empty(0, dtype="i4") for name in self.ENCODED_COLUMNS}
+        self._vocab = {name: [] for name in self.ENCODED_COLUMNS}
+        self._index = {name: {} for name in self.ENCODED_COLUMNS}
+
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            self._load_arrays(data)
+
+    def _load_arrays(self, data: Any) -> None:
+        for name in self.NUMERIC_COLUMNS:
+            self._columns[name] = data[name]
+        for name in self.ENCODED_COLUMNS:
+            self._ids[name] = data[f"{name}_id"]
+            self._vocab[name] = data[f"{name}_vocab"].tolist()
+            self._index[name] = {value: i for i, value in enumerate(self._vocab[name])}
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = dict(self._columns)
+        for name in self.ENCODED_COLUMNS:
+            arrays[f"{name}_id"] = self._ids[name]
+            arrays[f"{name}_vocab"] = np.array(self._vocab[name], dtype=str)
+        return arrays
+
+    def save(self) -> None:
+        save_npz(self.path, self._arrays())
+
+    def _encode(self, name: str, value: Any) -> int:
+        value = "" if value is None else str(value)
+        index = self._index[name]
+        if value not in index:
+            index[value] = len(self._vocab[name])
+            self._vocab[name].append(value)
+        return index[value]
+
+    def tickers(self) -> List[str]:
+        return sorted(set(self._vocab["ticker"][i] for i in np.unique(self._ids["ticker"])))
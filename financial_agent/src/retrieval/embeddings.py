@@ -0,0 +1,167 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Tuple
+from src.config import config
+from src.utils.cache import DiskCache, LRUCache
+
+DENSE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SPARSE_MODEL = "Qdrant/bm25"
+LATE_INTERACTION_MODEL = "colbert-ir/colbertv2.0"
+ALL_MODELS = ("dense", "bm25", "colbert")
+MODEL_NAMES = {"dense": DENSE_MODEL, "bm25": SPARSE_MODEL, "colbert": LATE_INTERACTION_MODEL}
+
+class EmbeddingEngine:
+    """
+    Owns the three fastembed models used for hybrid retrieval.
+    Models are loaded on first use. Passage embedding is tunable through
+    config: EMBED_MODEL_BATCH_SIZE (ONNX batch), EMBED_PARALLEL (fastembed
+    data-parallel worker processes, 0 = all cores) and EMBED_THREADS (ONNX
+    threads per model). Without data parallelism the three models run
+    concurrently on threads, since ONNX Runtime releases the GIL.
+    Query embeddings are cached per model and query text (in memory, and
+    on disk when QUERY_EMBED_DISK_CACHE is on).
+    """
+
+    def __init__(self):
+        self.model_batch_size = config.EMBED_MODEL_BATCH_SIZE
+        self.parallel = config.EMBED_PARALLEL
+        self.threads = config.EMBED_THREADS
+
+        self._dense_embedding_model = None
+        self._bm25_embedding_model = None
+        self._late_interaction_embedding_model = None
+        self._model_lock = threading.Lock()
+        self._executor = None
+
+        self._query_cache = LRUCache(config.QUERY_EMBED_CACHE_SIZE)
+        self._query_disk_cache = None
+        if config.QUERY_EMBED_DISK_CACHE:
+            self._query_disk_cache = DiskCache(
+                config.RETRIEVAL_CACHE_PATH,
+                namespace="query_embeddings",
+                max_entries=config.QUERY_EMBED_DISK_CACHE_MAX_ENTRIES
+            )
+
+    @property
+    def dense_embedding_model(self):
+        # Dense: sentence-transformers/all-MiniLM-L6-v2
+        if self._dense_embedding_model is None:
+            with self._model_lock:
+                if self._dense_embedding_model is None:
+                    from fastembed import TextEmbedding
+                    self._dense_embedding_model = TextEmbedding(DENSE_MODEL, threads=self.threads)
+        return self._dense_embedding_model
+
+    @property
+    def bm25_embedding_model(self):
+        # Sparse: Qdrant/bm25
+        if self._bm25_embedding_model is None:
+            with self._model_lock:
+                if self._bm25_embedding_model is None:
+                    from fastembed import SparseTextEmbedding
+                    self._bm25_embedding_model = SparseTextEmbedding(SPARSE_MODEL)
+        return self._bm25_embedding_model
+
+    @property
+    def late_interaction_embedding_model(self):
+        # Late Interaction: colbert-ir/colbertv2.0
+        if self._late_interaction_embedding_model is None:
+            with self._model_lock:
+                if self._late_interaction_embedding_model is None:
+                    from fastembed import LateInteractionTextEmbedding
+                    self._late_interaction_embedding_model = LateInteractionTextEmbedding(LATE_INTERACTION_MODEL, threads=self.threads)
+        return self._late_interaction_embedding_model
+
+    def _run_models(self, calls) -> List[List[Any]]:
+        if self.parallel is not None:
+            # Data-parallel fastembed already uses every core; run models one by one
+            return [list(call()) for call in calls]
+        if self._executor is None:
+            with self._model_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="embed")
+        futures = [self._executor.submit(lambda c=call: list(c())) for call in calls]
+        return [f.result() for f in futures]
+
+    def _model(self, key: str):
+        return {
+            "dense": lambda: self.dense_embedding_model,
+            "bm25": lambda: self.bm25_embedding_model,
+            "colbert": lambda: self.late_interaction_embedding_model,
+        }[key]()
+
+    def embed_passages(self, texts: List[str], use: Tuple[str, ...] = ALL_MODELS) -> Tuple[List[Any], List[Any], List[Any]]:
+        """
+        Returns (dense, bm25, colbert) embeddings for a list of passages.
+        Models not listed in `use` are skipped (and never loaded); their slot is None.
+        """
+        kwargs = {"batch_size": self.model_batch_size, "parallel": self.parallel}
+        keys = [key for key in ALL_MODELS if key in use]
+        results = self._run_models([
+            lambda key=key: self._model(key).passage_embed(texts, **kwargs) for key in keys
+        ])
+        by_key = dict(zip(keys, results))
+        return tuple(by_key.get(key) for key in ALL_MODELS)
+
+    def embed_queries(self, queries: List[str], use: Tuple[str, ...] = ALL_MODELS) -> Tuple[List[Any], List[Any], List[Any]]:
+        """
+        Returns (dense, bm25, colbert) query embeddings. Queries are short,
+        so they are embedded in-process without data parallelism.
+        Cached queries are served without running (or loading) the model;
+        only the misses are embedded, in one batch per model.
+        """
+        results = []
+        for key in ALL_MODELS:
+            if key not in use:
+                results.append(None)
+                continue
+            vectors = [self._cached_query_vector(key, query) for query in queries]
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            if missing:
+                fresh = self._model(key).query_embed([queries[i] for i in missing])
+                for i, vector in zip(missing, fresh):
+                    vectors[i] = vector
+                    self._store_query_vector(key, queries[i], vector)
+            results.append(vectors)
+        return tuple(results)
+
+    # Query embedding cache
+
+    def _cached_query_vector(self, key: str, query: str) -> Any:
+        vector = self._query_cache.get((key, query))
+        if vector is not None or self._query_disk_cache is None:
+            return vector
+        stored = self._query_disk_cache.get(DiskCache.make_key(MODEL_NAMES[key], query))
+        if stored is None:
+            return None
+        vector = self._decode_vector(key, stored)
+        self._query_cache.set((key, query), vector)
+        return vector
+
+    def _store_query_vector(self, key: str, query: str, vector: Any) -> None:
+        self._query_cache.set((key, query), vector)
+        if self._query_disk_cache is not None:
+            self._query_disk_cache.set(DiskCache.make_key(MODEL_NAMES[key], query), self._encode_vector(key, vector))
+
+    @staticmethod
+    def _encode_vector(key: str, vector: Any) -> Any:
+        if key == "bm25":
+            return {"indices": vector.indices.tolist(), "values": vector.values.tolist()}
+        return vector.tolist()
+
+    @staticmethod
+    def _decode_vector(key: str, stored: Any) -> Any:
+        import numpy as np
+        if key == "bm25":
+            from fastembed.sparse.sparse_embedding_base import SparseEmbedding
+            return SparseEmbedding(
+                values=np.array(stored["values"], dtype=np.float32),
+                indices=np.array(stored["indices"], dtype=np.int64),
+            )
+        return np.array(stored, dtype=np.float32)
+
+    def query_cache_stats(self) -> dict:
+        stats = {"memory_entries": len(self._query_cache)}
+        if self._query_disk_cache is not None:
+            stats["disk"] = self._query_disk_cache.stats()
+        return stats
@@ -0,0 +1,237 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.config import config
+from src.retrieval.columnar import ColumnarStore
+from src.tools.xbrl import METRIC_CONCEPTS, parse_company_facts
+
+# Numeric columns and their dtypes
+NUMERIC_COLUMNS = {
+    "start": "datetime64[D]",   # NaT for instant facts
+    "end": "datetime64[D]",
+    "filed": "datetime64[D]",
+    "value": "f8",
+}
+# String columns are dictionary-encoded: int32 ids into a per-column vocabulary
+ENCODED_COLUMNS = ("ticker", "concept", "unit", "form")
+
+# Duration facts between these lengths are fiscal years
+ANNUAL_MIN_DAYS = 350
+ANNUAL_MAX_DAYS = 380
+
+class FactsStore(ColumnarStore):
+    """
+    Local time-series store of XBRL company facts: one numpy array per
+    field, keyed by ticker, concept and period (start/end), persisted as a
+    single .npz file. Standard metrics are computed for many tickers at once
+    on a [ticker x fiscal year] matrix, so the Performance dimension gets
+    exact numbers instead of asking the LLM to find them in retrieved text.
+    """
+
+    NUMERIC_COLUMNS = NUMERIC_COLUMNS
+    ENCODED_COLUMNS = ENCODED_COLUMNS
+
+    def __init__(self, path: str = None):
+        super().__init__(path or config.FACTS_STORE_PATH)
+        if os.path.exists(self.path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._columns["value"])
+
+    def add_company(self, ticker: str, data: Dict[str, Any]) -> int:
+        """
+        Loads one companyfacts JSON document for the ticker. companyfacts is
+        cumulative, so the ticker's previous rows are replaced rather than
+        merged. Returns the number of facts stored. Call save() to persist.
+        """
+        ticker = ticker.upper()
+        facts = parse_company_facts(data)
+        with self._lock:
+            ticker_id = self._encode("ticker", ticker)
+            keep = self._ids["ticker"] != ticker_id
+            for name in NUMERIC_COLUMNS:
+                self._columns[name] = self._columns[name][keep]
+            for name in ENCODED_COLUMNS:
+                self._ids[name] = self._ids[name][keep]
+
+            count = len(facts["value"])
+            new = {
+                "start": np.array(facts["start"], dtype="datetime64[D]"),
+                "end": np.array(facts["end"], dtype="datetime64[D]"),
+                "filed": np.array(facts["filed"], dtype="datetime64[D]"),
+                "value": np.array(facts["value"], dtype="f8"),
+            }
+            for name, values in new.items():
+                self._columns[name] = np.concatenate([self._columns[name], values])
+
+            ids = {
+                "ticker": np.full(count, ticker_id, dtype="i4"),
+                "concept": np.array([self._encode("concept", v) for v in facts["concept"]], dtype="i4"),
+                "unit": np.array([self._encode("unit", v) for v in facts["unit"]], dtype="i4"),
+                "form": np.array([self._encode("form", v) for v in facts["form"]], dtype="i4"),
+            }
+            for name, values in ids.items():
+                self._ids[name] = np.concatenate([self._ids[name], values])
+            return count
+
+    def annual(self, tickers: List[str], concepts: List[str], unit: str = "USD") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fiscal-year values of the first available concept, as
+        (fiscal years, matrix[len(tickers), len(years)]) with NaN where missing.
+        A fiscal year is labeled by the calendar year its period ends in.
+        Restated values win: for the same period the latest filing is used.
+        """
+        ticker_ids = np.array([self._index["ticker"].get(t.upper(), -1) for t in tickers], dtype="i4")
+        concept_ids = np.array([self._index["concept"].get(c, -1) for c in concepts], dtype="i4")
+        c = self._columns
+
+        duration = (c["end"] - c["start"]).astype("i8")
+        mask = (
+            np.isin(self._ids["ticker"], ticker_ids)
+            & np.isin(self._ids["concept"], concept_ids)
+            & (self._ids["unit"] == self._index["unit"].get(unit, -1))
+            & ~np.isnat(c["start"])
+            & (duration >= ANNUAL_MIN_DAYS) & (duration <= ANNUAL_MAX_DAYS)
+        )
+        rows = np.flatnonzero(mask)
+        if not rows.size:
+            return np.empty(0, dtype="i4"), np.full((len(tickers), 0), np.nan)
+
+        year = c["end"][rows].astype("datetime64[Y]").astype("i4") + 1970
+        years = np.arange(year.min(), year.max() + 1, dtype="i4")
+
+        # Row positions in the output: ticker index, concept preference, year index
+        ticker_lookup = np.zeros(len(self._vocab["ticker"]), dtype="i4")
+        ticker_lookup[ticker_ids[ticker_ids >= 0]] = np.flatnonzero(ticker_ids >= 0)
+        concept_lookup = np.zeros(len(self._vocab["concept"]), dtype="i4")
+        concept_lookup[concept_ids[concept_ids >= 0]] = np.flatnonzero(concept_ids >= 0)
+        ticker_pos = ticker_lookup[self._ids["ticker"][rows]]
+        concept_pos = concept_lookup[self._ids["concept"][rows]]
+        year_pos = year - years[0]
+
+        # Fancy assignment keeps the last write per cell: sort by filing date
+        # so the most recent filing (restatements) lands last
+        order = np.argsort(c["filed"][rows], kind="stable")
+        cube = np.full((len(concepts), len(tickers), len(years)), np.nan)
+        cube[concept_pos[order], ticker_pos[order], year_pos[order]] = c["value"][rows][order]
+
+        # First concept in preference order that has a value for the year
+        matrix = cube[-1]
+        for layer in cube[-2::-1]:
+            matrix = np.where(np.isnan(layer), matrix, layer)
+        return years, matrix
+
+    def compute_metrics(self, tickers: List[str], cagr_years: int = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Revenue CAGR, latest YoY revenue growth, operating margin and
+        operating cash flow / net income for every ticker, computed together.
+        Each ticker is measured at its own latest fiscal year with revenue.
+        """
+        cagr_years = cagr_years or config.METRICS_CAGR_YEARS
+        tickers = [t.upper() for t in tickers]
+        series = {metric: self.annual(tickers, concepts) for metric, concepts in METRIC_CONCEPTS.items()}
+
+        # Align every metric to one year axis
+        all_years = np.unique(np.concatenate([years for years, _ in series.values()]))
+        if not len(all_years):
+            return {ticker: None for ticker in tickers}
+        values = {}
+        for metric, (years, matrix) in series.items():
+            aligned = np.full((len(tickers), len(all_years)), np.nan)
+            aligned[:, np.searchsorted(all_years, years)] = matrix
+            values[metric] = aligned
+
+        revenue = values["revenue"]
+        rows = np.arange(len(tickers))
+        cols = np.arange(len(all_years))
+        has_revenue = ~np.isnan(revenue)
+        has_any = has_revenue.any(axis=1)
+
+        # Latest year with revenue, and the earliest year inside the CAGR window
+        latest = len(all_years) - 1 - np.argmax(has_revenue[:, ::-1], axis=1)
+        in_window = has_revenue & (cols >= (latest - cagr_years)[:, None]) & (cols <= latest[:, None])
+        first = np.argmax(in_window, axis=1)
+        span = latest - first
+
+        def at(matrix: np.ndarray, index: np.ndarray) -> np.ndarray:
+            return matrix[rows, np.clip(index, 0, len(all_years) - 1)]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rev_latest = at(revenue, latest)
+            rev_first = at(revenue, first)
+            cagr = np.where((span > 0) & (rev_first > 0) & (rev_latest > 0),
+                            (rev_latest / rev_first) ** (1.0 / np.maximum(span, 1)) - 1, np.nan)
+            rev_prior = np.where(latest > 0, at(revenue, latest - 1), np.nan)
+            yoy = np.where(rev_prior > 0, rev_latest / rev_prior - 1, np.nan)
+            operating_income = at(values["operating_income"], latest)
+            margin = np.where(rev_latest > 0, operating_income / rev_latest, np.nan)
+            margin_first = np.where(rev_first > 0, at(values["operating_income"], first) / rev_first, np.nan)
+
+            # Cash conversion at the latest year with both OCF and net income
+            both = ~np.isnan(values["operating_cash_flow"]) & ~np.isnan(values["net_income"])
+            has_both = both.any(axis=1)
+            latest_both = len(all_years) - 1 - np.argmax(both[:, ::-1], axis=1)
+            ocf = at(values["operating_cash_flow"], latest_both)
+            net_income = at(values["net_income"], latest_both)
+            ocf_ratio = np.where(has_both & (net_income != 0), ocf / net_income, np.nan)
+
+        def number(x) -> Optional[float]:
+            return None if np.isnan(x) else float(x)
+
+        metrics = {}
+        for i, ticker in enumerate(tickers):
+            if not has_any[i]:
+                metrics[ticker] = None
+                continue
+            metrics[ticker] = {
+                "ticker": ticker,
+                "fiscal_year": int(all_years[latest[i]]),
+                "cagr_start_year": int(all_years[first[i]]),
+                "cagr_years": int(span[i]),
+                "revenue": number(rev_latest[i]),
+                "revenue_cagr": number(cagr[i]),
+                "revenue_growth_yoy": number(yoy[i]),
+                "operating_income": number(operating_income[i]),
+                "operating_margin": number(margin[i]),
+                "operating_margin_start": number(margin_first[i]),
+                "cash_flow_year": int(all_years[latest_both[i]]) if has_both[i] else None,
+                "operating_cash_flow": number(ocf[i]) if has_both[i] else None,
+                "net_income": number(net_income[i]) if has_both[i] else None,
+                "ocf_to_net_income": number(ocf_ratio[i]),
+            }
+        return metrics
+
+    @staticmethod
+    def format_metrics(metrics: Dict[str, Any]) -> str:
+        """
+        Compact text for the LLM context.
+        """
+        def money(x: Optional[float]) -> str:
+            if x is None:
+                return "n/a"
+            for divisor, suffix in ((1e9, "B"), (1e6, "M")):
+                if abs(x) >= divisor:
+                    return f"${x / divisor:,.2f}{suffix}"
+            return f"${x:,.0f}"
+
+        def pct(x: Optional[float]) -> str:
+            return "n/a" if x is None else f"{x:.1%}"
+
+        m = metrics
+        lines = [
+            f"[Computed XBRL metrics: {m['ticker']}, fiscal year {m['fiscal_year']} (SEC companyfacts)]",
+            f"Revenue: {money(m['revenue'])} (YoY growth {pct(m['revenue_growth_yoy'])})",
+            f"Revenue CAGR ({m['cagr_years']}y, FY{m['cagr_start_year']}-FY{m['fiscal_year']}): {pct(m['revenue_cagr'])}",
+            f"Operating income: {money(m['operating_income'])}; operating margin {pct(m['operating_margin'])} "
+            f"(FY{m['cagr_start_year']}: {pct(m['operating_margin_start'])})",
+        ]
+        if m["cash_flow_year"] is not None:
+            ratio = "n/a" if m["ocf_to_net_income"] is None else f"{m['ocf_to_net_income']:.2f}x"
+            lines.append(
+                f"Operating cash flow / net income (FY{m['cash_flow_year']}): {ratio} "
+                f"(OCF {money(m['operating_cash_flow'])}, net income {money(m['net_income'])})"
+            )
+        else:
+            lines.append("Operating cash flow / net income: n/a")
+        return "\n".join(lines)
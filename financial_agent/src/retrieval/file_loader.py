@@ -1,105 +1,333 @@
-import fitz  # PyMuPDF
-from PIL import Image
 import io
-import base64
-from typing import List, Dict, Any
+import hashlib
+import itertools
+import multiprocessing
+from collections import deque
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from src.utils.cache import DiskCache
 from src.utils.llm import llm_client
+from src.utils.lazy import LazyObject
 from src.config import config
 import os
 
+# Formats GPT-4o Vision accepts; anything else (jpx, jb2, tiff, ...) is re-encoded
+MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+# Filter small icons/logos (heuristic: < 15KB to skip more noise)
+MIN_IMAGE_BYTES = 15360
+# Pages per process-pool task in batch extraction
+PAGES_PER_TASK = 8
+
+def _page_record(doc, page_num: int, seen_xrefs: set) -> Dict[str, Any]:
+    page = doc[page_num]
+    images = []
+    for img in page.get_images(full=True):
+        xref = img[0]
+        # Repeated images (logos, letterhead) share an xref within a document
+        if xref in seen_xrefs:
+            continue
+        seen_xrefs.add(xref)
+        base_image = doc.extract_image(xref)
+        if len(base_image["image"]) < MIN_IMAGE_BYTES:
+            continue
+        images.append({"xref": xref, "image": base_image["image"], "ext": base_image.get("ext")})
+    return {"page": page_num + 1, "text": page.get_text(), "images": images}
+
+def extract_pages(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    Extracts text and candidate images from pages [start, end) of a PDF.
+    Module-level so it can run in a worker process.
+    """
+    import fitz  # PyMuPDF
+    seen_xrefs = set()
+    with fitz.open(file_path) as doc:
+        return [_page_record(doc, page_num, seen_xrefs) for page_num in range(start, min(end, len(doc)))]
+
 class LocalFileLoader:
     def __init__(self):
         self.supported_exts = [".pdf"]
+        # Upper bound on images held in memory while waiting for Vision results
+        self.vision_workers = config.VISION_MAX_WORKERS
+        self.max_pending_images = max(10, 2 * self.vision_workers)
+        # Longest side sent to Vision (larger images are downscaled and recompressed); 0 = as is
+        self.max_image_side = config.VISION_MAX_IMAGE_SIDE
+        self.jpeg_quality = config.VISION_JPEG_QUALITY
+        
+        # Image descriptions keyed by the SHA-256 of the image bytes, so logos,
+        # signatures and letterheads are only described once across all files
+        self.description_cache = None
+        if config.VISION_CACHE_ENABLED:
+            self.description_cache = DiskCache(
+                config.LLM_CACHE_PATH, namespace="vision", max_entries=config.VISION_CACHE_MAX_ENTRIES
+            )
 
     def process_file(self, file_path: str) -> List[Dict[str, Any]]:
         """
         Processes a local file, extracting text and analyzing images using GPT-4o.
         Returns a list of content blocks (text or image-description).
         """
+        return list(self.iter_file(file_path))
+
+    def iter_file(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming version of process_file: yields content blocks page by page
+        so downstream chunking/embedding can start with the first pages.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
             
         ext = os.path.splitext(file_path)[1].lower()
         if ext == ".pdf":
-            return self._process_pdf(file_path)
+            yield from self._iter_pdf(file_path)
         else:
             print(f"Unsupported file extension: {ext}")
-            return []
+
+    def iter_files(self, file_paths: List[str], workers: int = None) -> Iterator[Tuple[str, Iterator[Dict[str, Any]]]]:
+        """
+        Batch version of iter_file: yields (path, lazy block iterator) per file, in order.
+        Page extraction runs on a process pool across files and pages (PAGES_PER_TASK
+        pages per task, a bounded window of tasks in flight), so later files are
+        already being extracted while earlier ones are chunked and embedded.
+        Each block iterator must be consumed before moving on to the next file.
+        """
+        import fitz  # PyMuPDF
+        from tqdm import tqdm
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = workers or config.INGEST_PROCESS_WORKERS
+        tasks = []
+        page_counts = {}
+        for path in dict.fromkeys(file_paths):
+            if os.path.splitext(path)[1].lower() not in self.supported_exts:
+                print(f"Skipping unsupported file: {path}")
+                continue
+            try:
+                with fitz.open(path) as doc:
+                    page_counts[path] = len(doc)
+            except Exception as e:
+                print(f"Skipping unreadable file {path}: {e}")
+                continue
+            tasks += [(path, start, start + PAGES_PER_TASK) for start in range(0, page_counts[path], PAGES_PER_TASK)]
+        
+        def page_records():
+            # Spawned (not forked) workers: the parent already runs embedding and Vision threads
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending_tasks = iter(tasks)
+                window = deque()
+                for task in itertools.islice(pending_tasks, workers * 2):
+                    window.append((task, pool.submit(extract_pages, *task)))
+                while window:
+                    task, future = window.popleft()
+                    next_task = next(pending_tasks, None)
+                    if next_task is not None:
+                        window.append((next_task, pool.submit(extract_pages, *next_task)))
+                    try:
+                        pages = future.result()
+                    except Exception as e:
+                        print(f"Error extracting pages {task[1] + 1}-{task[2]} of {task[0]}: {e}")
+                        continue
+                    for page in pages:
+                        yield task[0], page
+        
+        for path, records in itertools.groupby(page_records(), key=lambda record: record[0]):
+            print(f"Processing PDF: {path} ({page_counts[path]} pages)")
+            pages = tqdm((page for _, page in records), total=page_counts[path], desc="Extracting Content")
+            yield path, self._iter_page_blocks(pages)
 
     def _process_pdf(self, file_path: str) -> List[Dict[str, Any]]:
-        doc = fitz.open(file_path)
-        content_blocks = []
+        return list(self._iter_pdf(file_path))
+
+    def _iter_pdf(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        import fitz  # PyMuPDF
+        from tqdm import tqdm
         
+        doc = fitz.open(file_path)
         print(f"Processing PDF: {file_path} ({len(doc)} pages)")
-        
+        seen_xrefs = set()
+        pages = (_page_record(doc, page_num, seen_xrefs) for page_num in range(len(doc)))
+        try:
+            yield from self._iter_page_blocks(tqdm(pages, total=len(doc), desc="Extracting Content"))
+        finally:
+            doc.close()
+
+    def _iter_page_blocks(self, pages: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Turns extracted page records (text + candidate images) into content
+        blocks, describing images with GPT-4o Vision in the background.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
         from tqdm import tqdm
-        from concurrent.futures import ThreadPoolExecutor, as_completed
         
-        # We will collect image tasks
-        image_tasks = []
+        def to_block(future, task) -> Dict[str, Any]:
+            try:
+                # Counted here on the consumer thread, not on the Vision workers
+                description, sent = future.result()
+                stats["bytes_sent"] += sent
+                if description is None:
+                    stats["vision_failed"] += 1
+                elif description:
+                    return {
+                        "type": "image_description",
+                        "content": f"[Image Description Page {task['page_num']}]: {description}",
+                        "page": task['page_num'],
+                        "original_image_xref": task['xref']
+                    }
+            except Exception as e:
+                print(f"Error processing image on page {task['page_num']}: {e}")
+            return None
         
-        # 1. First Pass: Extract Text and Collect Images
-        # Using tqdm for page iteration
-        for page_num, page in enumerate(tqdm(doc, desc="Extracting Content")):
-            # Text
-            text = page.get_text()
-            if text.strip():
-                content_blocks.append({
-                    "type": "text",
-                    "content": text,
-                    "page": page_num + 1
-                })
-            
-            # Images
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
+        # Images go to GPT-4o Vision in the background while we keep reading pages.
+        # At most max_pending_images are in flight, so image bytes never pile up.
+        # Worker threads only bound the fan-out; the shared OpenAI limiter decides
+        # how many Vision calls actually run at once
+        pending = {}
+        seen = set()  # Content hashes already handled in this file
+        stats = {"images": 0, "duplicates": 0, "cached": 0, "vision_calls": 0, "vision_failed": 0, "bytes_in": 0, "bytes_sent": 0}
+        with ThreadPoolExecutor(max_workers=self.vision_workers) as executor:
+            for record in pages:
+                page_num = record["page"]
+                # Text
+                text = record["text"]
+                if text.strip():
+                    yield {
+                        "type": "text",
+                        "content": text,
+                        "page": page_num
+                    }
                 
-                # Filter small icons/logos (heuristic: < 15KB to skip more noise)
-                if len(image_bytes) < 15360: 
-                    continue
+                # Images
+                for image in record["images"]:
+                    xref = image["xref"]
+                    image_bytes = image["image"]
                     
-                image_tasks.append({
-                    "page_num": page_num + 1,
-                    "image_bytes": image_bytes,
-                    "xref": xref
-                })
-
-        print(f"Found {len(image_tasks)} potential financial images. Analyzing with Vision API...")
-        
-        # 2. Parallel Processing for GPT-4o Vision
-        # Max workers limited to avoid rate limits
-        if image_tasks:
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_img = {
-                    executor.submit(self._analyze_image_with_gpt4o, task["image_bytes"]): task 
-                    for task in image_tasks
-                }
-                
-                for future in tqdm(as_completed(future_to_img), total=len(image_tasks), desc="Analyzing Images"):
-                    task = future_to_img[future]
-                    try:
-                        description = future.result()
-                        if description:
-                            content_blocks.append({
+                    # The same image repeated on later pages is described once per file
+                    image_hash = hashlib.sha256(image_bytes).hexdigest()
+                    if image_hash in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(image_hash)
+                    stats["images"] += 1
+                    task = {"page_num": page_num, "xref": xref}
+                    
+                    # Seen in an earlier file (or run): no Vision call
+                    cached = self._cached_description(image_hash)
+                    if cached is not None:
+                        stats["cached"] += 1
+                        if cached:
+                            yield {
                                 "type": "image_description",
-                                "content": f"[Image Description Page {task['page_num']}]: {description}",
+                                "content": f"[Image Description Page {task['page_num']}]: {cached}",
                                 "page": task['page_num'],
-                                "original_image_xref": task['xref']
-                            })
-                    except Exception as e:
-                        print(f"Error processing image on page {task['page_num']}: {e}")
+                                "original_image_xref": xref
+                            }
+                        continue
                     
-        return content_blocks
+                    if len(pending) >= self.max_pending_images:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            block = to_block(future, pending.pop(future))
+                            if block:
+                                yield block
+                    
+                    stats["vision_calls"] += 1
+                    stats["bytes_in"] += len(image_bytes)
+                    pending[executor.submit(self._describe_image, image_hash, image_bytes, image["ext"])] = task
+                
+                # Emit any descriptions that finished while we read this page
+                for future in [f for f in pending if f.done()]:
+                    block = to_block(future, pending.pop(future))
+                    if block:
+                        yield block
+            
+            print(f"Found {stats['images']} unique potential financial images "
+                  f"({stats['duplicates']} repeats skipped, {stats['cached']} cached). "
+                  f"Waiting on {len(pending)} Vision API calls...")
+            for future in tqdm(list(pending), desc="Analyzing Images"):
+                block = to_block(future, pending.pop(future))
+                if block:
+                    yield block
+        
+        if stats["vision_calls"]:
+            print(f"Vision upload: {stats['bytes_sent'] / 1024:.0f}KB sent for {stats['bytes_in'] / 1024:.0f}KB of images.")
+        if stats["vision_failed"]:
+            # Failures are not cached: re-ingesting the file retries just these images
+            print(f"Warning: {stats['vision_failed']} of {stats['vision_calls']} images could not be described "
+                  f"after retries; re-run the ingest to describe them.")
 
-    def _analyze_image_with_gpt4o(self, image_bytes: bytes) -> str:
+    def _cached_description(self, image_hash: str) -> Optional[str]:
         """
-        Sends image to GPT-4o for financial data extraction.
+        Cached description for an image hash: None when unknown, "" for images
+        known to hold no financial data.
+        """
+        if self.description_cache is None:
+            return None
+        return self.description_cache.get(DiskCache.make_key(config.LLM_MODEL, image_hash))
+
+    def _describe_image(self, image_hash: str, image_bytes: bytes, ext: str) -> Tuple[Optional[str], int]:
+        """
+        Downscales/converts the image, asks GPT-4o Vision and caches the answer.
+        Returns (description, bytes uploaded); the description is None when
+        the API call failed. API errors are not cached.
+        """
+        payload, mime_type = self._prepare_image(image_bytes, ext)
+        description = self._analyze_image_with_gpt4o(payload, mime_type)
+        if description is None:
+            return None, len(payload)
+        if self.description_cache is not None:
+            self.description_cache.set(DiskCache.make_key(config.LLM_MODEL, image_hash), description)
+        return description, len(payload)
+
+    def _prepare_image(self, image_bytes: bytes, ext: str) -> Tuple[bytes, str]:
         """
-        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        Returns (bytes, MIME type) to upload. Images larger than max_image_side
+        are downscaled and recompressed (JPEG, or PNG when they have
+        transparency); formats Vision does not accept are re-encoded the same way.
+        """
+        ext = (ext or "").lower()
+        mime_type = MIME_TYPES.get(ext)
+        if mime_type and not self.max_image_side:
+            return image_bytes, mime_type
+        
+        try:
+            from PIL import Image
+            image = Image.open(io.BytesIO(image_bytes))
+            image.load()
+        except Exception as e:
+            if mime_type:
+                return image_bytes, mime_type
+            raise ValueError(f"Unsupported image format '{ext}': {e}")
         
+        oversized = self.max_image_side and max(image.size) > self.max_image_side
+        if mime_type and not oversized:
+            return image_bytes, mime_type
+        if oversized:
+            image.thumbnail((self.max_image_side, self.max_image_side))
+        
+        out = io.BytesIO()
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            image.save(out, format="PNG", optimize=True)
+            converted = (out.getvalue(), "image/png")
+        else:
+            image.convert("RGB").save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            converted = (out.getvalue(), "image/jpeg")
+        
+        # Keep the original when recompression does not help
+        if mime_type and len(converted[0]) >= len(image_bytes):
+            return image_bytes, mime_type
+        return converted
+
+    def _analyze_image_with_gpt4o(self, image_bytes: bytes, mime_type: str = "image/jpeg") -> Optional[str]:
+        """
+        Sends image to GPT-4o for financial data extraction.
+        Returns "" for images without financial data and None when the call
+        failed after retries.
+        """
         prompt = """
         Analyze this image. If it contains a financial table, chart, or graph:
         1. Transcribe the key data points or table values into Markdown format.
@@ -108,36 +336,15 @@ class LocalFileLoader:
         If it is just a decorative image or logo, return "NO_FINANCIAL_DATA".
         """
         
-        # We need to construct the payload for GPT-4o (Vision)
-        # Using the OpenAI client directly from llm_client might need adjustment 
-        # as analyze_text is text-only usually. 
-        # accessing the client directly:
-        
+        # Goes through the shared OpenAI limiter (rate limits, AIMD concurrency
+        # and retries with backoff); None only once the retries are exhausted
         try:
-            response = llm_client.client.chat.completions.create(
-                model=config.LLM_MODEL, # gpt-4o supports vision
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=500
-            )
-            result = response.choices[0].message.content
+            result = llm_client.describe_image(prompt, image_bytes, mime_type, max_tokens=500)
             if "NO_FINANCIAL_DATA" in result:
                 return ""
             return result
         except Exception as e:
             print(f"GPT-4o Vision API Error: {e}")
-            return ""
+            return None
 
-file_loader = LocalFileLoader()
+file_loader = LazyObject(LocalFileLoader)
@@ -3,83 +3,192 @@ import json
 import os
 import uuid
 import hashlib
-from typing import List, Dict, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterator, Tuple
 from src.config import config
+from src.retrieval.sections import SectionTracker, is_sectioned
+
+class CorpusWriter:
+    """
+    Streams chunks into a corpus file as a JSON array, one chunk per line.
+    Writes go to a temp file that replaces the previous corpus only once the
+    document has been fully processed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.count = 0
+        self.saved = False
+        self._file = None
+
+    def __enter__(self):
+        try:
+            self._file = open(self.tmp_path, "w")
+            self._file.write("[")
+        except Exception as e:
+            print(f"Error saving corpus: {e}")
+            self._file = None
+        return self
+
+    def write(self, chunk: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(json.dumps(chunk))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None:
+            return False
+        try:
+            self._file.write("\n]\n")
+            self._file.close()
+            if exc_type is None:
+                os.replace(self.tmp_path, self.path)
+                self.saved = True
+            else:
+                os.remove(self.tmp_path)
+        except Exception as e:
+            print(f"Error saving corpus: {e}")
+        return False
 
 class IngestionEngine:
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self._text_splitter = None
+        # Characters of text split at a time when streaming
+        self.stream_window = 20000
         self.corpus_dir = os.path.join(config.DATA_DIR, "corpus")
         os.makedirs(self.corpus_dir, exist_ok=True)
 
+    @property
+    def text_splitter(self):
+        # langchain is slow to import; only load it when we actually chunk
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
+
     def process_document(self, ticker: str, doc_type: str, content: Any, year: str = "Latest", source_url: str = "") -> List[Dict[str, Any]]:
         """
         Chunks the document and prepares it for ingestion.
         content: Can be a raw string OR a list of dicts (for multimodal: [{'type': 'text', 'content': ...}])
         year: Year of the filing (e.g., "2024"). Injected into text for context.
         """
-        chunks = []
-        
+        return list(self.iter_chunks(ticker, doc_type, content, year=year, source_url=source_url))
+
+    def iter_chunks(self, ticker: str, doc_type: str, content: Any, year: str = "Latest", source_url: str = "",
+                    corpus: CorpusWriter = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming version of process_document.
+        content may also be any iterator of content blocks (e.g. LocalFileLoader.iter_file),
+        which is consumed lazily. Chunks are yielded as soon as they are split and
+        appended to the local corpus file as they go.
+        corpus: shared writer when several documents of a ticker go into one corpus
+            file (batch ingestion); by default the document replaces the ticker's corpus.
+        """
+        # Tickers are stored upper-case; filters and the BM25 index match on that
+        ticker = ticker.upper()
         # Metadata Header to prepend to each chunk
         meta_header = f"[Ticker: {ticker} | Year: {year} | Type: {doc_type}]"
         
-        # Handle Multimodal List
-        if isinstance(content, list):
-            full_text = ""
-            for block in content:
-                # Merge into a single stream for context, or treat image descriptions as text?
-                # Best strategy: Interleave them.
-                full_text += f"\n\n{block['content']}"
-            
-            # Now chunk the merged text
-            chunks = self.text_splitter.split_text(full_text)
-            
-        elif isinstance(content, str):
-            chunks = self.text_splitter.split_text(content)
-        
-        processed_chunks = []
         # Define a namespace for our app
         APP_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "financial_agent")
         
-        for i, chunk in enumerate(chunks):
-            # Inject Metadata into the text itself for better LLM context
-            enriched_text = f"{meta_header}\n{chunk}"
-            
-            # Generate Deterministic ID
-            # Combined key: ticker + year + doc_type + chunk_index + content_hash
-            # We assume chunk_index is stable for the same file content.
-            # Even better: mix in a hash of the content itself.
-            content_hash = hashlib.md5(chunk.encode("utf-8")).hexdigest()
-            unique_str = f"{ticker}_{year}_{doc_type}_{i}_{content_hash}"
-            chunk_uuid = str(uuid.uuid5(APP_NAMESPACE, unique_str))
-            
-            metadata = {
-                "id": chunk_uuid,
-                "ticker": ticker,
-                "doc_type": doc_type,
-                "year": year,
-                "source": source_url,
-                "chunk_id": i,
-                "text": enriched_text 
-            }
-            # We will rely on the vector DB to generate UUIDs or handle ID generation if needed
-            processed_chunks.append(metadata)
-            
         # Save to local corpus for BM25
         corpus_path = os.path.join(self.corpus_dir, f"{ticker}.json")
-        try:
-            with open(corpus_path, "w") as f:
-                json.dump(processed_chunks, f, indent=2)
+        # 10-K/10-Q text is labelled with its Item so chunks never straddle
+        # sections and retrieval can filter on them
+        parts = self._iter_text_parts(content)
+        if is_sectioned(doc_type):
+            segments = SectionTracker(doc_type).segments(parts)
+        else:
+            segments = ((None, part) for part in parts)
+        
+        owns_corpus = corpus is None
+        with (CorpusWriter(corpus_path) if owns_corpus else nullcontext(corpus)) as corpus:
+            for i, (section, chunk) in enumerate(self._split_stream(segments)):
+                # Inject Metadata into the text itself for better LLM context
+                enriched_text = f"{meta_header}\n{chunk}"
+                
+                # Generate Deterministic ID
+                # Combined key: ticker + year + doc_type + chunk_index + content_hash
+                # We assume chunk_index is stable for the same file content.
+                # Even better: mix in a hash of the content itself.
+                content_hash = hashlib.md5(chunk.encode("utf-8")).hexdigest()
+                unique_str = f"{ticker}_{year}_{doc_type}_{i}_{content_hash}"
+                chunk_uuid = str(uuid.uuid5(APP_NAMESPACE, unique_str))
+                
+                metadata = {
+                    "id": chunk_uuid,
+                    "ticker": ticker,
+                    "doc_type": doc_type,
+                    "year": year,
+                    "source": source_url,
+                    "chunk_id": i,
+                    "item": section.item if section else None,
+                    "section": section.key if section else None,
+                    "section_title": section.title if section else None,
+                    "text": enriched_text 
+                }
+                corpus.write(metadata)
+                yield metadata
+        
+        if owns_corpus and corpus.saved:
             print(f"Saved corpus for {ticker} to {corpus_path}")
-        except Exception as e:
-            print(f"Error saving corpus: {e}")
-            
-        return processed_chunks
+
+    def corpus_writer(self, ticker: str) -> CorpusWriter:
+        return CorpusWriter(os.path.join(self.corpus_dir, f"{ticker.upper()}.json"))
+
+    def _iter_text_parts(self, content: Any) -> Iterator[str]:
+        if isinstance(content, str):
+            yield content
+        elif content is not None:
+            # Multimodal blocks: interleave text and image descriptions in page order
+            for block in content:
+                yield f"\n\n{block['content']}"
+
+    def _split_stream(self, segments: Iterator[Tuple[Any, str]]) -> Iterator[Tuple[Any, str]]:
+        """
+        Splits a stream of (section, text) segments with the recursive splitter
+        without ever materializing the full document. Text is split one window
+        at a time; the last chunk of each window is carried over and re-split
+        with the text that follows it, so chunk boundaries match a full split
+        closely. The buffer is flushed whenever the section changes.
+        """
+        window = self.stream_window
+        buffer = ""
+        current = None
+        for section, part in segments:
+            if section != current:
+                if buffer.strip():
+                    for piece in self.text_splitter.split_text(buffer):
+                        yield current, piece
+                buffer = ""
+                current = section
+            buffer += part
+            while len(buffer) >= window:
+                cut = self._cut_point(buffer, window)
+                pieces = self.text_splitter.split_text(buffer[:cut])
+                if len(pieces) <= 1:
+                    break
+                for piece in pieces[:-1]:
+                    yield current, piece
+                buffer = pieces[-1] + buffer[cut:]
+        if buffer.strip():
+            for piece in self.text_splitter.split_text(buffer):
+                yield current, piece
+
+    @staticmethod
+    def _cut_point(buffer: str, window: int) -> int:
+        # Cut just before a separator so the carried-over chunk rejoins cleanly
+        cut = buffer.rfind("\n", 0, window)
+        if cut <= window // 2:
+            cut = buffer.rfind(" ", 0, window)
+        return cut if cut > 0 else window
 
     def extract_tables(self, html_content: str) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,197 @@
+import os
+import datetime
+from typing import Any, Dict, Iterable, Set
+import numpy as np
+from src.config import config
+from src.retrieval.columnar import ColumnarStore
+from src.tools.form4 import InsiderTransaction, ROLE_CEO, ROLE_CFO, role_names
+
+# Numeric columns and their dtypes
+NUMERIC_COLUMNS = {
+    "date": "datetime64[D]",
+    "shares": "f8",
+    "price": "f8",
+    "value": "f8",          # shares * price
+    "shares_after": "f8",
+    "roles": "u1",          # ROLE_* bitmask
+    "acquired": "?",
+    "direct": "?",
+    "derivative": "?",
+    "plan_10b5_1": "?",
+    "code": "U1",
+}
+# String columns are dictionary-encoded: int32 ids into a per-column vocabulary
+ENCODED_COLUMNS = ("ticker", "filer", "title", "accession")
+
+class InsiderStore(ColumnarStore):
+    """
+    Local columnar store of Form 4 transactions: one numpy array per field,
+    strings dictionary-encoded, persisted as a single .npz file. Aggregates
+    by ticker and time window are vectorized mask operations, so the
+    Alignment dimension gets computed numbers without any LLM parsing.
+    """
+
+    NUMERIC_COLUMNS = NUMERIC_COLUMNS
+    ENCODED_COLUMNS = ENCODED_COLUMNS
+
+    def __init__(self, path: str = None):
+        super().__init__(path or config.INSIDER_STORE_PATH)
+        if os.path.exists(self.path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._columns["date"])
+
+    def has_accession(self, accession: str) -> bool:
+        return accession in self._index["accession"]
+
+    def accessions(self) -> Set[str]:
+        return set(self._index["accession"])
+
+    def mark_processed(self, accession: str) -> None:
+        """
+        Records a filing as ingested even if it added no rows (e.g. a
+        holdings-only Form 4), so accessions() skips it on the next run.
+        The accession vocabulary doubles as the list of processed filings.
+        Call after add(), which skips accessions already known.
+        """
+        with self._lock:
+            self._encode("accession", accession)
+
+    def add(self, records: Iterable[InsiderTransaction]) -> int:
+        """
+        Appends transactions. Filings (accessions) already in the store are
+        skipped, so re-ingesting is idempotent. Returns the number of rows added.
+        Call save() to persist.
+        """
+        with self._lock:
+            known = set(self._index["accession"])
+            rows = [r for r in records if not (r.accession and r.accession in known)]
+            if not rows:
+                return 0
+
+            new = {
+                "date": np.array([r.date or "NaT" for r in rows], dtype="datetime64[D]"),
+                "shares": np.array([r.shares for r in rows], dtype="f8"),
+                "price": np.array([r.price for r in rows], dtype="f8"),
+                "shares_after": np.array([r.shares_after for r in rows], dtype="f8"),
+                "roles": np.array([r.roles for r in rows], dtype="u1"),
+                "acquired": np.array([r.acquired for r in rows], dtype="?"),
+                "direct": np.array([r.direct for r in rows], dtype="?"),
+                "derivative": np.array([r.derivative for r in rows], dtype="?"),
+                "plan_10b5_1": np.array([r.plan_10b5_1 for r in rows], dtype="?"),
+                "code": np.array([r.code[:1] for r in rows], dtype="U1"),
+            }
+            new["value"] = new["shares"] * new["price"]
+            for name, values in new.items():
+                self._columns[name] = np.concatenate([self._columns[name], values])
+
+            encoded = {
+                "ticker": [r.ticker for r in rows],
+                "filer": [r.filer_name for r in rows],
+                "title": [r.officer_title for r in rows],
+                "accession": [r.accession for r in rows],
+            }
+            for name, values in encoded.items():
+                ids = np.array([self._encode(name, v) for v in values], dtype="i4")
+                self._ids[name] = np.concatenate([self._ids[name], ids])
+            return len(rows)
+
+    def _window(self, ticker: str, days: int, as_of: datetime.date) -> np.ndarray:
+        ticker_id = self._index["ticker"].get(ticker.upper())
+        if ticker_id is None:
+            return np.zeros(len(self), dtype=bool)
+        end = np.datetime64(as_of, "D")
+        start = end - np.timedelta64(days, "D")
+        dates = self._columns["date"]
+        return (self._ids["ticker"] == ticker_id) & (dates > start) & (dates <= end)
+
+    def summary(self, ticker: str, days: int = None, as_of: datetime.date = None, recent: int = 5) -> Dict[str, Any]:
+        """
+        Insider activity for a ticker over the `days` before `as_of` (default:
+        INSIDER_WINDOW_DAYS up to today). Net figures use open-market
+        purchases (P) and sales (S) of non-derivative securities only; grants,
+        exercises, tax withholding and gifts are counted separately.
+        """
+        days = days or config.INSIDER_WINDOW_DAYS
+        as_of = as_of or datetime.date.today()
+        c = self._columns
+        window = self._window(ticker, days, as_of)
+
+        open_market = window & ~c["derivative"]
+        buys = open_market & (c["code"] == "P")
+        sells = open_market & (c["code"] == "S")
+        executives = (c["roles"] & (ROLE_CEO | ROLE_CFO)) != 0
+
+        def side(mask: np.ndarray) -> Dict[str, Any]:
+            return {
+                "transactions": int(mask.sum()),
+                "insiders": int(np.unique(self._ids["filer"][mask]).size),
+                "shares": float(c["shares"][mask].sum()),
+                "value": float(c["value"][mask].sum()),
+            }
+
+        summary = {
+            "ticker": ticker.upper(),
+            "window_days": days,
+            "as_of": str(as_of),
+            "transactions": int(window.sum()),
+            "filings": int(np.unique(self._ids["accession"][window]).size),
+            "purchases": side(buys),
+            "sales": side(sells),
+            "executive_purchases": side(buys & executives),
+            "executive_sales": side(sells & executives),
+            "sales_under_10b5_1": float(c["plan_10b5_1"][sells].mean()) if sells.any() else 0.0,
+            "other": {code: int((window & (c["code"] == code)).sum()) for code in ("A", "M", "F", "G")},
+        }
+        summary["net_shares"] = summary["purchases"]["shares"] - summary["sales"]["shares"]
+        summary["net_value"] = summary["purchases"]["value"] - summary["sales"]["value"]
+
+        # Most recent CEO/CFO open-market trades
+        rows = np.flatnonzero((buys | sells) & executives)
+        rows = rows[np.argsort(c["date"][rows])[::-1][:recent]]
+        summary["recent_executive_trades"] = [
+            {
+                "date": str(c["date"][i]),
+                "filer": self._vocab["filer"][self._ids["filer"][i]],
+                "title": self._vocab["title"][self._ids["title"][i]],
+                "roles": role_names(int(c["roles"][i])),
+                "code": str(c["code"][i]),
+                "shares": float(c["shares"][i]),
+                "price": float(c["price"][i]),
+            }
+            for i in rows
+        ]
+        return summary
+
+    @staticmethod
+    def format_summary(summary: Dict[str, Any]) -> str:
+        """
+        Compact text for the LLM context.
+        """
+        def side(label: str, s: Dict[str, Any]) -> str:
+            return f"{label}: {s['transactions']} transactions by {s['insiders']} insiders, {s['shares']:,.0f} shares, ${s['value']:,.0f}"
+
+        def signed_dollars(value: float) -> str:
+            # -$600,500 / +$1,200 / $0
+            sign = "-" if value < 0 else "+" if value > 0 else ""
+            return f"{sign}${abs(value):,.0f}"
+
+        direction = "net buying" if summary["net_value"] > 0 else "net selling" if summary["net_value"] < 0 else "no net open-market activity"
+        other = summary["other"]
+        lines = [
+            f"[Computed Form 4 insider activity: {summary['ticker']}, {summary['window_days']} days to {summary['as_of']}]",
+            f"Transactions: {summary['transactions']} across {summary['filings']} filings",
+            side("Open-market purchases", summary["purchases"]),
+            side("Open-market sales", summary["sales"]) + f" ({summary['sales_under_10b5_1']:.0%} under Rule 10b5-1 plans)",
+            f"Net open-market: {summary['net_shares']:+,.0f} shares, {signed_dollars(summary['net_value'])} ({direction})",
+            side("CEO/CFO purchases", summary["executive_purchases"]),
+            side("CEO/CFO sales", summary["executive_sales"]),
+            f"Other: {other['A']} grants/awards, {other['M']} option exercises, {other['F']} tax withholdings, {other['G']} gifts",
+        ]
+        if summary["recent_executive_trades"]:
+            lines.append("Recent CEO/CFO trades:")
+            for t in summary["recent_executive_trades"]:
+                action = "bought" if t["code"] == "P" else "sold"
+                lines.append(f"- {t['date']} {t['filer']} ({t['title'] or ', '.join(t['roles'])}) {action} {t['shares']:,.0f} shares @ ${t['price']:,.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, Iterable, Iterator, Tuple
+from src.config import config
+from src.retrieval.ingestion import IngestionEngine
+
+_DONE = object()
+_DOC = object()      # Followed by a document's metadata: (_DOC, doc)
+_DOC_END = object()  # Ends that document's blocks
+
+class IngestionAborted(Exception):
+    """Raised inside a stage when an upstream stage has failed."""
+
+class StreamingIngestionPipeline:
+    """
+    Streaming ingestion: extract -> chunk -> embed -> upsert.
+    Each stage runs on its own thread and hands work to the next through a
+    bounded queue, so embedding starts with the first pages and peak memory
+    stays flat regardless of document size. A slow stage applies
+    backpressure to the stages before it.
+    """
+
+    def __init__(self, vector_db, ingestion: IngestionEngine = None, batch_size: int = None, queue_size: int = 4):
+        self.vector_db = vector_db
+        self.ingestion = ingestion or IngestionEngine()
+        self.batch_size = batch_size or config.EMBED_BATCH_SIZE
+        self.queue_size = queue_size
+
+    def run(self, ticker: str, doc_type: str, content: Any, year: str = "Latest", source_url: str = "",
+            incremental: bool = False, prune: bool = False) -> Dict[str, Any]:
+        """
+        content: raw string, list of content blocks, or a lazy block iterator
+        (e.g. LocalFileLoader.iter_file). Returns ingestion stats.
+        """
+        return self.run_many(
+            [{"ticker": ticker, "doc_type": doc_type, "content": content, "year": year, "source_url": source_url}],
+            incremental=incremental, prune=prune
+        )
+
+    def run_many(self, documents: Iterable[Dict[str, Any]], incremental: bool = False, prune: bool = False) -> Dict[str, Any]:
+        """
+        Streams several documents through one shared chunk/embed/upsert pipeline
+        (models load once, batches span document boundaries).
+        documents: iterable of dicts with ticker, doc_type, content and optionally
+            year and source_url; consumed lazily, in order.
+        All documents of a ticker are written to one corpus file. Returns
+        combined stats plus per-document chunk counts.
+        """
+        self._stop = threading.Event()
+        self._errors = []
+        stats = {"documents": [], "chunks": 0, "skipped": 0, "uploaded": 0, "first_upsert_s": None, "elapsed_s": 0.0, "chunks_per_s": 0.0}
+        chunk_keys = []
+        start = time.perf_counter()
+
+        blocks_q = queue.Queue(maxsize=self.queue_size * self.batch_size)
+        batches_q = queue.Queue(maxsize=self.queue_size)
+        points_q = queue.Queue(maxsize=self.queue_size)
+        threads = []
+
+        # 1. Extract: pull documents and their (lazy) blocks from the source
+        def extract():
+            for doc in documents:
+                if not self._put(blocks_q, (_DOC, doc)):
+                    return
+                content = doc["content"]
+                for block in ([content] if isinstance(content, str) else content):
+                    if not self._put(blocks_q, block):
+                        return
+                if not self._put(blocks_q, _DOC_END):
+                    return
+        threads.append(self._start_stage("extract", extract, blocks_q))
+
+        # 2. Chunk: split text as it arrives and batch the chunks
+        def chunk():
+            batch = []
+            with ExitStack() as corpora:
+                writers = {}
+                for doc, blocks in self._documents(blocks_q):
+                    ticker = doc["ticker"]
+                    if ticker not in writers:
+                        writers[ticker] = corpora.enter_context(self.ingestion.corpus_writer(ticker))
+                    year = doc.get("year", "Latest")
+                    doc_chunks = 0
+                    for chunk_doc in self.ingestion.iter_chunks(ticker, doc["doc_type"], blocks, year=year,
+                                                                source_url=doc.get("source_url", ""), corpus=writers[ticker]):
+                        stats["chunks"] += 1
+                        doc_chunks += 1
+                        chunk_keys.append({"id": chunk_doc["id"], "ticker": ticker, "year": year, "doc_type": doc["doc_type"]})
+                        batch.append(chunk_doc)
+                        if len(batch) >= self.batch_size:
+                            if not self._put(batches_q, batch):
+                                # Raise (not return) so the open corpus files are discarded
+                                raise IngestionAborted()
+                            batch = []
+                    stats["documents"].append({"ticker": ticker, "source": doc.get("source_url", ""), "chunks": doc_chunks})
+                if batch:
+                    self._put(batches_q, batch)
+            for ticker, writer in writers.items():
+                if writer.saved:
+                    print(f"Saved corpus for {ticker} to {writer.path}")
+        threads.append(self._start_stage("chunk", chunk, batches_q))
+
+        # 3. Embed: skip already-indexed chunks if requested, then embed
+        def embed():
+            for batch in self._drain(batches_q):
+                if incremental:
+                    # Lookups are routed per ticker (shard); batches can span documents
+                    existing_ids = set()
+                    for ticker in {d["ticker"] for d in batch}:
+                        existing_ids |= self.vector_db.existing_ids([d["id"] for d in batch if d["ticker"] == ticker], ticker=ticker)
+                    stats["skipped"] += sum(1 for d in batch if d["id"] in existing_ids)
+                    batch = [d for d in batch if d["id"] not in existing_ids]
+                    if not batch:
+                        continue
+                try:
+                    points = self.vector_db.embed_points(batch)
+                except Exception as e:
+                    print(f"Error embedding batch: {e}")
+                    continue
+                if not self._put(points_q, points):
+                    return
+        threads.append(self._start_stage("embed", embed, points_q))
+
+        # 4. Upsert on the calling thread
+        try:
+            for points in self._drain(points_q):
+                try:
+                    self.vector_db.upload_points(points)
+                    stats["uploaded"] += len(points)
+                    if stats["first_upsert_s"] is None:
+                        stats["first_upsert_s"] = time.perf_counter() - start
+                except Exception as e:
+                    print(f"Error uploading batch: {e}")
+        except IngestionAborted:
+            pass
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        if prune and chunk_keys:
+            self.vector_db.delete_stale(chunk_keys)
+
+        stats["elapsed_s"] = time.perf_counter() - start
+        if stats["elapsed_s"]:
+            stats["chunks_per_s"] = stats["uploaded"] / stats["elapsed_s"]
+        return stats
+
+    def _start_stage(self, name: str, fn, out_q: queue.Queue) -> threading.Thread:
+        def target():
+            try:
+                fn()
+            except IngestionAborted:
+                pass
+            except Exception as e:
+                print(f"Ingestion stage '{name}' failed: {e}")
+                self._errors.append(e)
+                self._stop.set()
+            finally:
+                # Always signal downstream, even on failure, so nothing blocks forever
+                self._put(out_q, _DONE, force=True)
+        thread = threading.Thread(target=target, name=f"ingest-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _put(self, q: queue.Queue, item: Any, force: bool = False) -> bool:
+        """
+        Blocking put that gives up once the pipeline is stopping.
+        """
+        while True:
+            if self._stop.is_set() and not force:
+                return False
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if force and self._stop.is_set():
+                    # Downstream is gone; drop one item to make room for the sentinel
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _documents(self, q: queue.Queue) -> Iterator[Tuple[Dict[str, Any], Iterator[Any]]]:
+        """
+        Splits the block stream back into (document, block iterator) pairs.
+        Each block iterator must be consumed before the next pair is requested.
+        """
+        items = self._drain(q)
+        for item in items:
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is _DOC:
+                def blocks():
+                    for block in items:
+                        if block is _DOC_END:
+                            return
+                        yield block
+                yield item[1], blocks()
+
+    def _drain(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                # A partial stream must not look like a complete document
+                # (e.g. the corpus file is only committed on clean completion)
+                if self._errors:
+                    raise IngestionAborted()
+                return
+            yield item
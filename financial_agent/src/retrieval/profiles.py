@@ -0,0 +1,205 @@
+from typing import Any, Dict, Optional, Tuple
+from qdrant_client import models
+from src.config import config
+
+# Named vectors in the collection
+DENSE_VECTOR = "all-MiniLM-L6-v2"
+SPARSE_VECTOR = "bm25"
+LATE_VECTOR = "colbertv2.0"
+
+DENSE_SIZE = 384   # all-MiniLM-L6-v2
+LATE_SIZE = 128    # colbertv2.0, one vector per token
+
+PROFILE_NAMES = ("dense", "dense_bm25", "colbert")
+QUANTIZATIONS = ("none", "scalar", "binary")
+
+class RetrievalProfile:
+    """
+    Collection layout and query plan for hybrid retrieval.
+
+    name:
+        dense       MiniLM only
+        dense_bm25  MiniLM + BM25, fused with reciprocal rank fusion
+        colbert     MiniLM -> BM25 -> ColBERT rerank (the original pipeline)
+    quantization: none | scalar (int8, ~4x smaller) | binary (~32x smaller).
+        Quantized vectors stay in RAM and results are rescored with the originals.
+    on_disk: keep original vectors (and the sparse index) on disk, memory-mapped.
+
+    Each profile variant lives in its own collection, so several can be
+    compared side by side on the same corpus.
+    """
+
+    def __init__(self, name: str = "colbert", quantization: str = "none", on_disk: bool = False):
+        if name not in PROFILE_NAMES:
+            raise ValueError(f"Unknown retrieval profile '{name}'. Choose from {', '.join(PROFILE_NAMES)}.")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Choose from {', '.join(QUANTIZATIONS)}.")
+        self.name = name
+        self.quantization = quantization
+        self.on_disk = on_disk
+
+    @classmethod
+    def from_config(cls) -> "RetrievalProfile":
+        return cls(config.RETRIEVAL_PROFILE, config.QDRANT_QUANTIZATION, config.QDRANT_ON_DISK)
+
+    @property
+    def uses_bm25(self) -> bool:
+        return self.name in ("dense_bm25", "colbert")
+
+    @property
+    def uses_colbert(self) -> bool:
+        return self.name == "colbert"
+
+    @property
+    def embedding_models(self) -> Tuple[str, ...]:
+        used = ["dense"]
+        if self.uses_bm25:
+            used.append("bm25")
+        if self.uses_colbert:
+            used.append("colbert")
+        return tuple(used)
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == "colbert" and self.quantization == "none" and not self.on_disk
+
+    def collection_name(self, base: str) -> str:
+        # The original layout keeps the original collection name
+        if self.is_default:
+            return base
+        suffix = self.name
+        if self.quantization != "none":
+            suffix += f"_{self.quantization}q"
+        if self.on_disk:
+            suffix += "_disk"
+        return f"{base}_{suffix}"
+
+    def __repr__(self) -> str:
+        return f"RetrievalProfile(name={self.name!r}, quantization={self.quantization!r}, on_disk={self.on_disk})"
+
+    # Collection layout
+
+    def _quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def vectors_config(self) -> Dict[str, models.VectorParams]:
+        vectors = {
+            DENSE_VECTOR: models.VectorParams(
+                size=DENSE_SIZE,
+                distance=models.Distance.COSINE,
+                on_disk=self.on_disk or None,
+                quantization_config=self._quantization_config(),
+            )
+        }
+        if self.uses_colbert:
+            vectors[LATE_VECTOR] = models.VectorParams(
+                size=LATE_SIZE,
+                distance=models.Distance.COSINE,
+                multivector_config=models.MultiVectorConfig(
+                    comparator=models.MultiVectorComparator.MAX_SIM,
+                ),
+                on_disk=self.on_disk or None,
+                quantization_config=self._quantization_config(),
+                # ColBERT only reranks prefetched candidates; no HNSW graph needed
+                hnsw_config=models.HnswConfigDiff(m=0),
+            )
+        return vectors
+
+    def sparse_vectors_config(self) -> Optional[Dict[str, models.SparseVectorParams]]:
+        if not self.uses_bm25:
+            return None
+        return {
+            SPARSE_VECTOR: models.SparseVectorParams(
+                modifier=models.Modifier.IDF,
+                index=models.SparseIndexParams(on_disk=True) if self.on_disk else None,
+            )
+        }
+
+    def point_vectors(self, dense, sparse, late) -> Dict[str, Any]:
+        vectors = {DENSE_VECTOR: dense.tolist()}
+        if self.uses_bm25:
+            vectors[SPARSE_VECTOR] = sparse.as_object()
+        if self.uses_colbert:
+            vectors[LATE_VECTOR] = late.tolist()
+        return vectors
+
+    # Query plan
+
+    def _search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization == "none":
+            return None
+        # Search the quantized vectors, then rescore an oversampled candidate set with the originals
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+        )
+
+    def build_query_request(self, dense, sparse, late, limit: int,
+                            query_filter: Optional[models.Filter] = None, shard_key: str = None) -> models.QueryRequest:
+        # The filter is set on every stage so candidates are restricted from the first prefetch
+        if self.name == "dense":
+            return models.QueryRequest(
+                query=dense.tolist(),
+                using=DENSE_VECTOR,
+                filter=query_filter,
+                params=self._search_params(),
+                shard_key=shard_key,
+                with_payload=True,
+                limit=limit,
+            )
+
+        if self.name == "dense_bm25":
+            return models.QueryRequest(
+                prefetch=[
+                    models.Prefetch(query=dense.tolist(), using=DENSE_VECTOR, filter=query_filter,
+                                    params=self._search_params(), limit=100),
+                    models.Prefetch(query=models.SparseVector(**sparse.as_object()), using=SPARSE_VECTOR,
+                                    filter=query_filter, limit=100),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                filter=query_filter,
+                shard_key=shard_key,
+                with_payload=True,
+                limit=limit,
+            )
+
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    prefetch=[
+                        models.Prefetch(
+                            query=dense.tolist(),
+                            using=DENSE_VECTOR,
+                            filter=query_filter,
+                            params=self._search_params(),
+                            limit=100,
+                        )
+                    ],
+                    query=models.SparseVector(**sparse.as_object()),
+                    using=SPARSE_VECTOR,
+                    filter=query_filter,
+                    limit=50,
+                ),
+            ],
+            query=late.tolist(),
+            using=LATE_VECTOR,
+            filter=query_filter,
+            params=self._search_params(),
+            shard_key=shard_key,
+            with_payload=True,
+            limit=limit,
+        )
+
+def all_profiles():
+    """
+    Every profile/quantization/storage combination, for benchmarking.
+    """
+    for name in PROFILE_NAMES:
+        for quantization in QUANTIZATIONS:
+            for on_disk in (False, True):
+                yield RetrievalProfile(name, quantization, on_disk)
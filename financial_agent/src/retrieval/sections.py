@@ -0,0 +1,159 @@
+import re
+from collections import namedtuple
+from typing import Dict, Iterator, Optional, Tuple
+
+# A detected filing section. `key` is a stable slug shared by 10-K and 10-Q
+# (e.g. "mda" is 10-K Item 7 and 10-Q Part I Item 2) and is what retrieval filters on.
+Section = namedtuple("Section", ["item", "part", "key", "title"])
+
+TEN_K_ITEMS: Dict[str, Tuple[str, str]] = {
+    "1": ("business", "Business"),
+    "1A": ("risk_factors", "Risk Factors"),
+    "1B": ("unresolved_staff_comments", "Unresolved Staff Comments"),
+    "1C": ("cybersecurity", "Cybersecurity"),
+    "2": ("properties", "Properties"),
+    "3": ("legal_proceedings", "Legal Proceedings"),
+    "4": ("mine_safety", "Mine Safety Disclosures"),
+    "5": ("market_for_equity", "Market for Registrant's Common Equity, Related Stockholder Matters and Issuer Purchases of Equity Securities"),
+    "6": ("reserved", "[Reserved]"),
+    "7": ("mda", "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+    "7A": ("market_risk", "Quantitative and Qualitative Disclosures About Market Risk"),
+    "8": ("financial_statements", "Financial Statements and Supplementary Data"),
+    "9": ("accountant_changes", "Changes in and Disagreements with Accountants on Accounting and Financial Disclosure"),
+    "9A": ("controls", "Controls and Procedures"),
+    "9B": ("other_information", "Other Information"),
+    "9C": ("foreign_inspections", "Disclosure Regarding Foreign Jurisdictions that Prevent Inspections"),
+    "10": ("governance", "Directors, Executive Officers and Corporate Governance"),
+    "11": ("executive_compensation", "Executive Compensation"),
+    "12": ("security_ownership", "Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters"),
+    "13": ("related_transactions", "Certain Relationships and Related Transactions, and Director Independence"),
+    "14": ("accountant_fees", "Principal Accountant Fees and Services"),
+    "15": ("exhibits", "Exhibits and Financial Statement Schedules"),
+    "16": ("form_summary", "Form 10-K Summary"),
+}
+
+TEN_Q_ITEMS: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ("I", "1"): ("financial_statements", "Financial Statements"),
+    ("I", "2"): ("mda", "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+    ("I", "3"): ("market_risk", "Quantitative and Qualitative Disclosures About Market Risk"),
+    ("I", "4"): ("controls", "Controls and Procedures"),
+    ("II", "1"): ("legal_proceedings", "Legal Proceedings"),
+    ("II", "1A"): ("risk_factors", "Risk Factors"),
+    ("II", "2"): ("unregistered_sales", "Unregistered Sales of Equity Securities and Use of Proceeds"),
+    ("II", "3"): ("senior_securities_defaults", "Defaults Upon Senior Securities"),
+    ("II", "4"): ("mine_safety", "Mine Safety Disclosures"),
+    ("II", "5"): ("other_information", "Other Information"),
+    ("II", "6"): ("exhibits", "Exhibits"),
+}
+
+SECTIONED_DOC_TYPES = {"10-K", "10-K/A", "10-Q", "10-Q/A"}
+
+ITEM_HEADING = re.compile(r"^\s*item\s+(\d{1,2}[a-c]?)\s*(?:[.:\-–—]|\s|$)", re.IGNORECASE)
+PART_HEADING = re.compile(r"^\s*part\s+(iv|iii|ii|i)\b", re.IGNORECASE)
+
+# Headings are short lines; longer lines are prose that mentions an item
+MAX_HEADING_CHARS = 200
+# A heading only opens a new section once this much text follows it. Table of
+# contents entries (and in-text cross references) are shorter, so they stay in
+# the enclosing section. Very short real sections (e.g. "Item 4. Not applicable")
+# are folded into the previous one.
+MIN_SECTION_CHARS = 1500
+
+def resolve_section(doc_type: str, part: Optional[str], item: str) -> Section:
+    item = item.upper()
+    if doc_type.upper().startswith("10-Q"):
+        key, title = TEN_Q_ITEMS.get((part or "I", item), (f"item_{item.lower()}", f"Item {item}"))
+    else:
+        key, title = TEN_K_ITEMS.get(item, (f"item_{item.lower()}", f"Item {item}"))
+    return Section(item=item, part=part, key=key, title=title)
+
+def is_sectioned(doc_type: str) -> bool:
+    return doc_type.upper() in SECTIONED_DOC_TYPES
+
+class SectionTracker:
+    """
+    Streams text and labels it with the 10-K/10-Q Item it belongs to.
+    Yields (Section or None, text) segments; consecutive text under the same
+    section is merged. Only MIN_SECTION_CHARS of look-ahead are buffered.
+    """
+
+    def __init__(self, doc_type: str):
+        self.doc_type = doc_type
+
+    def segments(self, parts: Iterator[str]) -> Iterator[Tuple[Optional[Section], str]]:
+        current = None
+        part_label = None
+        pending = None            # Section waiting to prove it is not a TOC entry
+        pending_text = []
+        pending_len = 0
+        out = []                  # Text for `current`, flushed on label changes
+        carry = ""                # Incomplete last line of the previous part
+
+        def lines_of(text):
+            nonlocal carry
+            text = carry + text
+            lines = text.split("\n")
+            carry = lines.pop()
+            for line in lines:
+                yield line + "\n"
+
+        def flush():
+            nonlocal out
+            if out:
+                segment = "".join(out)
+                out = []
+                return segment
+            return None
+
+        def process(line):
+            nonlocal current, part_label, pending, pending_text, pending_len
+            emitted = []
+            stripped = line.strip()
+            is_heading_line = 0 < len(stripped) <= MAX_HEADING_CHARS
+
+            part_match = PART_HEADING.match(line) if is_heading_line else None
+            if part_match:
+                part_label = part_match.group(1).upper()
+
+            item_match = ITEM_HEADING.match(line) if is_heading_line else None
+            if item_match:
+                # A newer heading arrived before the pending one had enough text:
+                # the pending one was a TOC entry, its text stays with `current`.
+                if pending is not None:
+                    out.extend(pending_text)
+                pending = resolve_section(self.doc_type, part_label, item_match.group(1))
+                pending_text = [line]
+                pending_len = len(line)
+                return emitted
+
+            if pending is not None:
+                pending_text.append(line)
+                pending_len += len(line)
+                if pending_len >= MIN_SECTION_CHARS:
+                    segment = flush()
+                    if segment:
+                        emitted.append((current, segment))
+                    current = pending
+                    out.extend(pending_text)
+                    pending = None
+                    pending_text = []
+                    pending_len = 0
+            else:
+                out.append(line)
+            return emitted
+
+        for text in parts:
+            for line in lines_of(text):
+                yield from process(line)
+            # Keep memory bounded: hand over what we have for the current section
+            segment = flush()
+            if segment:
+                yield (current, segment)
+
+        if carry:
+            yield from process(carry)
+        if pending is not None:
+            out.extend(pending_text)
+        segment = flush()
+        if segment:
+            yield (current, segment)
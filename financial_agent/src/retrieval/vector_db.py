@@ -1,31 +1,64 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 from qdrant_client import QdrantClient, models
 from src.retrieval.base import VectorDBBase
 from src.config import config
+import asyncio
 import uuid
+import threading
+import time
 import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from src.retrieval.embeddings import EmbeddingEngine
+from src.utils.cache import DiskCache
+from src.utils.scheduler import scheduler
+from src.retrieval.profiles import RetrievalProfile, DENSE_SIZE, LATE_SIZE, LATE_VECTOR, SPARSE_VECTOR
 
-from fastembed import TextEmbedding, SparseTextEmbedding, LateInteractionTextEmbedding
+# Payload fields used in filters. Indexed so filtered search never scans payloads.
+KEYWORD_INDEX_FIELDS = ["ticker", "year", "doc_type", "section"]
 
 class QdrantVectorDB(VectorDBBase):
-    def __init__(self, collection_name: str = "financial_docs_hybrid"):
+    def __init__(self, collection_name: str = "financial_docs_hybrid", profile: RetrievalProfile = None, prefilter=None):
         if config.QDRANT_API_KEY:
             if config.QDRANT_HOST.startswith("http"):
-                 self.client = QdrantClient(url=config.QDRANT_HOST, api_key=config.QDRANT_API_KEY, timeout=600)
+                 self._client_kwargs = dict(url=config.QDRANT_HOST, api_key=config.QDRANT_API_KEY, timeout=600)
             else:
-                 self.client = QdrantClient(host=config.QDRANT_HOST, port=config.QDRANT_PORT, api_key=config.QDRANT_API_KEY, timeout=600)
+                 self._client_kwargs = dict(host=config.QDRANT_HOST, port=config.QDRANT_PORT, api_key=config.QDRANT_API_KEY, timeout=600)
         else:
-            self.client = QdrantClient(host=config.QDRANT_HOST, port=config.QDRANT_PORT, timeout=600)
+            self._client_kwargs = dict(host=config.QDRANT_HOST, port=config.QDRANT_PORT, timeout=600)
+        self.client = QdrantClient(**self._client_kwargs)
+        # AsyncQdrantClient for the async query pipeline (created on first async search)
+        self._async_client = None
             
-        self.collection_name = collection_name
+        # Vector layout / query plan (dense, dense+BM25 or full ColBERT rerank,
+        # quantization, on-disk storage). Non-default profiles get their own collection.
+        self.profile = profile or RetrievalProfile.from_config()
+        self.collection_name = self.profile.collection_name(collection_name)
+        # Custom sharding: one shard key per ticker so a large collection can be
+        # spread across nodes and ticker-scoped queries only touch their shard.
+        self.shard_by_ticker = config.QDRANT_SHARD_BY_TICKER
+        self._known_shard_keys = set()
+        self._shard_lock = threading.Lock()
         
-        # Initialize Embedding Models
-        # Dense: sentence-transformers/all-MiniLM-L6-v2
-        self.dense_embedding_model = TextEmbedding("sentence-transformers/all-MiniLM-L6-v2")
-        # Sparse: Qdrant/bm25
-        self.bm25_embedding_model = SparseTextEmbedding("Qdrant/bm25")
-        # Late Interaction: colbert-ir/colbertv2.0
-        self.late_interaction_embedding_model = LateInteractionTextEmbedding("colbert-ir/colbertv2.0")
+        # Embedding models (loaded on first use; see EmbeddingEngine)
+        self.embedder = EmbeddingEngine()
+        
+        # Optional local BM25Index: unfiltered queries only search its top
+        # lexical candidates (see BM25_PREFILTER_CANDIDATES)
+        self.prefilter = prefilter
+        
+        # Search result cache. Keys include the collection's generation, which
+        # every local upload/prune bumps, so ingests invalidate earlier results.
+        self._cache_scope = f"{config.QDRANT_HOST}:{config.QDRANT_PORT}/{self.collection_name}"
+        self.search_cache = None
+        self._generations = None
+        if config.SEARCH_CACHE_ENABLED:
+            self.search_cache = DiskCache(
+                config.RETRIEVAL_CACHE_PATH,
+                namespace="search_results",
+                ttl=config.SEARCH_CACHE_TTL,
+                max_entries=config.SEARCH_CACHE_MAX_ENTRIES
+            )
+            self._generations = DiskCache(config.RETRIEVAL_CACHE_PATH, namespace="collection_generation")
 
         self._ensure_collection()
 
@@ -35,140 +68,464 @@ class QdrantVectorDB(VectorDBBase):
             exists = any(c.name == self.collection_name for c in collections)
             
             if not exists:
-                # We need a dummy dense embedding to get the size for config
-                # Usually 384 for all-MiniLM-L6-v2
-                dense_size = 384 
-                
-                # We need dummy late interaction embedding to get size
-                # Usually 128 for colbertv2.0
-                late_size = 128
-                
                 self.client.create_collection(
                     self.collection_name,
-                    vectors_config={
-                        "all-MiniLM-L6-v2": models.VectorParams(
-                            size=dense_size,
-                            distance=models.Distance.COSINE,
-                        ),
-                        "colbertv2.0": models.VectorParams(
-                            size=late_size,
-                            distance=models.Distance.COSINE,
-                            multivector_config=models.MultiVectorConfig(
-                                comparator=models.MultiVectorComparator.MAX_SIM,
-                            )
-                        ),
-                    },
-                    sparse_vectors_config={
-                        "bm25": models.SparseVectorParams(
-                            modifier=models.Modifier.IDF,
-                        )
-                    }
+                    sharding_method=models.ShardingMethod.CUSTOM if self.shard_by_ticker else None,
+                    vectors_config=self.profile.vectors_config(),
+                    sparse_vectors_config=self.profile.sparse_vectors_config()
                 )
-                print(f"Created collection {self.collection_name} with Hybrid Config.")
+                print(f"Created collection {self.collection_name} with {self.profile}.")
+            elif self.shard_by_ticker:
+                info = self.client.get_collection(self.collection_name)
+                if info.config.params.sharding_method != models.ShardingMethod.CUSTOM:
+                    print(f"Warning: {self.collection_name} was created without custom sharding; "
+                          f"QDRANT_SHARD_BY_TICKER is ignored for it.")
+                    self.shard_by_ticker = False
+            
+            self._ensure_payload_indexes()
         except Exception as e:
             print(f"Warning: Could not connect to Qdrant or create collection: {e}")
 
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def _ensure_payload_indexes(self) -> None:
+        schema = self.client.get_collection(self.collection_name).payload_schema or {}
+        wanted = [(f, models.PayloadSchemaType.KEYWORD) for f in KEYWORD_INDEX_FIELDS]
+        for field, schema_type in wanted:
+            if field not in schema:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=schema_type,
+                )
+                print(f"Created payload index on '{field}'.")
+
+    def _ensure_shard_key(self, ticker: str) -> None:
+        if ticker in self._known_shard_keys:
+            return
+        with self._shard_lock:
+            if ticker in self._known_shard_keys:
+                return
+            try:
+                self.client.create_shard_key(
+                    self.collection_name,
+                    shard_key=ticker,
+                    shards_number=config.QDRANT_SHARDS_PER_KEY,
+                )
+                print(f"Created shard key '{ticker}'.")
+            except Exception as e:
+                # Already exists (created earlier or by another process)
+                if "already exists" not in str(e).lower():
+                    raise
+            self._known_shard_keys.add(ticker)
+
+    def _shard_key(self, ticker: Optional[str]) -> Optional[str]:
+        return ticker.upper() if (self.shard_by_ticker and ticker) else None
+
+    def add_documents(self, documents: List[Dict[str, Any]], incremental: bool = False, prune: bool = False, batch_size: int = None) -> None:
         """
-        Embeds and indexes documents using all 3 models.
+        Embeds and indexes documents with the models of the active retrieval profile.
+        incremental: skip chunks whose deterministic ID is already in the collection.
+            Chunk IDs hash the content, so changed chunks get new IDs and are re-embedded.
+        prune: delete chunks of the same ticker/year/doc_type that are no longer in `documents`.
+        batch_size: chunks per embed/upload batch (defaults to EMBED_BATCH_SIZE).
+        Uploads run on a background thread, so batch N+1 is embedded while batch N uploads.
         """
         if not documents:
             return
-            
-        print(f"Generating embeddings and upserting {len(documents)} chunks...")
-        
-        batch_size = 16 # Reduce batch size for heavy embedding generation
         
-        # Convert documents dict list to just a list of texts for processing
-        # We process in batches inside the loop
+        if prune:
+            self.delete_stale(documents)
         
-        # We iterate manually to match the generator style of fastembed properly
-        # Or just do standard batching
+        if incremental:
+            existing_ids = self.existing_ids([d["id"] for d in documents if d.get("id")])
+            skipped = sum(1 for d in documents if d.get("id") in existing_ids)
+            documents = [d for d in documents if d.get("id") not in existing_ids]
+            print(f"Incremental ingest: {skipped} chunks already indexed, {len(documents)} new or changed.")
+            if not documents:
+                return
+            
+        print(f"Generating embeddings and upserting {len(documents)} chunks...")
         
+        batch_size = batch_size or config.EMBED_BATCH_SIZE
         total_batches = (len(documents) + batch_size - 1) // batch_size
         
-        for i in tqdm.tqdm(range(0, len(documents), batch_size), total=total_batches, desc="Ingesting"):
-            batch_docs = documents[i : i + batch_size]
-            batch_texts = [d["text"].replace("\n", " ") for d in batch_docs]
-            
+        start = time.perf_counter()
+        uploaded = 0
+        pending = None
+        
+        def finish_upload(pending) -> int:
+            i, count, future = pending
             try:
-                # Generate Embeddings
-                # Note: fastembed generators yield batches, but here we are passing a small batch explicitly.
-                # safely wrap in list() to consume the generator for this small batch.
+                future.result()
+                return count
+            except Exception as e:
+                print(f"Error uploading batch {i}: {e}")
+                return 0
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload") as uploader:
+            for i in tqdm.tqdm(range(0, len(documents), batch_size), total=total_batches, desc="Ingesting"):
+                batch_docs = documents[i : i + batch_size]
                 
-                dense_embeddings = list(self.dense_embedding_model.passage_embed(batch_texts))
-                bm25_embeddings = list(self.bm25_embedding_model.passage_embed(batch_texts))
-                late_interaction_embeddings = list(self.late_interaction_embedding_model.passage_embed(batch_texts))
+                try:
+                    points = self.embed_points(batch_docs)
+                except Exception as e:
+                    print(f"Error acting on batch {i}: {e}")
+                    continue
                 
-                points = []
-                for j, doc in enumerate(batch_docs):
-                    point_id = doc.get("id", str(uuid.uuid4()))
-                    
-                    # Construct Point
-                    points.append(models.PointStruct(
-                        id=point_id,
-                        vector={
-                            "all-MiniLM-L6-v2": dense_embeddings[j].tolist(),
-                            "bm25": bm25_embeddings[j].as_object(),
-                            "colbertv2.0": late_interaction_embeddings[j].tolist(),
-                        },
-                        payload=doc
-                    ))
-                    
+                # At most one upload in flight: wait for batch N before queueing N+1
+                if pending is not None:
+                    uploaded += finish_upload(pending)
+                pending = (i, len(points), uploader.submit(self.upload_points, points))
+            
+            if pending is not None:
+                uploaded += finish_upload(pending)
+        
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {uploaded} chunks in {elapsed:.1f}s ({uploaded / elapsed if elapsed else 0:.1f} chunks/s).")
+
+    def embed_points(self, batch_docs: List[Dict[str, Any]]) -> List[models.PointStruct]:
+        """
+        Embeds a batch of chunks with all 3 models and builds Qdrant points.
+        """
+        batch_texts = [d["text"].replace("\n", " ") for d in batch_docs]
+        
+        # Generate Embeddings
+        # Only the models the profile stores are run
+        dense_embeddings, bm25_embeddings, late_interaction_embeddings = self.embedder.embed_passages(
+            batch_texts, use=self.profile.embedding_models
+        )
+        
+        points = []
+        for j, doc in enumerate(batch_docs):
+            point_id = doc.get("id", str(uuid.uuid4()))
+            
+            # Construct Point
+            points.append(models.PointStruct(
+                id=point_id,
+                vector=self.profile.point_vectors(
+                    dense_embeddings[j],
+                    bm25_embeddings[j] if bm25_embeddings else None,
+                    late_interaction_embeddings[j] if late_interaction_embeddings else None,
+                ),
+                payload=doc
+            ))
+        return points
+
+    def upload_points(self, points: List[models.PointStruct]) -> None:
+        try:
+            if not self.shard_by_ticker:
                 self.client.upload_points(
                     collection_name=self.collection_name,
                     points=points
                 )
-                
+                return
+            
+            # Every point must go to its ticker's shard
+            by_ticker = {}
+            for point in points:
+                by_ticker.setdefault(point.payload.get("ticker"), []).append(point)
+            for ticker, ticker_points in by_ticker.items():
+                self._ensure_shard_key(ticker)
+                self.client.upload_points(
+                    collection_name=self.collection_name,
+                    points=ticker_points,
+                    shard_key_selector=ticker
+                )
+        finally:
+            # Even a partly failed upload may have changed the collection
+            self.bump_generation()
+
+    def existing_ids(self, ids: List[str], batch_size: int = 256, ticker: str = None) -> set:
+        """
+        Returns the subset of `ids` already stored in the collection.
+        Only IDs are fetched (no payloads or vectors). Passing the ticker
+        limits the lookup to its shard when sharding by ticker.
+        """
+        found = set()
+        for i in range(0, len(ids), batch_size):
+            try:
+                points = self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=ids[i : i + batch_size],
+                    with_payload=False,
+                    with_vectors=False,
+                    shard_key_selector=self._shard_key(ticker)
+                )
+                found.update(str(p.id) for p in points)
             except Exception as e:
-                print(f"Error acting on batch {i}: {e}")
+                print(f"Warning: could not check existing ids ({e}); treating batch as new.")
+        return found
 
-    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def delete_stale(self, documents: List[Dict[str, Any]]) -> None:
         """
-        Performs hybrid search: Dense + Sparse + Late Interaction
+        For every ticker/year/doc_type in `documents`, deletes indexed chunks
+        whose IDs are not part of the new document set.
         """
-        try:
-            # 1. Embed Query
-            # query_embed returns a generator, consume it
-            dense_query_vector = list(self.dense_embedding_model.query_embed(query))[0]
-            sparse_query_vector = list(self.bm25_embedding_model.query_embed(query))[0]
-            late_query_vector = list(self.late_interaction_embedding_model.query_embed(query))[0]
-
-            # 2. Qdrant Search
-            results = self.client.query_points(
-                self.collection_name,
-                prefetch=[
-                    models.Prefetch(
-                        prefetch=[
-                            models.Prefetch(
-                                query=dense_query_vector.tolist(),
-                                using="all-MiniLM-L6-v2",
-                                limit=100,
-                            )
-                        ],
-                        query=models.SparseVector(**sparse_query_vector.as_object()),
-                        using="bm25",
-                        limit=50,
-                    ),
-                ],
-                query=late_query_vector.tolist(),
-                using="colbertv2.0",
-                with_payload=True,
-                limit=limit,
-            )
+        groups = {}
+        for d in documents:
+            key = (d.get("ticker"), d.get("year"), d.get("doc_type"))
+            groups.setdefault(key, []).append(d["id"])
             
-            return [
-                {
-                    "id": hit.id,
-                    "score": hit.score,
-                    "text": hit.payload.get("text", ""),
-                    "metadata": hit.payload
-                }
-                for hit in results.points
-            ]
+        for (ticker, year, doc_type), ids in groups.items():
+            try:
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    shard_key_selector=self._shard_key(ticker),
+                    points_selector=models.FilterSelector(
+                        filter=models.Filter(
+                            must=[
+                                models.FieldCondition(key="ticker", match=models.MatchValue(value=ticker)),
+                                models.FieldCondition(key="year", match=models.MatchValue(value=year)),
+                                models.FieldCondition(key="doc_type", match=models.MatchValue(value=doc_type)),
+                            ],
+                            must_not=[models.HasIdCondition(has_id=ids)]
+                        )
+                    )
+                )
+                print(f"Pruned stale chunks for {ticker} {year} {doc_type}.")
+            except Exception as e:
+                print(f"Error pruning stale chunks for {ticker} {year} {doc_type}: {e}")
+        self.bump_generation()
+
+    # Search result cache
+
+    def generation(self) -> int:
+        """
+        Ingest generation of the collection, as seen by this machine's cache.
+        """
+        if self._generations is None:
+            return 0
+        return self._generations.get(self._cache_scope) or 0
+
+    def bump_generation(self) -> None:
+        """
+        Invalidates every cached search result for this collection.
+        """
+        if self._generations is None:
+            return
+        try:
+            self._generations.incr(self._cache_scope)
+        except Exception as e:
+            print(f"Warning: could not bump search cache generation: {e}")
+
+    def _search_key(self, generation: int, *parts: Any) -> str:
+        return DiskCache.make_key(self._cache_scope, repr(self.profile), generation, *parts)
+
+    def search(self, query: str, limit: int = 10, ticker: str = None, year: str = None, doc_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Performs hybrid search: Dense + Sparse + Late Interaction
+        Optionally restricted to a ticker, filing year and/or document type.
+        """
+        return self.search_batch([query], [limit], ticker=ticker, year=year, doc_type=doc_type)[0]
+
+    def search_batch(self, queries: List[str], limits: Union[int, List[int]] = 10,
+                     filters: List[Optional[models.Filter]] = None,
+                     ticker: str = None, year: str = None, doc_type: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Runs several hybrid searches at once.
+        Every model embeds all queries in a single batched pass and all
+        prefetch/rerank requests go to Qdrant in one query_batch_points call.
+        filters: optional payload filter per query (see build_filter).
+        ticker/year/doc_type: applied to every query; with ticker sharding the
+            search is also routed to that ticker's shard only.
+        Returns one result list per query, in the same order. Results are
+        cached until the next ingest into this collection (see generation()).
+        """
+        if not queries:
+            return []
+        batch = self._prepare_batch(queries, limits, filters, ticker, year, doc_type)
+        if not batch["missing"]:
+            return batch["results"]
             
+        try:
+            requests = self._build_requests(batch)
+            responses = self.client.query_batch_points(self.collection_name, requests=requests)
+            return self._finish_batch(batch, responses)
         except Exception as e:
             print(f"Search failed: {e}")
             import traceback
             traceback.print_exc()
+            return [r if r is not None else [] for r in batch["results"]]
+
+    async def asearch_batch(self, queries: List[str], limits: Union[int, List[int]] = 10,
+                            filters: List[Optional[models.Filter]] = None,
+                            ticker: str = None, year: str = None, doc_type: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Async variant of search_batch: query embedding runs on a worker thread
+        and the search goes through AsyncQdrantClient. Same cache and results.
+        """
+        if not queries:
             return []
+        batch = self._prepare_batch(queries, limits, filters, ticker, year, doc_type)
+        if not batch["missing"]:
+            return batch["results"]
+        
+        try:
+            requests = await asyncio.to_thread(self._build_requests, batch)
+            if self._async_client is None:
+                from qdrant_client import AsyncQdrantClient
+                self._async_client = AsyncQdrantClient(**self._client_kwargs)
+            async with scheduler.slot("qdrant"):
+                responses = await self._async_client.query_batch_points(self.collection_name, requests=requests)
+            return self._finish_batch(batch, responses)
+        except Exception as e:
+            print(f"Search failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return [r if r is not None else [] for r in batch["results"]]
+
+    async def aclose(self) -> None:
+        # The async client is bound to the event loop that created it
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def _prepare_batch(self, queries, limits, filters, ticker, year, doc_type) -> Dict[str, Any]:
+        """
+        Validates arguments, applies the common filter and serves what it can from the cache.
+        """
+        if isinstance(limits, int):
+            limits = [limits] * len(queries)
+        if len(limits) != len(queries):
+            raise ValueError("search_batch needs exactly one limit per query.")
+        filters = filters or [None] * len(queries)
+        if len(filters) != len(queries):
+            raise ValueError("search_batch needs exactly one filter (or None) per query.")
+        if self.prefilter is not None and config.BM25_PREFILTER_CANDIDATES > 0:
+            # Queries with their own (section) filter are already narrow
+            filters = [f if f is not None else self._lexical_filter(q, ticker, year, doc_type) for q, f in zip(queries, filters)]
+        
+        base_filter = self.build_filter(ticker=ticker, year=year, doc_type=doc_type)
+        if base_filter is not None:
+            filters = [base_filter if f is None else models.Filter(must=[base_filter, f]) for f in filters]
+        shard_key = self._shard_key(ticker)
+        
+        # Serve repeated searches from the cache; only misses are embedded and sent to Qdrant
+        results = [None] * len(queries)
+        keys = [None] * len(queries)
+        if self.search_cache is not None:
+            generation = self.generation()
+            for i, (query, limit, query_filter) in enumerate(zip(queries, limits, filters)):
+                keys[i] = self._search_key(generation, "search", query, limit, str(query_filter), shard_key)
+                results[i] = self.search_cache.get(keys[i])
+        
+        return {
+            "queries": queries, "limits": limits, "filters": filters, "shard_key": shard_key,
+            "results": results, "keys": keys,
+            "missing": [i for i, r in enumerate(results) if r is None],
+        }
+
+    def _lexical_filter(self, query: str, ticker: str, year: str, doc_type: str) -> Optional[models.Filter]:
+        ids = self.prefilter.candidates(query, config.BM25_PREFILTER_CANDIDATES, ticker=ticker, year=year, doc_type=doc_type)
+        # No lexical match (or the ticker is not in the local corpus): search everything
+        if not ids:
+            return None
+        return models.Filter(must=[models.HasIdCondition(has_id=ids)])
+
+    def _build_requests(self, batch: Dict[str, Any]) -> List[models.QueryRequest]:
+        missing = batch["missing"]
+        # 1. Embed Queries (one pass per model)
+        dense_query_vectors, sparse_query_vectors, late_query_vectors = self.embedder.embed_queries(
+            [batch["queries"][i] for i in missing], use=self.profile.embedding_models
+        )
+        n = len(missing)
+        sparse_query_vectors = sparse_query_vectors or [None] * n
+        late_query_vectors = late_query_vectors or [None] * n
+
+        # 2. Qdrant Search requests (sent in a single round trip)
+        return [
+            self.profile.build_query_request(dense, sparse, late, batch["limits"][i], batch["filters"][i], batch["shard_key"])
+            for i, dense, sparse, late in zip(missing, dense_query_vectors, sparse_query_vectors, late_query_vectors)
+        ]
+
+    def _finish_batch(self, batch: Dict[str, Any], responses) -> List[List[Dict[str, Any]]]:
+        results, keys = batch["results"], batch["keys"]
+        for i, response in zip(batch["missing"], responses):
+            results[i] = self._format_hits(response.points)
+            if keys[i] is not None:
+                self.search_cache.set(keys[i], results[i])
+        return results
+
+    @staticmethod
+    def build_filter(ticker: str = None, sections: List[str] = None, year: str = None, doc_type: str = None) -> Optional[models.Filter]:
+        """
+        Payload filter on ticker, filing year, document type and/or filing
+        section keys (see retrieval.sections). All of these fields are indexed.
+        """
+        must = []
+        if ticker:
+            must.append(models.FieldCondition(key="ticker", match=models.MatchValue(value=ticker.upper())))
+        if year:
+            must.append(models.FieldCondition(key="year", match=models.MatchValue(value=str(year))))
+        if doc_type:
+            must.append(models.FieldCondition(key="doc_type", match=models.MatchValue(value=doc_type)))
+        if sections:
+            must.append(models.FieldCondition(key="section", match=models.MatchAny(any=list(sections))))
+        return models.Filter(must=must) if must else None
+
+    def footprint(self, sample_size: int = 64) -> Dict[str, Any]:
+        """
+        Estimates the collection's vector memory footprint from the point count,
+        the profile layout and a sample of stored vectors (ColBERT stores one
+        128-d vector per token, so its size depends on chunk length).
+        Returns MB split into RAM and disk.
+        """
+        info = self.client.get_collection(self.collection_name)
+        points = info.points_count or 0
+        sample, _ = self.client.scroll(
+            collection_name=self.collection_name, limit=sample_size, with_payload=False, with_vectors=True
+        )
+        
+        avg_tokens = 0.0
+        avg_nnz = 0.0
+        if sample:
+            if self.profile.uses_colbert:
+                avg_tokens = sum(len(p.vector.get(LATE_VECTOR, [])) for p in sample) / len(sample)
+            if self.profile.uses_bm25:
+                avg_nnz = sum(len(p.vector[SPARSE_VECTOR].indices) for p in sample if SPARSE_VECTOR in p.vector) / len(sample)
+        
+        # Bytes per stored dimension for the quantized copy
+        quantized = {"none": 0.0, "scalar": 1.0, "binary": 1 / 8}[self.profile.quantization]
+        ram = disk = 0.0
+        
+        def place(original_bytes: float, dims: float) -> None:
+            nonlocal ram, disk
+            if self.profile.on_disk:
+                disk += original_bytes
+            else:
+                ram += original_bytes
+            ram += dims * quantized
+        
+        place(points * DENSE_SIZE * 4, points * DENSE_SIZE)
+        ram += points * 16 * 2 * 4  # HNSW links (m=16) for the dense vectors
+        if self.profile.uses_colbert:
+            dims = points * avg_tokens * LATE_SIZE
+            place(dims * 4, dims)
+        if self.profile.uses_bm25:
+            sparse_bytes = points * avg_nnz * 8  # index + value
+            if self.profile.on_disk:
+                disk += sparse_bytes
+            else:
+                ram += sparse_bytes
+        
+        mb = 1024 * 1024
+        return {
+            "collection": self.collection_name,
+            "profile": self.profile.name,
+            "quantization": self.profile.quantization,
+            "on_disk": self.profile.on_disk,
+            "points": points,
+            "avg_colbert_tokens": round(avg_tokens, 1),
+            "ram_mb": round(ram / mb, 2),
+            "disk_mb": round(disk / mb, 2),
+        }
+
+    def _format_hits(self, points) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": hit.id,
+                "score": hit.score,
+                "text": hit.payload.get("text", ""),
+                "metadata": hit.payload
+            }
+            for hit in points
+        ]
@@ -0,0 +1,152 @@
+import re
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from typing import List, Optional
+
+# Role flags (bitmask): one filer can be e.g. CEO + Director + 10% owner
+ROLE_CEO = 1
+ROLE_CFO = 2
+ROLE_DIRECTOR = 4
+ROLE_OFFICER = 8
+ROLE_TEN_PERCENT = 16
+ROLE_OTHER = 32
+
+ROLE_NAMES = {
+    ROLE_CEO: "CEO",
+    ROLE_CFO: "CFO",
+    ROLE_DIRECTOR: "Director",
+    ROLE_OFFICER: "Officer",
+    ROLE_TEN_PERCENT: "10% Owner",
+    ROLE_OTHER: "Other",
+}
+
+# Transaction codes (SEC Form 4 General Instructions, Section 8)
+TRANSACTION_CODES = {
+    "P": "Open market purchase",
+    "S": "Open market sale",
+    "A": "Grant or award",
+    "M": "Option exercise or conversion",
+    "F": "Tax withholding",
+    "G": "Gift",
+    "C": "Conversion of derivative",
+    "X": "Exercise of in-the-money derivative",
+    "D": "Disposition to the issuer",
+    "J": "Other acquisition or disposition",
+}
+
+CEO_TITLE = re.compile(r"\bceo\b|chief\s+executive", re.IGNORECASE)
+CFO_TITLE = re.compile(r"\bcfo\b|chief\s+financial", re.IGNORECASE)
+
+# One row per Form 4 transaction (non-derivative and derivative tables)
+InsiderTransaction = namedtuple("InsiderTransaction", [
+    "ticker",          # issuerTradingSymbol
+    "accession",       # EDGAR accession number (dedup key), if known
+    "filer_cik",
+    "filer_name",
+    "roles",           # ROLE_* bitmask
+    "officer_title",
+    "security",
+    "date",            # YYYY-MM-DD
+    "code",            # Transaction code (P, S, A, M, F, ...)
+    "acquired",        # True = acquired (A), False = disposed (D)
+    "shares",
+    "price",           # Per share; 0.0 when not reported (grants, gifts)
+    "shares_after",    # Shares owned following the transaction
+    "direct",          # True = direct ownership, False = indirect
+    "derivative",
+    "plan_10b5_1",     # Filed under a Rule 10b5-1 trading plan
+])
+
+def role_names(roles: int) -> List[str]:
+    return [name for flag, name in ROLE_NAMES.items() if roles & flag]
+
+def _text(node: Optional[ET.Element], path: str, default: str = "") -> str:
+    # Most Form 4 fields are wrapped as <field><value>...</value></field>
+    if node is None:
+        return default
+    found = node.find(f"{path}/value")
+    if found is None:
+        found = node.find(path)
+    if found is None or found.text is None:
+        return default
+    return found.text.strip()
+
+def _flag(node: Optional[ET.Element], path: str) -> bool:
+    return _text(node, path).lower() in ("1", "true")
+
+def _number(node: Optional[ET.Element], path: str) -> float:
+    try:
+        return float(_text(node, path, "0").replace(",", ""))
+    except ValueError:
+        return 0.0
+
+def _owner_roles(owner: ET.Element) -> int:
+    relationship = owner.find("reportingOwnerRelationship")
+    title = _text(relationship, "officerTitle")
+    roles = 0
+    if _flag(relationship, "isDirector"):
+        roles |= ROLE_DIRECTOR
+    if _flag(relationship, "isOfficer"):
+        roles |= ROLE_OFFICER
+    if _flag(relationship, "isTenPercentOwner"):
+        roles |= ROLE_TEN_PERCENT
+    if _flag(relationship, "isOther"):
+        roles |= ROLE_OTHER
+    if CEO_TITLE.search(title):
+        roles |= ROLE_CEO
+    if CFO_TITLE.search(title):
+        roles |= ROLE_CFO
+    return roles
+
+def parse_form4(xml_text: str, accession: str = "") -> List[InsiderTransaction]:
+    """
+    Parses an EDGAR Form 4 ownershipDocument into one record per reported
+    transaction. Joint filings are attributed to the first reporting owner,
+    with the roles of all owners combined. Holdings-only rows (no
+    transaction) are skipped.
+    """
+    # Some filings carry a stray BOM or leading whitespace before the XML declaration
+    root = ET.fromstring(xml_text.lstrip("\ufeff").strip().encode("utf-8"))
+    if root.tag != "ownershipDocument":
+        found = root.find(".//ownershipDocument")
+        if found is None:
+            raise ValueError("Not a Form 4 ownershipDocument.")
+        root = found
+
+    ticker = _text(root, "issuer/issuerTradingSymbol").upper()
+    owners = root.findall("reportingOwner")
+    first = owners[0] if owners else None
+    filer_cik = _text(first, "reportingOwnerId/rptOwnerCik")
+    filer_name = _text(first, "reportingOwnerId/rptOwnerName")
+    officer_title = _text(first, "reportingOwnerRelationship/officerTitle")
+    roles = 0
+    for owner in owners:
+        roles |= _owner_roles(owner)
+    plan_10b5_1 = _flag(root, "aff10b5One")
+
+    records = []
+    tables = [("nonDerivativeTable/nonDerivativeTransaction", False), ("derivativeTable/derivativeTransaction", True)]
+    for path, derivative in tables:
+        for row in root.findall(path):
+            code = _text(row, "transactionCoding/transactionCode")
+            if not code:
+                continue
+            records.append(InsiderTransaction(
+                ticker=ticker,
+                accession=accession,
+                filer_cik=filer_cik,
+                filer_name=filer_name,
+                roles=roles,
+                officer_title=officer_title,
+                security=_text(row, "securityTitle"),
+                date=_text(row, "transactionDate")[:10],
+                code=code.upper(),
+                acquired=_text(row, "transactionAmounts/transactionAcquiredDisposedCode").upper() == "A",
+                shares=_number(row, "transactionAmounts/transactionShares"),
+                price=_number(row, "transactionAmounts/transactionPricePerShare"),
+                shares_after=_number(row, "postTransactionAmounts/sharesOwnedFollowingTransaction"),
+                direct=_text(row, "ownershipNature/directOrIndirectOwnership", "D").upper() != "I",
+                derivative=derivative,
+                plan_10b5_1=plan_10b5_1,
+            ))
+    return records
@@ -1,39 +1,148 @@
 import requests
-from sec_edgar_api import EdgarClient
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
 from src.config import config
+from src.utils.lazy import LazyObject
+from src.utils.rate_limit import TokenBucket
+import random
+import threading
+import json
+import os
 import re
-from bs4 import BeautifulSoup
 import time
 
+TICKER_MAP_URL = "https://www.sec.gov/files/company_tickers.json"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class SECHandler:
+    # Ticker -> zero-padded CIK, built once per process and shared by all handlers
+    _ticker_index: Dict[str, str] = None
+    _index_lock = threading.Lock()
+    # SEC fair-access policy is 10 requests/second per client; every handler
+    # and thread in the process draws from this one bucket. A one-token
+    # burst keeps any 1-second window at SEC_MAX_RPS + 1 requests.
+    _limiter = TokenBucket(config.SEC_MAX_RPS, capacity=1)
+
     def __init__(self):
         self.user_agent = config.SEC_USER_AGENT
-        # EdgarClient for metadata queries
-        self.client = EdgarClient(user_agent=self.user_agent)
         self.headers = {
             "User-Agent": self.user_agent
         }
+        # Pooled keep-alive connections shared by all worker threads
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, config.SEC_MAX_WORKERS))
+        self.session.mount("https://", adapter)
 
-    def get_cik(self, ticker: str) -> str:
+    def _get(self, url: str) -> requests.Response:
         """
-        Maps ticker to CIK. 
-        In production, cache this mapping.
-        For now, query SEC's company tickers JSON.
+        Rate-limited GET with retry and exponential backoff (plus jitter) on
+        connection errors and 429/5xx responses. Honors Retry-After.
         """
-        try:
-            url = "https://www.sec.gov/files/company_tickers.json"
-            resp = requests.get(url, headers=self.headers)
-            data = resp.json()
+        last_error = None
+        for attempt in range(config.SEC_MAX_RETRIES + 1):
+            SECHandler._limiter.acquire()
+            try:
+                resp = self.session.get(url, timeout=config.SEC_TIMEOUT)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp
+                last_error = requests.HTTPError(f"{resp.status_code} for {url}", response=resp)
+                retry_after = resp.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                retry_after = None
             
-            for entry in data.values():
-                if entry["ticker"] == ticker.upper():
+            if attempt == config.SEC_MAX_RETRIES:
+                break
+            delay = config.SEC_BACKOFF * (2 ** attempt) + random.uniform(0, config.SEC_BACKOFF)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+        raise last_error
+
+    @staticmethod
+    def _normalize_ticker(ticker: str) -> str:
+        # SEC lists share classes with a dash (BRK-B); accept BRK.B too
+        return ticker.strip().upper().replace(".", "-")
+
+    def _download_ticker_map(self) -> dict:
+        data = self._get(TICKER_MAP_URL).json()
+        
+        # Write atomically so concurrent processes never read a partial file
+        path = config.SEC_TICKER_MAP_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return data
+
+    def _read_ticker_map(self, force_refresh: bool = False) -> dict:
+        """
+        Returns SEC's company_tickers.json, from the local copy when it is
+        younger than SEC_TICKER_MAP_REFRESH. A stale copy is still used if
+        the download fails.
+        """
+        path = config.SEC_TICKER_MAP_PATH
+        has_local = os.path.exists(path)
+        is_fresh = has_local and (time.time() - os.path.getmtime(path)) < config.SEC_TICKER_MAP_REFRESH
+        
+        if is_fresh and not force_refresh:
+            with open(path) as f:
+                return json.load(f)
+        try:
+            return self._download_ticker_map()
+        except Exception as e:
+            if not has_local:
+                raise
+            print(f"Warning: could not refresh ticker map ({e}); using cached copy.")
+            with open(path) as f:
+                return json.load(f)
+
+    def _get_ticker_index(self, force_refresh: bool = False) -> Dict[str, str]:
+        if SECHandler._ticker_index is None or force_refresh:
+            with SECHandler._index_lock:
+                if SECHandler._ticker_index is None or force_refresh:
+                    data = self._read_ticker_map(force_refresh=force_refresh)
                     # CIK must be 10 digits zero-padded
-                    return str(entry["cik_str"]).zfill(10)
-            raise ValueError(f"Ticker {ticker} not found.")
+                    SECHandler._ticker_index = {
+                        self._normalize_ticker(entry["ticker"]): str(entry["cik_str"]).zfill(10)
+                        for entry in data.values()
+                    }
+        return SECHandler._ticker_index
+
+    def get_cik(self, ticker: str) -> str:
+        """
+        Maps ticker to CIK using the cached SEC company tickers index.
+        """
+        try:
+            cik = self._get_ticker_index().get(self._normalize_ticker(ticker))
+            if not cik:
+                raise ValueError(f"Ticker {ticker} not found.")
+            return cik
         except Exception as e:
             print(f"Error fetching CIK: {e}")
             return ""
 
+    def get_ciks(self, tickers: List[str]) -> Dict[str, str]:
+        """
+        Resolves many tickers at once. Unknown tickers map to "".
+        """
+        try:
+            index = self._get_ticker_index()
+        except Exception as e:
+            print(f"Error fetching CIK: {e}")
+            return {ticker: "" for ticker in tickers}
+        
+        ciks = {ticker: index.get(self._normalize_ticker(ticker), "") for ticker in tickers}
+        missing = [t for t, cik in ciks.items() if not cik]
+        if missing:
+            print(f"Tickers not found: {', '.join(missing)}")
+        return ciks
+
     def fetch_latest_filing(self, ticker: str, form_type: str = "10-K") -> str:
         """
         Fetches the text content of the latest filing of a specific type.
@@ -44,46 +153,161 @@ class SECHandler:
             
         # Get submissions
         try:
-            # We enforce a small rate limit here
-            time.sleep(0.2)
-            submissions = self.client.get_submissions(cik=param_cik)
-            
-            # Filter for Form
-            # Recent filings are in 'filings' -> 'recent'
-            recent = submissions["filings"]["recent"]
-            
-            accession_number = None
-            primary_document = None
-            
-            print(f"Searching for latest {form_type}...")
-            
-            for i, form in enumerate(recent["form"]):
-                # Simple exact match for form type (e.g. '10-K', '8-K', '4')
-                if form == form_type:
-                    accession_number = recent["accessionNumber"][i]
-                    primary_document = recent["primaryDocument"][i]
-                    break
-            
-            if not accession_number:
-                return f"Error: No {form_type} found in recent submissions for {ticker}."
-                
-            # Construct URL
-            # https://www.sec.gov/Archives/edgar/data/{cik}/{accession_nodash}/{primary_doc}
-            accession_nodash = accession_number.replace("-", "")
-            url = f"https://www.sec.gov/Archives/edgar/data/{param_cik}/{accession_nodash}/{primary_document}"
-            
-            print(f"Fetching {form_type} from: {url}")
-            resp = requests.get(url, headers=self.headers)
-            
-            # Simple text extraction
-            # In production, use a robust parser like 'edgar-tools' or custom XBRL/HTML parser
-            text = self.clean_html(resp.text)
-            return text
-            
+            submissions = self.get_submissions(param_cik)
+            return self._fetch_from_submissions(ticker, param_cik, submissions, form_type)
         except Exception as e:
             return f"Error fetching filing: {e}"
 
+    def fetch_filings(self, tickers: List[str], form_types: List[str] = None, max_workers: int = None) -> Dict[Tuple[str, str], str]:
+        """
+        Bulk version of fetch_latest_filing.
+        Downloads the latest filing of every form type for every ticker on a
+        thread pool. All requests share the pooled session and the global
+        EDGAR rate limiter, and submissions are fetched once per ticker.
+        Returns {(ticker, form_type): text or "Error: ..."}.
+        """
+        form_types = form_types or ["10-K"]
+        max_workers = max_workers or config.SEC_MAX_WORKERS
+        ciks = self.get_ciks(tickers)
+        
+        def fetch_ticker(ticker: str) -> Dict[Tuple[str, str], str]:
+            cik = ciks.get(ticker)
+            if not cik:
+                return {(ticker, form): "Error: CIK not found." for form in form_types}
+            try:
+                submissions = self.get_submissions(cik)
+            except Exception as e:
+                return {(ticker, form): f"Error fetching filing: {e}" for form in form_types}
+            
+            results = {}
+            for form in form_types:
+                try:
+                    results[(ticker, form)] = self._fetch_from_submissions(ticker, cik, submissions, form)
+                except Exception as e:
+                    results[(ticker, form)] = f"Error fetching filing: {e}"
+            return results
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_ticker, ticker): ticker for ticker in tickers}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching filings"):
+                results.update(future.result())
+        return results
+
+    def get_submissions(self, cik: str) -> dict:
+        return self._get(f"https://data.sec.gov/submissions/CIK{cik}.json").json()
+
+    def get_company_facts(self, cik: str) -> dict:
+        # Every XBRL fact the company has filed, across all filings
+        return self._get(f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json").json()
+
+    def get_ticker(self, cik: str) -> str:
+        """
+        Reverse lookup (CIK -> ticker) for bulk companyfacts files named CIK##########.json.
+        """
+        cik = str(cik).zfill(10)
+        for ticker, ticker_cik in self._get_ticker_index().items():
+            if ticker_cik == cik:
+                return ticker
+        return ""
+
+    def fetch_company_facts(self, tickers: List[str], max_workers: int = None) -> Dict[str, dict]:
+        """
+        Downloads companyfacts JSON for many tickers concurrently (shared
+        session and rate limiter). Tickers that fail are left out.
+        """
+        max_workers = max_workers or config.SEC_MAX_WORKERS
+        ciks = {ticker: cik for ticker, cik in self.get_ciks(tickers).items() if cik}
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_company_facts, cik): ticker for ticker, cik in ciks.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching company facts"):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error fetching company facts for {futures[future]}: {e}")
+        return results
+
+    def _fetch_from_submissions(self, ticker: str, cik: str, submissions: dict, form_type: str) -> str:
+        # Filter for Form
+        # Recent filings are in 'filings' -> 'recent'
+        recent = submissions["filings"]["recent"]
+        
+        accession_number = None
+        primary_document = None
+        
+        print(f"Searching for latest {form_type} ({ticker})...")
+        
+        for i, form in enumerate(recent["form"]):
+            # Simple exact match for form type (e.g. '10-K', '8-K', '4')
+            if form == form_type:
+                accession_number = recent["accessionNumber"][i]
+                primary_document = recent["primaryDocument"][i]
+                break
+        
+        if not accession_number:
+            return f"Error: No {form_type} found in recent submissions for {ticker}."
+            
+        # Construct URL
+        # https://www.sec.gov/Archives/edgar/data/{cik}/{accession_nodash}/{primary_doc}
+        accession_nodash = accession_number.replace("-", "")
+        url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_nodash}/{primary_document}"
+        
+        print(f"Fetching {form_type} from: {url}")
+        resp = self._get(url)
+        
+        # Simple text extraction
+        # In production, use a robust parser like 'edgar-tools' or custom XBRL/HTML parser
+        text = self.clean_html(resp.text)
+        return text
+
+    def fetch_form4_xml(self, ticker: str, limit: int = None, skip: Set[str] = None, max_workers: int = None) -> List[Tuple[str, str]]:
+        """
+        Downloads the raw ownershipDocument XML of the ticker's most recent
+        Form 4 / 4/A filings. Accessions in `skip` (already stored) are not
+        downloaded. Returns [(accession, xml)].
+        """
+        limit = limit or config.FORM4_MAX_FILINGS
+        skip = skip or set()
+        max_workers = max_workers or config.SEC_MAX_WORKERS
+        cik = self.get_cik(ticker)
+        if not cik:
+            print(f"CIK not found for {ticker}.")
+            return []
+
+        recent = self.get_submissions(cik)["filings"]["recent"]
+        filings = []
+        for i, form in enumerate(recent["form"]):
+            if form not in ("4", "4/A"):
+                continue
+            accession = recent["accessionNumber"][i]
+            if accession not in skip:
+                # primaryDocument points at the XSL-rendered HTML
+                # (xslF345X05/doc.xml); the raw XML sits at the filing root
+                filings.append((accession, recent["primaryDocument"][i].split("/")[-1]))
+            if len(filings) >= limit:
+                break
+
+        print(f"Fetching {len(filings)} Form 4 filings for {ticker}...")
+
+        def fetch(filing: Tuple[str, str]) -> Tuple[str, str]:
+            accession, document = filing
+            url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}/{document}"
+            return accession, self._get(url).text
+
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch, filing): filing[0] for filing in filings}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching Form 4"):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error fetching Form 4 {futures[future]}: {e}")
+        return results
+
     def clean_html(self, html_content: str) -> str:
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'html.parser')
         # Remove script and style elements
         for script in soup(["script", "style"]):
@@ -100,4 +324,4 @@ class SECHandler:
         
         return text
 
-sec_handler = SECHandler()
+sec_handler = LazyObject(SECHandler)
@@ -1,43 +1,197 @@
-from typing import List, Dict
+from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from src.config import config
+from src.utils.cache import DiskCache
+from src.utils.lazy import LazyObject
+from src.utils.scheduler import scheduler
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import random
+import time
+
+TAVILY_URL = "https://api.tavily.com/search"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MISSING_KEY_RESULTS = [
+    {"title": "Missing Config", "snippet": "Tavily API key is missing in .env."}
+]
 
 class WebSearch:
+    """
+    Tavily client with pooled keep-alive connections, request timeouts,
+    retry with jittered exponential backoff on 429/5xx and connection
+    errors, and a TTL result cache keyed by normalized query, search depth
+    and result count (repeat queries within WEB_SEARCH_CACHE_TTL cost no quota).
+    """
+
     def __init__(self):
         self.api_key = config.TAVILY_API_KEY
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(10, config.TAVILY_MAX_WORKERS))
+        self.session.mount("https://", adapter)
+        self._async_client = None
+
+        self.cache = None
+        if config.WEB_SEARCH_CACHE_ENABLED:
+            self.cache = DiskCache(
+                config.WEB_SEARCH_CACHE_PATH,
+                namespace="tavily",
+                ttl=config.WEB_SEARCH_CACHE_TTL,
+                max_entries=config.WEB_SEARCH_CACHE_MAX_ENTRIES
+            )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        # "NVDA  Analyst ratings" and "nvda analyst ratings" are the same search
+        return " ".join(query.lower().split())
+
+    def _cache_key(self, query: str, search_depth: str, max_results: int) -> str:
+        return DiskCache.make_key(self.normalize_query(query), search_depth, max_results)
+
+    def _payload(self, query: str, search_depth: str, max_results: int) -> Dict[str, Any]:
+        return {
+            "api_key": self.api_key,
+            "query": query,
+            "search_depth": search_depth,
+            "max_results": max_results
+        }
+
+    @staticmethod
+    def _parse(data: Dict[str, Any]) -> List[Dict[str, str]]:
+        return [
+            {
+                "title": r.get("title", ""),
+                "snippet": r.get("content", "")
+            }
+            for r in data.get("results", [])
+        ]
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: str = None) -> float:
+        delay = config.TAVILY_BACKOFF * (2 ** attempt) + random.uniform(0, config.TAVILY_BACKOFF)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
 
-    def search(self, query: str) -> List[Dict[str, str]]:
+    def _cached(self, key: str, use_cache: bool):
+        if self.cache is None or not use_cache:
+            return None
+        return self.cache.get(key)
+
+    def _store(self, key: str, results: List[Dict[str, str]], use_cache: bool) -> List[Dict[str, str]]:
+        if self.cache is not None and use_cache:
+            self.cache.set(key, results)
+        return results
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        last_error = None
+        for attempt in range(config.TAVILY_MAX_RETRIES + 1):
+            try:
+                resp = self.session.post(TAVILY_URL, json=payload, timeout=config.TAVILY_TIMEOUT)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp.json()
+                last_error = requests.HTTPError(f"{resp.status_code} from Tavily", response=resp)
+                retry_after = resp.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                retry_after = None
+
+            if attempt == config.TAVILY_MAX_RETRIES:
+                break
+            time.sleep(self._backoff(attempt, retry_after))
+        raise last_error
+
+    async def _apost(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=config.TAVILY_TIMEOUT)
+        last_error = None
+        for attempt in range(config.TAVILY_MAX_RETRIES + 1):
+            try:
+                async with scheduler.slot("tavily"):
+                    resp = await self._async_client.post(TAVILY_URL, json=payload)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp.json()
+                last_error = httpx.HTTPStatusError(f"{resp.status_code} from Tavily", request=resp.request, response=resp)
+                retry_after = resp.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                last_error = e
+                retry_after = None
+
+            if attempt == config.TAVILY_MAX_RETRIES:
+                break
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise last_error
+
+    def search(self, query: str, search_depth: str = "basic", max_results: int = 5, use_cache: bool = True) -> List[Dict[str, str]]:
         """
         Executes a web search using Tavily API.
         """
         if not self.api_key:
             print("Warning: TAVILY_API_KEY not set. Returning mock data.")
-            return [
-                {"title": "Missing Config", "snippet": "Tavily API key is missing in .env."}
-            ]
-            
+            return list(MISSING_KEY_RESULTS)
+
+        key = self._cache_key(query, search_depth, max_results)
+        cached = self._cached(key, use_cache)
+        if cached is not None:
+            return cached
+
         print(f"Searching web for: {query}")
         try:
-            url = "https://api.tavily.com/search"
-            payload = {
-                "api_key": self.api_key,
-                "query": query,
-                "search_depth": "basic",
-                "max_results": 5
-            }
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            results = response.json().get("results", [])
-            
-            return [
-                {
-                    "title": r.get("title", ""),
-                    "snippet": r.get("content", "")
-                }
-                for r in results
-            ]
+            data = self._post(self._payload(query, search_depth, max_results))
+            return self._store(key, self._parse(data), use_cache)
         except Exception as e:
+            # Failures are not cached
             print(f"Tavily Search Error: {e}")
             return []
 
-web_search_tool = WebSearch()
+    async def asearch(self, query: str, search_depth: str = "basic", max_results: int = 5, use_cache: bool = True) -> List[Dict[str, str]]:
+        """
+        Async variant of search (httpx), for the async query pipeline. Same cache.
+        """
+        if not self.api_key:
+            print("Warning: TAVILY_API_KEY not set. Returning mock data.")
+            return list(MISSING_KEY_RESULTS)
+
+        key = self._cache_key(query, search_depth, max_results)
+        cached = self._cached(key, use_cache)
+        if cached is not None:
+            return cached
+
+        print(f"Searching web for: {query}")
+        try:
+            data = await self._apost(self._payload(query, search_depth, max_results))
+            return self._store(key, self._parse(data), use_cache)
+        except Exception as e:
+            print(f"Tavily Search Error: {e}")
+            return []
+
+    def search_many(self, queries: List[str], search_depth: str = "basic", max_results: int = 5,
+                    use_cache: bool = True, max_workers: int = None) -> List[List[Dict[str, str]]]:
+        """
+        Runs several searches concurrently on the pooled session.
+        Queries that normalize to the same text are sent once.
+        Returns one result list per query, in the same order.
+        """
+        unique = {}
+        for query in queries:
+            unique.setdefault(self.normalize_query(query), query)
+
+        max_workers = max_workers or config.TAVILY_MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as executor:
+            futures = {
+                normalized: executor.submit(self.search, query, search_depth, max_results, use_cache)
+                for normalized, query in unique.items()
+            }
+            results = {normalized: future.result() for normalized, future in futures.items()}
+        return [results[self.normalize_query(query)] for query in queries]
+
+    async def aclose(self) -> None:
+        # The httpx client is bound to the event loop that created it
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+web_search_tool = LazyObject(WebSearch)
@@ -0,0 +1,44 @@
+from typing import Any, Dict, List
+
+# Standard metrics -> us-gaap concepts, in order of preference. Filers switch
+# concepts over time (e.g. SalesRevenueNet -> ASC 606 revenue in 2018), so a
+# fiscal year takes the first concept that has a value for it.
+METRIC_CONCEPTS = {
+    "revenue": [
+        "us-gaap:Revenues",
+        "us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax",
+        "us-gaap:RevenueFromContractWithCustomerIncludingAssessedTax",
+        "us-gaap:SalesRevenueNet",
+    ],
+    "operating_income": ["us-gaap:OperatingIncomeLoss"],
+    "net_income": ["us-gaap:NetIncomeLoss", "us-gaap:ProfitLoss"],
+    "operating_cash_flow": [
+        "us-gaap:NetCashProvidedByUsedInOperatingActivities",
+        "us-gaap:NetCashProvidedByUsedInOperatingActivitiesContinuingOperations",
+    ],
+}
+
+FACT_COLUMNS = ("concept", "unit", "start", "end", "value", "form", "filed")
+
+def parse_company_facts(data: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Flattens SEC companyfacts JSON (data.sec.gov/api/xbrl/companyfacts/CIK##########.json)
+    into columns with one row per reported fact. Concepts are qualified by
+    taxonomy ("us-gaap:Revenues"); instant facts (balance sheet) have no start.
+    """
+    columns = {name: [] for name in FACT_COLUMNS}
+    for taxonomy, concepts in data.get("facts", {}).items():
+        for concept, body in concepts.items():
+            name = f"{taxonomy}:{concept}"
+            for unit, facts in body.get("units", {}).items():
+                for fact in facts:
+                    if "end" not in fact or "val" not in fact:
+                        continue
+                    columns["concept"].append(name)
+                    columns["unit"].append(unit)
+                    columns["start"].append(fact.get("start", "NaT"))
+                    columns["end"].append(fact["end"])
+                    columns["value"].append(fact["val"])
+                    columns["form"].append(fact.get("form", ""))
+                    columns["filed"].append(fact.get("filed", "NaT"))
+    return columns
@@ -0,0 +1,208 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class DiskCache:
+    """
+    Persistent key/value cache backed by SQLite.
+    Values must be JSON-serializable. Several caches can share one file by
+    using different namespaces.
+    Thread-safe (one connection per thread) and process-safe (SQLite file
+    locking in WAL mode), with optional TTL and LRU eviction past max_entries.
+    """
+
+    def __init__(self, path: str, namespace: str = "default", ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Content-addressed key: SHA-256 over the JSON encoding of all parts.
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache ("
+                        "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                        "created REAL NOT NULL, accessed REAL NOT NULL, "
+                        "PRIMARY KEY (namespace, key))"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (namespace, accessed)")
+                    self._initialized = True
+        return conn
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the cached value, or None on a miss or an expired entry.
+        """
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, created FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self._record(False)
+                return None
+
+            value, created = row
+            now = time.time()
+            if self.ttl is not None and now - created > self.ttl:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._record(False)
+                return None
+
+            # Touch for LRU ordering
+            conn.execute(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            self._record(True)
+            return json.loads(value)
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            self._record(False)
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            conn = self._conn()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now)
+            )
+            if self.max_entries:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY accessed ASC LIMIT ?)",
+                (self.namespace, self.namespace, overflow)
+            )
+
+    def incr(self, key: str) -> int:
+        """
+        Atomically increments an integer entry (missing = 0) and returns the new value.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT INTO cache (namespace, key, value, created, accessed) VALUES (?, ?, '1', ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = CAST(value AS INTEGER) + 1, accessed = excluded.accessed",
+            (self.namespace, key, now, now)
+        )
+        return int(conn.execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()[0])
+
+    def delete(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            print(f"Cache delete error: {e}")
+
+    def purge_expired(self) -> int:
+        """
+        Drops every expired entry in this namespace. Returns the number removed.
+        """
+        if self.ttl is None:
+            return 0
+        cur = self._conn().execute(
+            "DELETE FROM cache WHERE namespace = ? AND created < ?",
+            (self.namespace, time.time() - self.ttl)
+        )
+        return cur.rowcount
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+class LRUCache:
+    """
+    Small thread-safe in-memory LRU map. Holds arbitrary objects (no
+    serialization), so it sits in front of a DiskCache for hot entries.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Any, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
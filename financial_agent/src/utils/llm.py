@@ -1,39 +1,333 @@
-from openai import OpenAI
 from src.config import config
+from src.utils.cache import DiskCache
+from src.utils.lazy import LazyObject
+from src.utils.openai_limiter import openai_limiter
+from src.utils.tokens import count_tokens
+from types import SimpleNamespace
+from typing import Callable
+import base64
 import json
 
+# Completion tokens reserved per call when it is admitted; the limiter
+# settles the difference once the response reports its real usage
+EXPECTED_OUTPUT_TOKENS = 500
+# Rough upper bound for one downscaled image in a Vision prompt
+IMAGE_TOKENS = 1000
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+def validate_schema(value, schema: dict) -> bool:
+    """
+    Minimal JSON Schema check for the subset used with Structured Outputs
+    (object/array/scalar types, required properties, no extra properties).
+    """
+    expected = schema.get("type")
+    if expected and not isinstance(value, JSON_TYPES[expected]):
+        return False
+    # bool is an int subclass in Python
+    if expected in ("integer", "number") and isinstance(value, bool):
+        return False
+    if expected == "object":
+        properties = schema.get("properties", {})
+        if any(key not in value for key in schema.get("required", [])):
+            return False
+        if schema.get("additionalProperties") is False and any(key not in properties for key in value):
+            return False
+        return all(validate_schema(value[key], sub) for key, sub in properties.items() if key in value)
+    if expected == "array" and "items" in schema:
+        return all(validate_schema(item, schema["items"]) for item in value)
+    return True
+
+def object_schema(properties: dict) -> dict:
+    # Strict mode requires every property to be required and no extras
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
 class LLMClient:
     def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        from openai import OpenAI
+        # Retries are done by the shared limiter (with backoff and AIMD), not the SDK
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
         self.model = config.LLM_MODEL
+        
+        # Content-addressed response cache shared by every text call
+        self.cache = None
+        if config.LLM_CACHE_ENABLED:
+            self.cache = DiskCache(
+                config.LLM_CACHE_PATH,
+                namespace="llm",
+                ttl=config.LLM_CACHE_TTL,
+                max_entries=config.LLM_CACHE_MAX_ENTRIES
+            )
+        self.bypass_cache = config.LLM_CACHE_BYPASS
+        self._async_client = None
+
+    def _cache_key(self, system_prompt: str, prompt: str, response_format: dict = None) -> str:
+        return DiskCache.make_key(self.model, system_prompt, prompt, response_format)
+
+    @property
+    def async_client(self):
+        # AsyncOpenAI binds its connection pool to the running event loop:
+        # created on first async use and dropped again by aclose()
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
+        return self._async_client
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
 
-    def analyze_text(self, prompt: str, system_prompt: str = "You are a financial analyst.") -> str:
-        response = self.client.chat.completions.create(
+    def _cache_lookup(self, system_prompt: str, prompt: str, response_format: dict = None, use_cache: bool = True):
+        """
+        Returns (key, cached content). key is None when this call is not cached.
+        With bypass enabled the lookup is skipped but the fresh answer is still stored.
+        """
+        if self.cache is None or not use_cache:
+            return None, None
+        key = self._cache_key(system_prompt, prompt, response_format)
+        if self.bypass_cache:
+            return key, None
+        return key, self.cache.get(key)
+
+    def _completion_args(self, system_prompt: str, prompt: str, response_format: dict = None) -> dict:
+        kwargs = {}
+        if response_format:
+            kwargs["response_format"] = response_format
+        return dict(
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0
+            temperature=0,
+            **kwargs
         )
-        return response.choices[0].message.content
 
-    def specific_extraction(self, text: str, schema: dict) -> dict:
+    @staticmethod
+    def _estimate_tokens(system_prompt: str, prompt: str) -> int:
+        return count_tokens(system_prompt) + count_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+
+    def _store(self, key: str, content: str) -> str:
+        if key is not None and content is not None:
+            self.cache.set(key, content)
+        return content
+
+    def _cached_completion(self, system_prompt: str, prompt: str, response_format: dict = None, use_cache: bool = True) -> str:
         """
-        Uses JSON mode to extract specific fields.
+        Runs a temperature=0 chat completion, served from the cache when possible.
         """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"Extract the following fields using this schema: {json.dumps(schema)}"},
-                {"role": "user", "content": text}
-            ],
-            response_format={ "type": "json_object" },
-            temperature=0
-        )
+        key, cached = self._cache_lookup(system_prompt, prompt, response_format, use_cache)
+        if cached is not None:
+            return cached
+        args = self._completion_args(system_prompt, prompt, response_format)
+        response = openai_limiter.call(lambda: self.client.chat.completions.create(**args),
+                                       self._estimate_tokens(system_prompt, prompt))
+        return self._store(key, response.choices[0].message.content)
+
+    async def _acached_completion(self, system_prompt: str, prompt: str, response_format: dict = None, use_cache: bool = True) -> str:
+        """
+        Async variant of _cached_completion (same cache, same keys).
+        """
+        key, cached = self._cache_lookup(system_prompt, prompt, response_format, use_cache)
+        if cached is not None:
+            return cached
+        args = self._completion_args(system_prompt, prompt, response_format)
+        response = await openai_limiter.acall(lambda: self.async_client.chat.completions.create(**args),
+                                              self._estimate_tokens(system_prompt, prompt))
+        return self._store(key, response.choices[0].message.content)
+
+    def _stream_args(self, system_prompt: str, prompt: str) -> dict:
+        # The final chunk carries token usage, which the limiter settles against
+        return dict(self._completion_args(system_prompt, prompt), stream=True, stream_options={"include_usage": True})
+
+    @staticmethod
+    def _stream_sink(on_delta: Callable[[str], None]):
+        """
+        Wraps on_delta for a call that may be retried: a retried stream
+        starts over, so text already passed on is not sent twice.
+        """
+        emitted = [0]
+        def sink(parts: list, text: str) -> None:
+            parts.append(text)
+            if on_delta is None:
+                return
+            total = sum(len(p) for p in parts)
+            new = total - emitted[0]
+            if new > 0:
+                on_delta(text[-new:])
+                emitted[0] = total
+        return sink
+
+    def stream_text(self, prompt: str, system_prompt: str = "You are a financial analyst.",
+                    on_delta: Callable[[str], None] = None, use_cache: bool = True) -> str:
+        """
+        analyze_text() that passes the answer to `on_delta` piece by piece
+        as it is generated and returns the full text. Same cache and keys as
+        analyze_text(); a cached answer is passed on in one piece.
+        """
+        key, cached = self._cache_lookup(system_prompt, prompt, use_cache=use_cache)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+        args = self._stream_args(system_prompt, prompt)
+        sink = self._stream_sink(on_delta)
+
+        def consume():
+            parts, usage = [], None
+            for chunk in self.client.chat.completions.create(**args):
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    sink(parts, chunk.choices[0].delta.content)
+            return SimpleNamespace(content="".join(parts), usage=usage)
+
+        response = openai_limiter.call(consume, self._estimate_tokens(system_prompt, prompt))
+        return self._store(key, response.content)
+
+    async def astream_text(self, prompt: str, system_prompt: str = "You are a financial analyst.",
+                           on_delta: Callable[[str], None] = None, use_cache: bool = True) -> str:
+        key, cached = self._cache_lookup(system_prompt, prompt, use_cache=use_cache)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+        args = self._stream_args(system_prompt, prompt)
+        sink = self._stream_sink(on_delta)
+
+        async def consume():
+            parts, usage = [], None
+            async for chunk in await self.async_client.chat.completions.create(**args):
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    sink(parts, chunk.choices[0].delta.content)
+            return SimpleNamespace(content="".join(parts), usage=usage)
+
+        response = await openai_limiter.acall(consume, self._estimate_tokens(system_prompt, prompt))
+        return self._store(key, response.content)
+
+    def analyze_text(self, prompt: str, system_prompt: str = "You are a financial analyst.", use_cache: bool = True) -> str:
+        return self._cached_completion(system_prompt, prompt, use_cache=use_cache)
+
+    async def aanalyze_text(self, prompt: str, system_prompt: str = "You are a financial analyst.", use_cache: bool = True) -> str:
+        return await self._acached_completion(system_prompt, prompt, use_cache=use_cache)
+
+    @staticmethod
+    def _extraction_request(schema: dict):
+        system_prompt = f"Extract the following fields using this schema: {json.dumps(schema)}"
+        response_format = { "type": "json_object" }
+        return system_prompt, response_format
+
+    def _parse_extraction(self, content: str, system_prompt: str, text: str, response_format: dict, use_cache: bool) -> dict:
         try:
-            return json.loads(response.choices[0].message.content)
+            return json.loads(content)
         except:
+            # Don't keep serving an unparseable answer from the cache
+            if self.cache is not None and use_cache:
+                self.cache.delete(self._cache_key(system_prompt, text, response_format))
             return {}
 
-llm_client = LLMClient()
+    def specific_extraction(self, text: str, schema: dict, use_cache: bool = True) -> dict:
+        """
+        Uses JSON mode to extract specific fields.
+        """
+        system_prompt, response_format = self._extraction_request(schema)
+        content = self._cached_completion(system_prompt, text, response_format=response_format, use_cache=use_cache)
+        return self._parse_extraction(content, system_prompt, text, response_format, use_cache)
+
+    async def aspecific_extraction(self, text: str, schema: dict, use_cache: bool = True) -> dict:
+        system_prompt, response_format = self._extraction_request(schema)
+        content = await self._acached_completion(system_prompt, text, response_format=response_format, use_cache=use_cache)
+        return self._parse_extraction(content, system_prompt, text, response_format, use_cache)
+
+    @staticmethod
+    def _structured_request(name: str, schema: dict):
+        # Structured Outputs: the model is constrained to the JSON schema
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": schema}
+        }
+
+    def _parse_structured(self, content: str, system_prompt: str, prompt: str, response_format: dict, schema: dict):
+        """
+        Returns the parsed answer, or None when it is not valid JSON or does
+        not match the schema (the cached copy is dropped in that case).
+        """
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError):
+            data = None
+        if data is not None and validate_schema(data, schema):
+            return data
+        if self.cache is not None:
+            self.cache.delete(self._cache_key(system_prompt, prompt, response_format))
+        return None
+
+    def structured_completion(self, prompt: str, name: str, schema: dict,
+                              system_prompt: str = "You are a financial analyst.", use_cache: bool = True) -> dict:
+        """
+        One call that returns a schema-validated JSON object. An invalid
+        answer is dropped from the cache and retried once, then raises ValueError.
+        """
+        response_format = self._structured_request(name, schema)
+        for _ in range(2):
+            content = self._cached_completion(system_prompt, prompt, response_format=response_format, use_cache=use_cache)
+            data = self._parse_structured(content, system_prompt, prompt, response_format, schema)
+            if data is not None:
+                return data
+        raise ValueError(f"Structured response for '{name}' did not match its schema.")
+
+    async def astructured_completion(self, prompt: str, name: str, schema: dict,
+                                     system_prompt: str = "You are a financial analyst.", use_cache: bool = True) -> dict:
+        response_format = self._structured_request(name, schema)
+        for _ in range(2):
+            content = await self._acached_completion(system_prompt, prompt, response_format=response_format, use_cache=use_cache)
+            data = self._parse_structured(content, system_prompt, prompt, response_format, schema)
+            if data is not None:
+                return data
+        raise ValueError(f"Structured response for '{name}' did not match its schema.")
+
+    def describe_image(self, prompt: str, image_bytes: bytes, mime_type: str = "image/jpeg", max_tokens: int = 500) -> str:
+        """
+        GPT-4o Vision call for one image (not cached here: the file loader
+        caches descriptions by image hash). Raises once retries are exhausted.
+        """
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime_type};base64,{base64_image}"
+                        }
+                    }
+                ]
+            }
+        ]
+        response = openai_limiter.call(
+            lambda: self.client.chat.completions.create(model=self.model, messages=messages, max_tokens=max_tokens),
+            count_tokens(prompt) + IMAGE_TOKENS + max_tokens
+        )
+        return response.choices[0].message.content or ""
+
+    def cache_stats(self) -> dict:
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+llm_client = LazyObject(LLMClient)
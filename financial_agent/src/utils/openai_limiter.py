@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+from src.config import config
+from src.utils.lazy import LazyObject
+
+# Bucket capacity: this many seconds of the per-minute quota can go out as one burst
+BURST_SECONDS = 10
+# How often a caller re-checks the limiter while it waits for a concurrency slot
+POLL_SECONDS = 0.05
+
+def is_rate_limit(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 429
+
+def is_retryable(e: Exception) -> bool:
+    """
+    429s (except an exhausted quota), timeouts, connection errors and 5xx.
+    Bad requests, auth errors and our own exceptions are not retried.
+    """
+    import openai
+    if isinstance(e, openai.RateLimitError):
+        return getattr(e, "code", None) != "insufficient_quota"
+    if isinstance(e, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code in (408, 409) or e.status_code >= 500
+    return False
+
+def retry_after(e: Exception) -> float:
+    # Seconds the server asked us to wait (Retry-After / retry-after-ms), 0 if none
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+def used_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+class AdaptiveLimiter:
+    """
+    One gate for every OpenAI call in the process, from threads (sync
+    clients, Vision workers) and coroutines alike.
+
+    A call is admitted when the requests/minute and tokens/minute buckets
+    both have room and fewer than `limit` calls are in flight. The limit
+    adapts AIMD-style: a 429 halves it (and pauses everyone for the
+    Retry-After time), and each `limit` successes in a row raise it by one,
+    up to max_concurrency. Failed calls are retried with jittered
+    exponential backoff through tenacity.
+
+        response = openai_limiter.call(lambda: client.chat.completions.create(...), tokens)
+    """
+
+    def __init__(self, rpm: float = None, tpm: float = None, max_concurrency: int = None,
+                 max_retries: int = None, backoff: float = None):
+        self.rpm = config.OPENAI_RPM if rpm is None else rpm
+        self.tpm = config.OPENAI_TPM if tpm is None else tpm
+        self.max_concurrency = max(1, max_concurrency or config.OPENAI_MAX_CONCURRENCY)
+        self.max_retries = config.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = config.OPENAI_BACKOFF if backoff is None else backoff
+
+        self.limit = self.max_concurrency
+        self.active = 0
+        self._successes = 0
+        self._request_capacity = max(1.0, self.rpm * BURST_SECONDS / 60)
+        self._token_capacity = max(1.0, self.tpm * BURST_SECONDS / 60)
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "errors": 0,
+                      "wait_s": 0.0, "max_active": 0, "min_limit": self.limit}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm > 0:
+            self._requests = min(self._request_capacity, self._requests + elapsed * self.rpm / 60)
+        if self.tpm > 0:
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self.tpm / 60)
+
+    def _try_admit(self, tokens: int, start: float):
+        """
+        Returns (admitted_at, 0) when the call may start, or (None, seconds to wait).
+        `start` is when the caller began waiting, for the wait-time stat.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until:
+                return None, self._paused_until - now
+            if self.active >= self.limit:
+                return None, POLL_SECONDS
+            wait = 0.0
+            if self.rpm > 0 and self._requests < 1:
+                wait = (1 - self._requests) * 60 / self.rpm
+            # A prompt larger than the bucket waits for a full bucket and leaves it in debt
+            needed = min(tokens, self._token_capacity)
+            if self.tpm > 0 and self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60 / self.tpm)
+            if wait:
+                return None, wait
+            self._requests -= 1
+            self._tokens -= tokens
+            self.active += 1
+            self.stats["calls"] += 1
+            self.stats["wait_s"] += now - start
+            self.stats["max_active"] = max(self.stats["max_active"], self.active)
+            return now, 0.0
+
+    def acquire(self, tokens: int) -> float:
+        start = time.monotonic()
+        while True:
+            admitted, wait = self._try_admit(tokens, start)
+            if admitted is not None:
+                return admitted
+            time.sleep(min(wait, 1.0))
+
+    async def aacquire(self, tokens: int) -> float:
+        start = time.monotonic()
+        while True:
+            admitted, wait = self._try_admit(tokens, start)
+            if admitted is not None:
+                return admitted
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, admitted: float, tokens: int, used: Optional[int] = None, error: Exception = None) -> None:
+        with self._lock:
+            self.active -= 1
+            if used is not None and self.tpm > 0:
+                # Settle the estimate against the real usage
+                self._tokens = min(self._token_capacity, self._tokens + tokens - used)
+            if error is None:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+                return
+            self._successes = 0
+            if not is_rate_limit(error):
+                self.stats["errors"] += 1
+                return
+            self.stats["rate_limited"] += 1
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after(error))
+            # Calls already in flight when we backed off don't halve the limit again
+            if admitted >= self._last_decrease:
+                self.limit = max(1, self.limit // 2)
+                self._last_decrease = now
+                self.stats["min_limit"] = min(self.stats["min_limit"], self.limit)
+
+    def _wait(self, retry_state) -> float:
+        from tenacity import wait_random_exponential
+        backoff = wait_random_exponential(multiplier=self.backoff, max=60)(retry_state)
+        return max(backoff, retry_after(retry_state.outcome.exception()))
+
+    def _retrying_args(self) -> dict:
+        from tenacity import retry_if_exception, stop_after_attempt
+
+        def log_retry(retry_state):
+            with self._lock:
+                self.stats["retries"] += 1
+            e = retry_state.outcome.exception()
+            print(f"OpenAI call failed ({type(e).__name__}), retry {retry_state.attempt_number}/{self.max_retries} "
+                  f"in {retry_state.next_action.sleep:.1f}s (concurrency limit {self.limit})")
+
+        return dict(
+            retry=retry_if_exception(is_retryable),
+            wait=self._wait,
+            stop=stop_after_attempt(self.max_retries + 1),
+            before_sleep=log_retry,
+            reraise=True
+        )
+
+    def call(self, fn: Callable[[], Any], tokens: int) -> Any:
+        """
+        Runs `fn()` (one API request, estimated at `tokens`) under the limits, with retries.
+        """
+        from tenacity import Retrying
+        for attempt in Retrying(**self._retrying_args()):
+            with attempt:
+                admitted = self.acquire(tokens)
+                try:
+                    response = fn()
+                except Exception as e:
+                    self.release(admitted, tokens, error=e)
+                    raise
+                self.release(admitted, tokens, used_tokens(response))
+                return response
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """
+        Async variant of call(); `fn()` returns the awaitable request.
+        """
+        from tenacity import AsyncRetrying
+        async for attempt in AsyncRetrying(**self._retrying_args()):
+            with attempt:
+                admitted = await self.aacquire(tokens)
+                try:
+                    response = await fn()
+                except Exception as e:
+                    self.release(admitted, tokens, error=e)
+                    raise
+                self.release(admitted, tokens, used_tokens(response))
+                return response
+
+    def report(self) -> str:
+        s = self.stats
+        avg_wait = s["wait_s"] / s["calls"] if s["calls"] else 0.0
+        return (f"  openai: {s['calls']} calls, {s['retries']} retries, {s['rate_limited']} rate limited, "
+                f"{s['errors']} other errors, peak {s['max_active']} concurrent "
+                f"(limit now {self.limit}, low {s['min_limit']}, max {self.max_concurrency}), "
+                f"{self.rpm or 'unlimited'} rpm / {self.tpm or 'unlimited'} tpm, avg wait {avg_wait:.2f}s")
+
+openai_limiter = LazyObject(AdaptiveLimiter)
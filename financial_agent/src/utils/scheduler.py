@@ -0,0 +1,84 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Tuple
+from src.config import config
+from src.utils.rate_limit import AsyncTokenBucket
+
+def default_limits() -> Dict[str, Tuple[int, float]]:
+    # Resource -> (max concurrent calls, max calls per second; 0 = unlimited).
+    # OpenAI calls have their own adaptive limiter (src/utils/openai_limiter.py).
+    return {
+        "tavily": (config.TAVILY_MAX_WORKERS, config.TAVILY_MAX_RPS),
+        "qdrant": (config.QDRANT_MAX_CONCURRENCY, 0),
+        "edgar": (config.SEC_MAX_WORKERS, config.SEC_MAX_RPS),
+    }
+
+class ResourceScheduler:
+    """
+    Process-wide admission control for async calls to external services.
+    Each resource has its own concurrency cap and request rate, so many
+    concurrent ticker analyses share Tavily, Qdrant and EDGAR capacity
+    instead of each one assuming it owns the quota.
+
+        async with scheduler.slot("tavily"):
+            response = await client.post(...)
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]] = None):
+        self._limits = limits
+        self._loop = None
+        self._semaphores = {}
+        self._buckets = {}
+        self.stats = {}
+
+    @property
+    def limits(self) -> Dict[str, Tuple[int, float]]:
+        if self._limits is None:
+            self._limits = default_limits()
+        return self._limits
+
+    def _bind(self) -> None:
+        # Semaphores belong to one event loop; rebuild them for a new loop (asyncio.run per report)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {name: asyncio.Semaphore(max(1, c)) for name, (c, _) in self.limits.items()}
+            self._buckets = {name: AsyncTokenBucket(rps) for name, (_, rps) in self.limits.items()}
+
+    @asynccontextmanager
+    async def slot(self, resource: str):
+        """
+        Waits for a free slot and a rate token for the resource.
+        """
+        self._bind()
+        stats = self.stats.setdefault(resource, {"calls": 0, "wait_s": 0.0, "max_active": 0, "active": 0})
+        start = time.perf_counter()
+        async with self._semaphores[resource]:
+            await self._buckets[resource].acquire()
+            stats["wait_s"] += time.perf_counter() - start
+            stats["calls"] += 1
+            stats["active"] += 1
+            stats["max_active"] = max(stats["max_active"], stats["active"])
+            try:
+                yield
+            finally:
+                stats["active"] -= 1
+
+    async def run_sync(self, resource: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs a blocking call on a worker thread inside the resource's slot.
+        """
+        async with self.slot(resource):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def report(self) -> str:
+        lines = []
+        for name, s in sorted(self.stats.items()):
+            limit, rps = self.limits.get(name, (0, 0))
+            avg_wait = s["wait_s"] / s["calls"] if s["calls"] else 0.0
+            lines.append(f"  {name}: {s['calls']} calls, peak {s['max_active']}/{limit} concurrent, "
+                         f"{rps or 'unlimited'} rps, avg wait {avg_wait:.2f}s")
+        return "\n".join(lines)
+
+scheduler = ResourceScheduler()
@@ -0,0 +1,37 @@
+import threading
+from src.config import config
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    import tiktoken
+                    try:
+                        _encoder = tiktoken.encoding_for_model(config.LLM_MODEL)
+                    except KeyError:
+                        _encoder = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    # No tiktoken (or no cached BPE file offline): ~4 characters per token
+                    print(f"Warning: tiktoken unavailable ({e}); estimating tokens from length.")
+                    _encoder = False
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoder = _get_encoder()
+    if encoder:
+        tokens = encoder.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoder.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]